@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+מדידת תפוקה של HebrewNikudPipeline מקצה לקצה
+
+    python benchmark_nikud_pipeline.py                       # מנועים מדומים, קורפוס סינתטי
+    python benchmark_nikud_pipeline.py --corpus book.txt --real
+    python benchmark_nikud_pipeline.py --sizes 1000 10000 --batch-sizes 16 64 \\
+        --workers 1 2 --json results.json
+    python benchmark_nikud_pipeline.py --skip-margin 0.9   # עם שער הביטחון ובלעדיו
+
+לכל תצורה (גודל קורפוס x batch_size x workers x מטמון x שער) מודפסים משפטים
+לשנייה, טוקנים (מילים) לשנייה, אחוזוני זמן לאצווה p50/p95/p99 וזיכרון
+שיא (RSS). כל תצורה רצה בתהליך נפרד, כך שזיכרון השיא שלה לא מושפע
+מהתצורות שלפניה.
+
+ברירת המחדל היא המנועים המדומים של nikud_fake_engines (בלי הורדת מודלים),
+שמודדים את התקורה של הפייפליין עצמו - אפשר להריץ אותה ב-CI.
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import queue as queue_module
+import random
+import resource
+import sys
+import time
+import traceback
+
+from complete_nikud_pipeline import HebrewNikudPipeline
+from nikud_fake_engines import install_fake_engines
+from nikud_stats import LatencyHistogram
+
+# אוצר מילים קטן לקורפוס הסינתטי (נוסח תפילה ולשון חכמים)
+_VOCABULARY = (
+    'ברוך אתה ה אלהינו מלך העולם אשר קדשנו במצותיו וצונו על שמע ישראל '
+    'אחד ואהבת את בכל לבבך ובכל נפשך ומאדך והיו הדברים האלה אנכי מצוך '
+    'היום ושננתם לבניך ודברת בם בשבתך בביתך ובלכתך בדרך ובשכבך ובקומך '
+    'אמר רבי יהודה תנו רבנן מאי טעמא דכתיב שנאמר הכא במאי עסקינן לא '
+    'צריכא אלא כל זה מה שאין כן וכן הלכה כדברי חכמים משנה גמרא תורה '
+    'שבת יום טוב ברכה תפלה קדושה עולם הבא צדיק רשע אדם בית מקום דבר'
+).split()
+
+DEFAULT_SIZES = (1000,)
+DEFAULT_BATCH_SIZES = (8, 32)
+DEFAULT_WORKERS = (1, 2)
+
+# כל כמה שניות בודקים שתהליך התצורה עוד חי
+_POLL_SECONDS = 1.0
+
+
+class BenchmarkFailed(Exception):
+    """תצורה שהתהליך שלה נכשל, קרס או חרג מה-timeout"""
+
+
+def synthetic_corpus(size, seed=0, repeat_rate=0.2, min_words=3, max_words=40):
+    """
+    קורפוס סינתטי דטרמיניסטי: מילים לפי התפלגות זיפף, ואחוז repeat_rate
+    של משפטים שחוזרים על משפט קודם (כמו נוסחים קבועים בספרים)
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(_VOCABULARY))]
+    sentences = []
+    for _ in range(size):
+        if sentences and rng.random() < repeat_rate:
+            sentences.append(rng.choice(sentences))
+            continue
+        length = rng.randint(min_words, max_words)
+        sentences.append(' '.join(rng.choices(_VOCABULARY, weights, k=length)))
+    return sentences
+
+
+def build_corpus(size, corpus_path=None, seed=0, repeat_rate=0.2):
+    """קורפוס בגודל size: שורות הקובץ corpus_path במחזוריות, או סינתטי"""
+    if corpus_path is None:
+        return synthetic_corpus(size, seed, repeat_rate)
+    with open(corpus_path, encoding='utf-8') as f:
+        base = [line.strip() for line in f if line.strip()]
+    if not base:
+        raise ValueError(f"אין משפטים ב-{corpus_path}")
+    return list(itertools.islice(itertools.cycle(base), size))
+
+
+def _peak_rss_mb():
+    """זיכרון שיא של התהליך (ru_maxrss: KB בלינוקס, בתים ב-macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_configuration(sentences, batch_size, workers, cache, real=False,
+                      latency_scale=1.0, disagreement_rate=0.1, skip_margin=None):
+    """
+    מריץ תצורה אחת על הקורפוס ומחזיר מילון תוצאות
+
+    הקורפוס נשלח ל-process_many באצוות של batch_size, וזמן כל אצווה
+    נרשם בהיסטוגרמה (זה הזמן שכל משפט באצווה חיכה).
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        pipeline = HebrewNikudPipeline(workers=workers, skip_margin=skip_margin)
+        if real:
+            pipeline.load_models()
+        else:
+            install_fake_engines(pipeline, latency_scale, disagreement_rate)
+        if cache:
+            pipeline.enable_cache()
+
+    latency = LatencyHistogram()
+    tokens = sum(len(sentence.split()) for sentence in sentences)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        for first in range(0, len(sentences), batch_size):
+            batch_start = time.perf_counter()
+            pipeline.process_many(sentences[first:first + batch_size], batch_size)
+            latency.add(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+    pipeline.close()
+
+    return {
+        'sentences': len(sentences),
+        'batch_size': batch_size,
+        'workers': workers,
+        'cache': cache,
+        'skip_margin': skip_margin,
+        'engines': 'real' if real else 'fake',
+        'seconds': round(elapsed, 3),
+        'sentences_per_sec': round(len(sentences) / elapsed, 1),
+        'tokens_per_sec': round(tokens / elapsed, 1),
+        'p50_ms': round(latency.percentile(50) * 1000, 2),
+        'p95_ms': round(latency.percentile(95) * 1000, 2),
+        'p99_ms': round(latency.percentile(99) * 1000, 2),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def _child(queue, corpus, args, kwargs):
+    # הקורפוס נבנה כאן ולא בתהליך האב - הוא נספר בזיכרון השיא של התצורה
+    try:
+        sentences = build_corpus(**corpus)
+        queue.put(('ok', run_configuration(sentences, *args, **kwargs)))
+    except BaseException:
+        queue.put(('error', traceback.format_exc()))
+        raise
+
+
+def run_isolated(corpus, *args, timeout=None, **kwargs):
+    """
+    מריץ תצורה בתהליך נפרד (fork) כדי למדוד את זיכרון השיא שלה בלבד
+
+    Args:
+        corpus: מילון הארגומנטים של build_corpus
+        timeout: שניות עד שהתהליך נעצר (None - בלי הגבלה)
+
+    Raises:
+        BenchmarkFailed: חריגה בתהליך, קריסה (למשל OOM killer) או timeout
+    """
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, corpus, args, kwargs))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                status, payload = queue.get(timeout=_POLL_SECONDS)
+                break
+            except queue_module.Empty:
+                pass
+            if not process.is_alive():
+                # תוצאה שנכתבה ממש לפני היציאה עוד יכולה להיות בצינור
+                try:
+                    status, payload = queue.get(timeout=_POLL_SECONDS)
+                    break
+                except queue_module.Empty:
+                    raise BenchmarkFailed(
+                        f"התהליך יצא בלי תוצאה (exitcode {process.exitcode})"
+                    ) from None
+            if deadline is not None and time.monotonic() > deadline:
+                raise BenchmarkFailed(f"חריגה מ-{timeout} שניות")
+    finally:
+        process.join(_POLL_SECONDS)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    if status == 'error':
+        raise BenchmarkFailed(payload.strip().splitlines()[-1])
+    return payload
+
+
+def _print_table(results, file=sys.stdout):
+    print(f"{'sentences':>10}{'batch':>7}{'workers':>9}{'cache':>7}{'gate':>6}{'sent/s':>10}"
+          f"{'tok/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}", file=file)
+    for row in results:
+        print(f"{row['sentences']:>10}{row['batch_size']:>7}{row['workers']:>9}"
+              f"{'on' if row['cache'] else 'off':>7}{row['skip_margin'] or '-':>6}"
+              f"{row['sentences_per_sec']:>10.1f}"
+              f"{row['tokens_per_sec']:>11.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['peak_rss_mb']:>9.1f}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="מדידת תפוקה של פייפליין הניקוד")
+    parser.add_argument('--corpus', help="קובץ טקסט (שורה לכל משפט) במקום קורפוס סינתטי")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument('--workers', type=int, nargs='+', default=list(DEFAULT_WORKERS))
+    parser.add_argument('--cache', choices=['on', 'off', 'both'], default='both')
+    parser.add_argument('--real', action='store_true', help="מודלים אמיתיים במקום מדומים")
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help="מכפיל לזמני המנועים המדומים (0 = תקורת הפייפליין בלבד)")
+    parser.add_argument('--disagreement-rate', type=float, default=0.1)
+    parser.add_argument('--skip-margin', type=float, nargs='+', default=[],
+                        help="ספי שער ביטחון להשוואה מול ריצה בלי שער (ראה nikud_confidence.py)")
+    parser.add_argument('--repeat-rate', type=float, default=0.2,
+                        help="אחוז המשפטים החוזרים בקורפוס הסינתטי")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float,
+                        help="שניות לכל תצורה לפני שהיא נעצרת ונרשמת ככישלון")
+    parser.add_argument('--json', help="קובץ לשמירת התוצאות")
+    args = parser.parse_args()
+
+    cache_options = {'on': [True], 'off': [False], 'both': [False, True]}[args.cache]
+
+    results = []
+    failures = []
+    gate_options = [None] + args.skip_margin
+    configurations = list(itertools.product(
+        args.sizes, args.batch_sizes, args.workers, cache_options, gate_options
+    ))
+    for number, (size, batch_size, workers, cache, gate) in enumerate(configurations, start=1):
+        print(f"⏱️  [{number}/{len(configurations)}] {size} משפטים | batch {batch_size} | "
+              f"workers {workers} | cache {'on' if cache else 'off'} | gate {gate or '-'}",
+              file=sys.stderr)
+        corpus = {'size': size, 'corpus_path': args.corpus,
+                  'seed': args.seed, 'repeat_rate': args.repeat_rate}
+        try:
+            results.append(run_isolated(
+                corpus, batch_size, workers, cache, real=args.real,
+                latency_scale=args.latency_scale, disagreement_rate=args.disagreement_rate,
+                skip_margin=gate, timeout=args.timeout
+            ))
+        except BenchmarkFailed as e:
+            print(f"❌ התצורה נכשלה: {e}", file=sys.stderr)
+            failures.append({
+                'sentences': size, 'batch_size': batch_size, 'workers': workers,
+                'cache': cache, 'skip_margin': gate, 'error': str(e),
+            })
+
+    print("=" * 100)
+    print(f"Benchmark ({'מודלים אמיתיים' if args.real else 'מנועים מדומים'})")
+    print("=" * 100)
+    _print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results + failures, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 נשמר ל-{args.json}")
+    if failures:
+        print(f"\n❌ {len(failures)} תצורות נכשלו:")
+        for failure in failures:
+            print(f"   {failure['sentences']} משפטים | batch {failure['batch_size']} | "
+                  f"workers {failure['workers']} | cache {'on' if failure['cache'] else 'off'} | "
+                  f"gate {failure['skip_margin'] or '-'}: {failure['error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
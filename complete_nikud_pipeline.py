@@ -3,125 +3,671 @@
 מערכת המשלבת Nakdimon + DictaBERT + מורפולוגיה
 """
 
+import io
+import logging
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# הוסף encoding UTF-8
-import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+from nikud_abbreviations import load_index as load_abbreviation_index
+from nikud_batching import DEFAULT_MAX_BATCH_TOKENS, plan_batches, token_lengths
+from nikud_cache import (
+    DEFAULT_MEMORY_SIZE,
+    MemoryBudgetLRU,
+    NikudResultCache,
+    file_identity,
+    make_fingerprint,
+    model_identity,
+    package_version,
+)
+from nikud_confidence import (
+    confident_decision,
+    low_margin_words,
+    min_margin,
+    predict_with_margins,
+)
+from nikud_encoding import DEFAULT_ENCODING_CACHE_BYTES, EncodingCache
+from nikud_lexicon import Lexicon, lexicon_decision
+from nikud_logging import configure_logging, get_logger, log_event
+from nikud_stats import PipelineStats, profiler_from_env
+from nikud_text import (
+    context_spans,
+    disputed_words,
+    plan_windows,
+    remove_nikud,
+    stitch_windows,
+    window_texts,
+)
+
+# נתיבי המודלים: עותק מקומי אם הורד, אחרת HuggingFace
+DICTABERT_NIKUD_PATH = "./downloaded_models/dictabert-nikud"
+DICTABERT_NIKUD_HUB = "dicta-il/dictabert-nikud"
+DICTABERT_MORPH_PATH = "./downloaded_models/dictabert-morph"
+DICTABERT_MORPH_HUB = "dicta-il/dictabert-morph"
+ABBREVIATIONS_FILE = "simple_abbreviations_dict.py"
+# האינדקס המקומפל (ראה nikud_abbreviations.py) - נבנה מחדש כשקובץ המילון משתנה
+ABBREVIATIONS_INDEX = "simple_abbreviations_dict.idx"
+
+# מודלים מיוצאים ל-ONNX (ראה nikud_onnx.py export)
+DEFAULT_ONNX_DIR = "./onnx_models"
+ONNX_MODEL_DIRS = {
+    'dictabert_nikud': 'dictabert-nikud',
+    'morph_model': 'dictabert-morph',
+}
+
+# מספר מילות הקשר מכל צד של מילה במחלוקת בניתוח המורפולוגי
+DEFAULT_MORPH_CONTEXT = 3
+
+# חלונות לפסקאות ארוכות: מילות חפיפה מכל צד, ואורך מקסימלי אם ל-tokenizer אין model_max_length
+DEFAULT_WINDOW_OVERLAP = 8
+DEFAULT_MODEL_MAX_LENGTH = 512
+
+# גודל אצווה ברירת מחדל ל-process_many
+DEFAULT_BATCH_SIZE = 32
+
+# תקציב זיכרון למטמון תוצאות המורפולוגיה (משפטים וטווחים שכבר נותחו)
+DEFAULT_MORPH_CACHE_BYTES = 64 * 1024 * 1024
+
+# סימון ל"מורפולוגיה לא חושבה עדיין" (None פירושו שהניתוח נכשל)
+_MORPH_NOT_COMPUTED = object()
+
+# הכרעות שנוצרו כשאחד המנועים לא זמין או נכשל (Nakdimon / המורפולוגיה)
+DEGRADED_SOURCES = ('DictaBERT', 'DictaBERT (no morph)')
+
+# שקט כברירת מחדל - ראה nikud_logging.configure_logging
+_log = get_logger('pipeline')
+
+
+def _ensure_utf8_stdout():
+    """עוטף את stdout ב-UTF-8 (נקרא מה-CLI בלבד, לא בזמן import)"""
+    encoding = (getattr(sys.stdout, 'encoding', None) or '').lower()
+    if encoding.replace('-', '') != 'utf8' and hasattr(sys.stdout, 'buffer'):
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def _resolve_model_path(local_path, hub_name):
+    """מחזיר את העותק המקומי של המודל אם קיים, אחרת את שם המודל ב-Hub"""
+    return local_path if Path(local_path).exists() else hub_name
+
+
+def _load_dictabert_model(path):
+    """טוען tokenizer + מודל DictaBERT (remote code) במצב eval"""
+    from transformers import AutoTokenizer, AutoModel
+    
+    model = {
+        'tokenizer': AutoTokenizer.from_pretrained(path),
+        'model': AutoModel.from_pretrained(path, trust_remote_code=True)
+    }
+    model['model'].eval()
+    return model
+
+
+class _LazyModel:
+    """
+    מודל שנטען בשימוש הראשון
+    
+    הטעינה מוגנת ב-lock כך שכמה threads (למשל במצב המקבילי) לא יטענו
+    את אותו מודל פעמיים. prefetch() מתחיל טעינה ברקע.
+    """
+    
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self._prefetch_thread = None
+    
+    @property
+    def loaded(self):
+        return self._loaded
+    
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._loader()
+                    self._loaded = True
+        return self._value
+    
+    def set(self, value):
+        with self._lock:
+            self._value = value
+            self._loaded = True
+    
+    def prefetch(self):
+        if self._loaded or self._prefetch_thread is not None:
+            return self._prefetch_thread
+        self._prefetch_thread = threading.Thread(
+            target=self.get,
+            name=f"prefetch-{self.name}",
+            daemon=True
+        )
+        self._prefetch_thread.start()
+        return self._prefetch_thread
+
+
+def _lazy_model_property(name):
+    """property שמחזיר את המודל (וטוען אותו אם צריך), ומאפשר להחליף אותו"""
+    
+    def getter(self):
+        return self._models[name].get()
+    
+    def setter(self, value):
+        self._models[name].set(value)
+    
+    return property(getter, setter)
+
+
+def _morph_token_for_word(analysis, words, position):
+    """
+    מוצא בניתוח המורפולוגי של טווח את הטוקן של המילה במקום position
+    
+    מחפש לפי טקסט המילה (המופע המתאים אם היא חוזרת), ואם לא נמצא -
+    לפי המיקום, כשמספר הטוקנים שווה למספר המילים.
+    """
+    tokens = analysis.get('tokens', [])
+    word = words[position]
+    occurrence = words[:position].count(word)
+    matches = [t for t in tokens if t.get('token') == word]
+    if len(matches) > occurrence:
+        return matches[occurrence]
+    if len(tokens) == len(words):
+        return tokens[position]
+    return None
+
+
+def is_degraded(decision):
+    """
+    האם ההכרעה נוצרה בלי אחד המנועים (כישלון, או מנוע שלא נטען)
+
+    הכרעה כזו טובה לתשובה הנוכחית, אבל לא נשמרת במטמון - אחרת היא
+    הייתה מוגשת גם אחרי שהמנוע חוזר לעבוד.
+    """
+    return decision['text'] is None or decision['source'] in DEGRADED_SOURCES
+
+
+def dispute_decision(text, alternative, word_decisions, analyzed=True):
+    """
+    ההכרעה לפי המילים שבמחלוקת (הכללים של decide_nikud)
+    
+    Args:
+        text: הפלט של DictaBERT
+        alternative: הפלט של Nakdimon
+        word_decisions: ההכרעה לכל מילה שבמחלוקת (disputed_words)
+        analyzed: האם המורפולוגיה ניתחה לפחות טווח אחד
+    """
+    if not word_decisions:
+        return {
+            'text': text,
+            'source': 'Both (identical)',
+            'confidence': 'very_high',
+            'notes': 'שני המודלים מסכימים'
+        }
+    
+    if not analyzed:
+        # אין מורפולוגיה - העדף DictaBERT אבל סמן לבדיקה
+        return {
+            'text': text,
+            'source': 'DictaBERT (no morph)',
+            'confidence': 'medium',
+            'notes': 'לא ניתן לנתח מורפולוגיה',
+            'alternative': alternative,
+            'disputed_words': word_decisions,
+            'requires_review': True
+        }
+    
+    unclear = [w for w in word_decisions if w['requires_review']]
+    if not unclear:
+        # המורפולוגיה של כל המילים שבמחלוקת ברורה -> סמוך על DictaBERT
+        return {
+            'text': text,
+            'source': 'DictaBERT (with morph)',
+            'confidence': 'high',
+            'notes': 'מורפולוגיה ברורה, DictaBERT אמין יותר',
+            'alternative': alternative,
+            'disputed_words': word_decisions
+        }
+    
+    # יש ספק -> הצג שתי אפשרויות, רק המילים הלא ברורות דורשות בדיקה
+    return {
+        'text': text,
+        'source': 'DictaBERT (uncertain)',
+        'confidence': 'medium',
+        'notes': sys.intern(f'יש {len(unclear)} מילים לא ברורות'),
+        'alternative': alternative,
+        'disputed_words': word_decisions,
+        'requires_review': True
+    }
+
+
+def _analysis_size(key, analysis):
+    """הערכת זיכרון (בבתים) לניתוח מורפולוגי שמור"""
+    return 200 + 2 * len(key) + 400 * len(analysis.get('tokens', ()))
+
+
+def _chunks(items, size):
+    """מחלק רשימה לאצוות בגודל קבוע"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 class HebrewNikudPipeline:
     """
     פייפליין מלא לניקוד עברי עם הכרעה חכמה
+    
+    מצב מקבילי: workers >= 2 מריץ את DictaBERT (torch) ואת Nakdimon
+    (TF/Keras) בו-זמנית במאגר threads - שתי הספריות משחררות את ה-GIL
+    בזמן החישוב, כך שזמן משפט יורד לזמן המנוע האיטי מבין השניים.
+    עם speculative_morph=True ו-workers >= 3 גם המורפולוגיה רצה במקביל,
+    ותוצאתה משמשת רק אם המנועים לא מסכימים.
+    
+    כל מודל נטען רק בשימוש הראשון בו. load_models() טוען הכל מראש
+    (את מילון ראשי התיבות רק עם expand_abbreviations), ו-prefetch()
+    מתחיל טעינה ברקע בלי לחכות לה.
+    
+    cache (NikudResultCache, ראה enable_cache) שומר הכרעות מלאות לפי
+    הטקסט המנורמל וזהות המודלים, כך שמשפט חוזר לא מריץ שוב אף מודל.
+    
+    max_batch_tokens מגביל כל אצווה של DictaBERT לפי טוקנים מרופדים
+    (ראה nikud_batching), ו-batch_size מגביל את מספר המשפטים בה.
+    
+    backend='onnx' מריץ את DictaBERT-nikud ו-DictaBERT-morph ב-ONNX Runtime
+    מתוך onnx_dir, בלי torch ובלי transformers (ראה nikud_onnx).
+    
+    cpu_fast=True מריץ את מודלי DictaBERT בקוונטיזציה int8 תחת
+    torch.inference_mode() (ראה nikud_cpu - שם גם בדיקת הדיוק מול fp32).
+    
+    expand_abbreviations=True מרחיב ראשי תיבות (ב"ה -> ברוך השם) לפי
+    האינדקס המקומפל לפני שהמודלים רצים; ההכרעה מקבלת 'abbreviations'
+    עם הקיצורים שהורחבו. ההרחבה משנה את טקסט הפלט (הקיצור לא חוזר
+    אליו), ולכן היא כבויה כברירת מחדל.
+    
+    skip_margin מפעיל שער ביטחון: משפט שבו לכל אות מרווח ביטחון של
+    DictaBERT (p של המחלקה שנבחרה פחות p של השנייה) של skip_margin
+    לפחות לא עובר ב-Nakdimon ובמורפולוגיה (ראה nikud_confidence).
+    
+    lexicon (Lexicon, ראה nikud_lexicon / load_lexicon) מנקד טקסטים
+    שמכוסים כולם בביטויים ששני המנועים כבר הסכימו עליהם, בלי להריץ
+    את המנועים.
+    
+    כל טקסט עובר טוקניזציה פעם אחת לכל tokenizer (encodings, ראה
+    nikud_encoding), ומשפט או טווח שכבר נותח מורפולוגית לא מנותח שוב
+    (morph_cache, מוגבל ל-morph_cache_bytes).
+    
+    stats (PipelineStats) מקבל מדידה לכל שלב: tokenization, dictabert,
+    nakdimon, morph, decision ו-cache. NIKUD_PROFILE=cprofile/torch
+    מפעיל פרופיילר שנשמר לקובץ ב-close().
     """
     
-    def __init__(self):
-        self.dictabert_nikud = None
-        self.nakdimon = None
-        self.morph_model = None
-        self.abbreviations_dict = {}
+    dictabert_nikud = _lazy_model_property('dictabert_nikud')
+    nakdimon = _lazy_model_property('nakdimon')
+    morph_model = _lazy_model_property('morph_model')
+    abbreviations_dict = _lazy_model_property('abbreviations_dict')
+    
+    def __init__(self, workers=None, speculative_morph=False, cache=None,
+                 nikud_path=None, morph_path=None,
+                 morph_context=DEFAULT_MORPH_CONTEXT, stats=None,
+                 max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS,
+                 window_overlap=DEFAULT_WINDOW_OVERLAP,
+                 cpu_fast=False, cpu_threads=None,
+                 backend='torch', onnx_dir=DEFAULT_ONNX_DIR,
+                 expand_abbreviations=False, lexicon=None, skip_margin=None,
+                 encoding_cache_bytes=DEFAULT_ENCODING_CACHE_BYTES,
+                 morph_cache_bytes=DEFAULT_MORPH_CACHE_BYTES):
+        if backend not in ('torch', 'onnx'):
+            raise ValueError(f"backend לא מוכר: {backend!r}")
+        self.backend = backend
+        if backend == 'onnx':
+            nikud_path = nikud_path or str(Path(onnx_dir) / ONNX_MODEL_DIRS['dictabert_nikud'])
+            morph_path = morph_path or str(Path(onnx_dir) / ONNX_MODEL_DIRS['morph_model'])
+
+        self.model_paths = {
+            'dictabert_nikud': nikud_path or _resolve_model_path(
+                DICTABERT_NIKUD_PATH, DICTABERT_NIKUD_HUB),
+            'morph_model': morph_path or _resolve_model_path(
+                DICTABERT_MORPH_PATH, DICTABERT_MORPH_HUB),
+        }
+        self._models = {
+            'dictabert_nikud': _LazyModel('dictabert_nikud', self._load_dictabert_nikud),
+            'nakdimon': _LazyModel('nakdimon', self._load_nakdimon),
+            'morph_model': _LazyModel('morph_model', self._load_morph_model),
+            'abbreviations_dict': _LazyModel('abbreviations_dict', self._load_abbreviations),
+        }
+        
+        self.workers = workers or 1
+        self.speculative_morph = speculative_morph
+        self._executor = None
+        self.cache = cache
+        self.morph_context = morph_context
+        self.max_batch_tokens = max_batch_tokens
+        self.window_overlap = window_overlap
+        self.cpu_fast = cpu_fast
+        self.cpu_threads = cpu_threads
+        self.expand_abbreviations = expand_abbreviations
+        self.skip_margin = skip_margin
+        self.encodings = EncodingCache(encoding_cache_bytes)
+        self.morph_cache = MemoryBudgetLRU(morph_cache_bytes, _analysis_size)
+        # נתיב לקובץ לקסיקון (למשל מ-pipeline_kwargs של PipelinePool) או Lexicon
+        self.lexicon = Lexicon.load(lexicon) if isinstance(lexicon, (str, Path)) else lexicon
+        self.stats = stats if stats is not None else PipelineStats()
+        self.profiler = profiler_from_env()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """סוגר את מאגר ה-threads של המצב המקבילי, את המטמון ואת הפרופיילר"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.close()
+        if self._models['abbreviations_dict'].loaded and self.abbreviations_dict is not None:
+            self.abbreviations_dict.close()
+        self.profiler.close()
+    
+    def model_fingerprint(self):
+        """
+        טביעת אצבע של המודלים שהפייפליין משתמש בהם (בלי לטעון אותם)
+        
+        משמשת כחלק ממפתח המטמון - החלפת מודל, נתיב או פרמטר שמשפיע על
+        ההכרעה מבטלת הכרעות ישנות.
+        """
+        return make_fingerprint({
+            'dictabert_nikud': model_identity(self.model_paths['dictabert_nikud']),
+            'morph_model': model_identity(self.model_paths['morph_model']),
+            'nakdimon': package_version('nakdimon'),
+            'cpu_fast': self.cpu_fast,
+            'backend': self.backend,
+            'abbreviations': self.expand_abbreviations and file_identity(ABBREVIATIONS_FILE),
+            'lexicon': self.lexicon.identity if self.lexicon is not None else None,
+            'skip_margin': self.skip_margin,
+            'morph_context': self.morph_context,
+            'window_overlap': self.window_overlap,
+            'speculative_morph': self.speculative_morph,
+        })
+    
+    def enable_cache(self, db_path=None, memory_size=DEFAULT_MEMORY_SIZE):
+        """
+        מפעיל מטמון הכרעות: LRU בזיכרון + קובץ sqlite אופציונלי
+        
+        רק הכרעות שכל המנועים השתתפו בהן נשמרות (ראה is_degraded).
+        
+        Args:
+            db_path: קובץ sqlite שנשמר בין ריצות (None = זיכרון בלבד)
+            memory_size: מספר ההכרעות המקסימלי בזיכרון
+        """
+        if self.cache is not None:
+            self.cache.close()
+        self.cache = NikudResultCache(
+            self.model_fingerprint(), db_path=db_path, memory_size=memory_size
+        )
+        return self.cache
+    
+    def load_lexicon(self, path):
+        """טוען לקסיקון ניקוד (nikud_lexicon.py build) ומעדכן את המטמון"""
+        self.lexicon = Lexicon.load(path)
+        if self.cache is not None:
+            self.cache.invalidate(self.model_fingerprint())
+        return self.lexicon
+    
+    def set_model_path(self, name, path):
+        """
+        מחליף את הנתיב של מודל DictaBERT ('dictabert_nikud' או 'morph_model')
+        
+        המודל ייטען מחדש בשימוש הבא, והמטמון מתבטל כי ההכרעות בו
+        חושבו עם המודל הקודם.
+        """
+        loaders = {
+            'dictabert_nikud': self._load_dictabert_nikud,
+            'morph_model': self._load_morph_model,
+        }
+        if name not in loaders:
+            raise ValueError(f"אין נתיב למודל {name!r}")
+        
+        self.model_paths[name] = path
+        self._models[name] = _LazyModel(name, loaders[name])
+        if name == 'morph_model':
+            self.morph_cache.clear()
+        if self.cache is not None:
+            self.cache.invalidate(self.model_fingerprint())
+    
+    def _get_executor(self):
+        """מחזיר את מאגר ה-threads, או None במצב סדרתי"""
+        if self.workers < 2:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="nikud"
+            )
+        return self._executor
+    
+    def _run_engines(self, dictabert_fn, nakdimon_fn, morph_fn=None):
+        """
+        מריץ את שני מנועי הניקוד (ואופציונלית מורפולוגיה ספקולטיבית)
+        
+        מחזיר (dictabert, nakdimon, morph_future). במצב סדרתי הכל רץ
+        בזה אחר זה ו-morph_future הוא None.
+        """
+        executor = self._get_executor()
+        if executor is None:
+            return dictabert_fn(), nakdimon_fn(), None
         
-    def load_models(self):
-        """טוען את כל המודלים הנדרשים"""
-        print("=" * 70)
-        print("טוען מודלים...")
-        print("=" * 70)
+        dictabert_future = executor.submit(dictabert_fn)
+        nakdimon_future = executor.submit(nakdimon_fn)
+        morph_future = None
+        if morph_fn is not None and self.speculative_morph and self.workers >= 3:
+            morph_future = executor.submit(morph_fn)
+        return dictabert_future.result(), nakdimon_future.result(), morph_future
         
-        # 1. טען DictaBERT-nikud
+    def _default_models(self):
+        """המודלים שהפייפליין ישתמש בהם - מילון ראשי התיבות רק עם expand_abbreviations"""
+        return tuple(
+            name for name in self._models
+            if name != 'abbreviations_dict' or self.expand_abbreviations
+        )
+    
+    def load_models(self, *names):
+        """
+        טוען מודלים מיד, בלי לחכות לשימוש הראשון (ברירת מחדל: כל מה
+        שהפייפליין משתמש בו)
+        """
+        names = names or self._default_models()
+        start = time.perf_counter()
+        for name in names:
+            self._models[name].get()
+        log_event(_log, logging.INFO, 'models_loaded',
+                  seconds=round(time.perf_counter() - start, 3),
+                  models={name: getattr(self, name) is not None for name in names})
+    
+    def loaded_models(self):
+        """מילון שם מודל -> האם כבר נטען"""
+        return {name: lazy.loaded for name, lazy in self._models.items()}
+    
+    def prefetch(self, *names):
+        """
+        מתחיל לטעון מודלים ברקע (ברירת מחדל: כל מה שהפייפליין משתמש בו)
+        
+        שימוש במודל לפני שהטעינה הסתיימה פשוט ימתין לה.
+        מחזיר את ה-threads שהופעלו.
+        """
+        names = names or self._default_models()
+        threads = [self._models[name].prefetch() for name in names]
+        return [thread for thread in threads if thread is not None]
+    
+    def _load_failed(self, name, error, level=logging.ERROR):
+        self.stats.count(f'errors.load.{name}')
+        log_event(_log, level, 'model_load_failed', model=name, error=str(error))
+    
+    def _load_dictabert_nikud(self):
+        """טוען DictaBERT-nikud"""
         try:
-            from transformers import AutoTokenizer, AutoModel
-            
-            nikud_path = "./downloaded_models/dictabert-nikud"
-            if not Path(nikud_path).exists():
-                nikud_path = "dicta-il/dictabert-nikud"
-            
-            print(f"\n1. טוען DictaBERT-nikud...")
-            self.dictabert_nikud = {
-                'tokenizer': AutoTokenizer.from_pretrained(nikud_path),
-                'model': AutoModel.from_pretrained(nikud_path, trust_remote_code=True)
-            }
-            self.dictabert_nikud['model'].eval()
-            print("   ✓ DictaBERT-nikud נטען")
-            
+            model = self._load_dictabert('dictabert_nikud', 'nikud')
+            log_event(_log, logging.INFO, 'model_loaded', model='dictabert_nikud',
+                      path=self.model_paths['dictabert_nikud'], backend=self.backend)
+            return model
         except Exception as e:
-            print(f"   ✗ שגיאה בטעינת DictaBERT-nikud: {e}")
-        
-        # 2. טען Nakdimon (אופציונלי)
+            self._load_failed('dictabert_nikud', e)
+            return None
+    
+    def _load_dictabert(self, name, kind):
+        """טוען מודל DictaBERT לפי ה-backend: remote code של torch או ONNX Runtime"""
+        path = self.model_paths[name]
+        if self.backend == 'onnx':
+            from nikud_onnx import load_onnx_model
+            model = load_onnx_model(path, kind, self.cpu_threads)
+            model['tokenizer'].cache = self.encodings
+            return model
+        return self._prepare_model(_load_dictabert_model(path))
+    
+    def _prepare_model(self, model):
+        """מחיל את מצב cpu-fast / הגבלת threads על מודל DictaBERT שנטען"""
+        if self.cpu_fast:
+            from nikud_cpu import apply_cpu_fast
+            return apply_cpu_fast(model, self.cpu_threads)
+        if self.cpu_threads:
+            from nikud_cpu import tune_cpu_threads
+            tune_cpu_threads(self.cpu_threads)
+        return model
+    
+    def _load_nakdimon(self):
+        """טוען Nakdimon (אופציונלי)"""
         try:
-            print("\n2. טוען Nakdimon...")
             from nakdimon import Nakdimon
-            self.nakdimon = Nakdimon()
-            print("   ✓ Nakdimon נטען")
+            nakdimon = Nakdimon()
+            log_event(_log, logging.INFO, 'model_loaded', model='nakdimon')
+            return nakdimon
         except Exception as e:
-            print(f"   ✗ Nakdimon לא זמין: {e}")
-        
-        # 3. טען DictaBERT-morph למורפולוגיה
+            # Nakdimon אופציונלי - בלעדיו ההכרעה היא DictaBERT בלבד
+            self._load_failed('nakdimon', e, logging.WARNING)
+            return None
+    
+    def _load_morph_model(self):
+        """טוען DictaBERT-morph למורפולוגיה"""
         try:
-            morph_path = "./downloaded_models/dictabert-morph"
-            if not Path(morph_path).exists():
-                morph_path = "dicta-il/dictabert-morph"
-            
-            print(f"\n3. טוען DictaBERT-morph...")
-            self.morph_model = {
-                'tokenizer': AutoTokenizer.from_pretrained(morph_path),
-                'model': AutoModel.from_pretrained(morph_path, trust_remote_code=True)
-            }
-            self.morph_model['model'].eval()
-            print("   ✓ DictaBERT-morph נטען")
-            
+            model = self._load_dictabert('morph_model', 'morph')
+            log_event(_log, logging.INFO, 'model_loaded', model='morph_model',
+                      path=self.model_paths['morph_model'], backend=self.backend)
+            return model
         except Exception as e:
-            print(f"   ✗ שגיאה בטעינת Morph: {e}")
-        
-        # 4. טען מילון קיצורים
+            self._load_failed('morph_model', e)
+            return None
+    
+    def _load_abbreviations(self):
+        """טוען את אינדקס הקיצורים המקומפל (ומקמפל אותו אם המילון השתנה)"""
         try:
-            print("\n4. טוען מילון קיצורים...")
-            abbrev_file = Path("simple_abbreviations_dict.py")
-            if abbrev_file.exists():
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("abbrev_dict", abbrev_file)
-                abbrev_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(abbrev_module)
-                self.abbreviations_dict = abbrev_module.ABBREVIATIONS
-                print(f"   ✓ מילון עם {len(self.abbreviations_dict)} קיצורים")
-            else:
-                print("   ✗ קובץ מילון לא נמצא")
+            index = load_abbreviation_index(ABBREVIATIONS_FILE, ABBREVIATIONS_INDEX)
+            if index is not None:
+                log_event(_log, logging.INFO, 'model_loaded', model='abbreviations_dict',
+                          entries=len(index))
+                return index
+            log_event(_log, logging.WARNING, 'abbreviations_missing', path=ABBREVIATIONS_FILE)
         except Exception as e:
-            print(f"   ✗ שגיאה בטעינת מילון: {e}")
+            self._load_failed('abbreviations_dict', e)
+        return None
+    
+    def expand_abbreviations_many(self, texts):
+        """
+        מרחיב ראשי תיבות בכל טקסט (מעבר אחד על כל משפט)
         
-        print("\n" + "=" * 70)
-        print("סיום טעינה")
-        print("=" * 70)
+        Returns:
+            (טקסטים מורחבים, לכל טקסט רשימת (קיצור, הרחבה))
+        """
+        index = self.abbreviations_dict
+        if index is None:
+            return list(texts), [[] for _ in texts]
+        with self.stats.stage('abbreviations', len(texts)):
+            expanded = [index.expand(text) for text in texts]
+        return [text for text, _ in expanded], [found for _, found in expanded]
     
     def get_morphology(self, sentence):
         """מנתח מורפולוגיה של משפט"""
+        return self.get_morphology_many([sentence], batch_size=1)[0]
+    
+    def get_morphology_many(self, sentences, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מנתח מורפולוגיה לרשימת משפטים באצוות - תוצאה אחת לכל משפט
+        
+        ניתוחים נשמרים ב-morph_cache, כך שמשפט או טווח שכבר נותח בעבודה
+        הנוכחית לא רץ שוב במודל. התוצאות משותפות - לקריאה בלבד.
+        """
         if not self.morph_model:
-            return None
+            return [None] * len(sentences)
         
-        try:
-            result = self.morph_model['model'].predict(
-                [sentence], 
-                self.morph_model['tokenizer']
-            )
-            return result[0] if result else None
-        except Exception as e:
-            print(f"שגיאה בניתוח מורפולוגי: {e}")
-            return None
+        sentences = list(sentences)
+        start = time.perf_counter()
+        results = [self.morph_cache.get(sentence) for sentence in sentences]
+        missing = [i for i, result in enumerate(results) if result is None]
+        self.stats.record(
+            'morph_cache', time.perf_counter() - start, len(sentences),
+            cache_hits=len(sentences) - len(missing), cache_misses=len(missing)
+        )
+        if not missing:
+            return results
+        
+        unique = list(dict.fromkeys(sentences[i] for i in missing))
+        analyzed = dict(zip(unique, self._predict_batched(
+            self.morph_model, unique, batch_size, 'morph', "ניתוח מורפולוגי"
+        )))
+        for sentence, analysis in analyzed.items():
+            if analysis is not None:
+                self.morph_cache.put(sentence, analysis)
+        for i in missing:
+            results[i] = analyzed[sentences[i]]
+        return results
+    
+    def _predict_batched(self, model_entry, texts, batch_size, stage, label, predict=None):
+        """
+        מריץ predict() של מודל DictaBERT על אצוות שלמות
+        
+        הטקסטים ממוינים לפי אורך בטוקנים ומחולקים לאצוות תחת תקציב של
+        max_batch_tokens טוקנים מרופדים (ועד batch_size טקסטים), כדי לא
+        לבזבז חישוב על ריפוד. התוצאות חוזרות בסדר המקורי.
+        
+        אצווה שנכשלה מחזירה None לכל הפריטים שבה, כמו בקריאה הבודדת.
+        זמני הטוקניזציה וה-forward נרשמים ב-stats תחת 'tokenization' ו-stage.
+        
+        predict(model, batch, tokenizer) מחליף את model.predict (למשל
+        predict_with_margins).
+        """
+        texts = list(texts)
+        with self.stats.stage('tokenization', len(texts)):
+            lengths = token_lengths(model_entry['tokenizer'], texts, self.encodings)
+        
+        results = [None] * len(texts)
+        for indices in plan_batches(lengths, self.max_batch_tokens, batch_size):
+            batch = [texts[i] for i in indices]
+            tokens = max(lengths[i] for i in indices) * len(indices)
+            try:
+                with self.stats.stage(stage, len(batch), tokens):
+                    if predict is None:
+                        predicted = model_entry['model'].predict(
+                            batch,
+                            model_entry['tokenizer']
+                        )
+                    else:
+                        predicted = predict(model_entry['model'], batch, model_entry['tokenizer'])
+                if not predicted or len(predicted) != len(batch):
+                    continue
+            except Exception as e:
+                self.stats.count(f'errors.{stage}')
+                log_event(_log, logging.ERROR, 'predict_failed', stage=stage, task=label,
+                          batch=len(batch), error=str(e))
+                continue
+            for i, result in zip(indices, predicted):
+                results[i] = result
+        return results
     
     def nikud_with_dictabert(self, text):
         """מנקד עם DictaBERT"""
-        if not self.dictabert_nikud:
-            return None
-        
-        try:
-            result = self.dictabert_nikud['model'].predict(
-                [text],
-                self.dictabert_nikud['tokenizer']
-            )
-            return result[0] if result else None
-        except Exception as e:
-            print(f"שגיאה בניקוד DictaBERT: {e}")
-            return None
+        return self.nikud_many_with_dictabert([text], batch_size=1)[0]
     
     def nikud_with_nakdimon(self, text):
         """מנקד עם Nakdimon"""
@@ -129,22 +675,182 @@ class HebrewNikudPipeline:
             return None
         
         try:
-            return self.nakdimon.nakdan(text)
+            with self.stats.stage('nakdimon'):
+                return self.nakdimon.nakdan(text)
         except Exception as e:
-            print(f"שגיאה בניקוד Nakdimon: {e}")
+            self.stats.count('errors.nakdimon')
+            log_event(_log, logging.ERROR, 'nakdimon_failed', batch=1, error=str(e))
             return None
     
-    def decide_nikud(self, text, dictabert_result, nakdimon_result):
+    def nikud_many_with_dictabert(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מנקד רשימת טקסטים עם DictaBERT באצוות
+        
+        טקסט ארוך מהאורך המקסימלי של המודל מחולק לחלונות (לפי סוף משפט,
+        ובמשפט ארוך מדי - חלונות חופפים), כל החלונות של כל הטקסטים רצים
+        יחד באותן אצוות, והפלט מורכב בחזרה לטקסט אחד בלי תפרים.
+        """
+        if not self.dictabert_nikud:
+            return [None] * len(texts)
+        
+        max_chars = self._max_window_chars(self.dictabert_nikud['tokenizer'])
+        segments = []
+        plans = []
+        for text in texts:
+            if len(text) <= max_chars:
+                plans.append(None)
+                segments.append(text)
+                continue
+            spans, windows = plan_windows(text, max_chars, self.window_overlap)
+            plans.append((spans, windows, len(segments)))
+            segments.extend(window_texts(text, spans, windows))
+        
+        outputs = self._predict_batched(
+            self.dictabert_nikud, segments, batch_size, 'dictabert', "ניקוד DictaBERT"
+        )
+        if all(plan is None for plan in plans):
+            return outputs
+        
+        results = []
+        position = 0
+        for text, plan in zip(texts, plans):
+            if plan is None:
+                results.append(outputs[position])
+                position += 1
+                continue
+            spans, windows, first = plan
+            stitched = stitch_windows(
+                text, spans, windows, outputs[first:first + len(windows)]
+            )
+            if stitched is None:
+                self.stats.count('errors.windows')
+            results.append(stitched)
+            position = first + len(windows)
+        return results
+    
+    def nikud_many_with_margins(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מנקד עם DictaBERT ומחזיר לכל טקסט (טקסט מנוקד, מרווח לכל תו)
+        
+        טקסט שדורש חלונות מנוקד כרגיל ומקבל margins=None, וכך גם טקסט
+        שהניקוד שלו נכשל (הטקסט None) - שניהם לא עוברים בשער הביטחון.
+        """
+        texts = list(texts)
+        if not self.dictabert_nikud:
+            return [(None, None)] * len(texts)
+        
+        max_chars = self._max_window_chars(self.dictabert_nikud['tokenizer'])
+        short = [i for i, text in enumerate(texts) if len(text) <= max_chars]
+        long = [i for i, text in enumerate(texts) if len(text) > max_chars]
+        
+        results = [(None, None)] * len(texts)
+        outputs = self._predict_batched(
+            self.dictabert_nikud, [texts[i] for i in short], batch_size,
+            'dictabert', "ניקוד DictaBERT", predict=predict_with_margins
+        )
+        for i, output in zip(short, outputs):
+            if output is not None:
+                results[i] = output
+        if long:
+            windowed = self.nikud_many_with_dictabert([texts[i] for i in long], batch_size)
+            for i, text in zip(long, windowed):
+                results[i] = (text, None)
+        return results
+    
+    @staticmethod
+    def _max_window_chars(tokenizer):
+        """
+        אורך הטקסט המקסימלי (בתווים) שאפשר לשלוח ל-DictaBERT-nikud
+        
+        המודל עובד ברמת תו, ו-predict() דורש len(text) + 2 <= model_max_length.
+        """
+        max_length = getattr(tokenizer, 'model_max_length', None)
+        if not isinstance(max_length, int) or not 2 < max_length <= 100_000:
+            max_length = DEFAULT_MODEL_MAX_LENGTH
+        return max_length - 2
+    
+    def nikud_many_with_nakdimon(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מנקד רשימת טקסטים עם Nakdimon
+        
+        Nakdimon מחלק את הקלט לשורות ומריץ אותן כאצווה אחת, לכן כל אצווה
+        נשלחת כטקסט אחד מופרד בשורות חדשות. אם טקסט מכיל שורה חדשה
+        או שמספר השורות בפלט לא תואם - חוזרים לקריאה לכל טקסט בנפרד.
+        """
+        if not self.nakdimon:
+            return [None] * len(texts)
+        
+        results = []
+        for batch in _chunks(list(texts), batch_size):
+            if len(batch) > 1 and not any('\n' in text for text in batch):
+                try:
+                    with self.stats.stage('nakdimon', len(batch)):
+                        lines = self.nakdimon.nakdan('\n'.join(batch)).split('\n')
+                    if len(lines) == len(batch):
+                        results.extend(lines)
+                        continue
+                except Exception as e:
+                    self.stats.count('errors.nakdimon')
+                    log_event(_log, logging.ERROR, 'nakdimon_failed', batch=len(batch),
+                              error=str(e))
+            results.extend(self.nikud_with_nakdimon(text) for text in batch)
+        return results
+    
+    @staticmethod
+    def dispute_words(text, dictabert_result):
+        """
+        המילים (בלי ניקוד) שהאינדקסים של disputed_words() מתייחסים אליהם
+        
+        האינדקסים נלקחים מחלוקת הפלט של DictaBERT למילים, ולכן גם המילים
+        שנשלחות למורפולוגיה נלקחות ממנו ולא מ-text.split() - אחרת רווחים
+        שונים בקלט ובפלט מזיזים את הטווחים.
+        """
+        if dictabert_result:
+            return remove_nikud(dictabert_result).split()
+        return text.split()
+    
+    def dispute_spans(self, text, dictabert_result, nakdimon_result):
+        """
+        מוצא את המילים שבמחלוקת ואת טווחי ההקשר שעליהם תרוץ המורפולוגיה
+        
+        Returns:
+            (disputes, spans) - disputes היא רשימת (אינדקס, מילת DictaBERT,
+            מילת Nakdimon), ו-spans רשימת טווחי מילים [start, end) ב-
+            dispute_words() - אותה חלוקה למילים כמו האינדקסים
+        """
+        words = self.dispute_words(text, dictabert_result)
+        disputes = disputed_words(dictabert_result or text, nakdimon_result)
+        spans = context_spans(
+            [index for index, _, _ in disputes], len(words), self.morph_context
+        )
+        return disputes, spans
+    
+    def decide_nikud(self, text, dictabert_result, nakdimon_result,
+                     morph=_MORPH_NOT_COMPUTED, span_morphs=None):
         """
         מכריע בין DictaBERT ל-Nakdimon
         
         לוגיקה:
         1. אם אין הבדל -> החזר DictaBERT
         2. אם יש הבדל:
-           a. בדוק מורפולוגיה
-           b. אם המורפולוגיה ברורה -> סמוך על DictaBERT
-           c. אם יש ספק -> הצג למשתמש
+           a. מצא רק את המילים שבמחלוקת (יישור מילה-מול-מילה)
+           b. בדוק מורפולוגיה על חלון של morph_context מילים סביבן
+           c. אם המורפולוגיה של מילה ברורה -> סמוך על DictaBERT
+           d. אם יש ספק -> סמן את המילה לבדיקה
+        
+        אפשר להעביר morph של המשפט כולו, או span_morphs - ניתוח לכל טווח
+        מ-dispute_spans() - שכבר חושבו (למשל באצווה) כדי לא לנתח שוב.
         """
+        # DictaBERT נכשל - אין טקסט להכריע עליו; הכרעה כושלת לא נשמרת
+        # במטמון ותרוץ שוב בפעם הבאה
+        if dictabert_result is None:
+            return {
+                'text': None,
+                'source': 'DictaBERT',
+                'confidence': 'high',
+                'notes': 'DictaBERT לא זמין'
+            }
+
         # אם אין Nakdimon, החזר DictaBERT
         if not nakdimon_result:
             return {
@@ -163,74 +869,91 @@ class HebrewNikudPipeline:
                 'notes': 'שני המודלים מסכימים'
             }
         
-        # יש הבדל - נבדוק מורפולוגיה
-        morph = self.get_morphology(text)
-        
-        if morph:
-            # אם המורפולוגיה ברורה (למשל, יש POS ברור לכל מילה)
-            tokens = morph.get('tokens', [])
-            unclear_tokens = [t for t in tokens if not t.get('pos')]
-            
-            if len(unclear_tokens) == 0:
-                # המורפולוגיה ברורה -> סמוך על DictaBERT
-                return {
-                    'text': dictabert_result,
-                    'source': 'DictaBERT (with morph)',
-                    'confidence': 'high',
-                    'notes': 'מורפולוגיה ברורה, DictaBERT אמין יותר',
-                    'alternative': nakdimon_result
-                }
-            else:
-                # יש ספק -> הצג שתי אפשרויות
-                return {
-                    'text': dictabert_result,
-                    'source': 'DictaBERT (uncertain)',
-                    'confidence': 'medium',
-                    'notes': f'יש {len(unclear_tokens)} מילים לא ברורות',
-                    'alternative': nakdimon_result,
-                    'requires_review': True
-                }
-        else:
-            # אין מורפולוגיה - העדף DictaBERT אבל סמן לבדיקה
+        # יש הבדל - נמצא את המילים שבמחלוקת ונבדוק מורפולוגיה רק סביבן
+        disputes, spans = self.dispute_spans(text, dictabert_result, nakdimon_result)
+        if not disputes:
+            # הפלטים שונים רק ברווחים - זו הסכמה, ואין צורך במורפולוגיה
             return {
                 'text': dictabert_result,
-                'source': 'DictaBERT (no morph)',
-                'confidence': 'medium',
-                'notes': 'לא ניתן לנתח מורפולוגיה',
-                'alternative': nakdimon_result,
-                'requires_review': True
+                'source': 'Both (identical)',
+                'confidence': 'very_high',
+                'notes': 'שני המודלים מסכימים (הבדלי רווחים בלבד)'
             }
+        words = self.dispute_words(text, dictabert_result)
+        
+        if morph is not _MORPH_NOT_COMPUTED:
+            # ניתוח של המשפט כולו - טווח אחד שמכסה הכל
+            spans, span_morphs = [(0, len(words))], [morph]
+        elif span_morphs is None:
+            span_morphs = self.get_morphology_many(
+                [' '.join(words[start:end]) for start, end in spans]
+            )
+        
+        word_decisions = []
+        any_analyzed = False
+        for index, dictabert_word, nakdimon_word in disputes:
+            span_index = next(
+                (k for k, (start, end) in enumerate(spans) if start <= index < end),
+                None
+            )
+            token = None
+            if span_index is not None and span_morphs[span_index]:
+                any_analyzed = True
+                start, end = spans[span_index]
+                token = _morph_token_for_word(
+                    span_morphs[span_index], words[start:end], index - start
+                )
+            clear = bool(token and token.get('pos'))
+            word_decisions.append({
+                'index': index,
+                'dictabert': dictabert_word,
+                'nakdimon': nakdimon_word,
+                'pos': token.get('pos') if token else None,
+                'confidence': 'high' if clear else 'medium',
+                'requires_review': not clear,
+            })
+        
+        return dispute_decision(
+            dictabert_result, nakdimon_result, word_decisions, any_analyzed
+        )
     
-    def process(self, text):
+    def process(self, text, verbose=False):
         """
         מעבד טקסט מלא:
         1. מנקד עם DictaBERT
-        2. מנקד עם Nakdimon
+        2. מנקד עם Nakdimon (במקביל ל-1 אם workers >= 2)
         3. מכריע
         4. מחזיר תוצאה עם ציון ביטחון
-        """
-        print("\n" + "=" * 70)
-        print("מעבד טקסט:")
-        print("=" * 70)
-        print(f"קלט: {text}")
-        print()
-        
-        # שלב 1: DictaBERT
-        print("שלב 1: ניקוד עם DictaBERT...")
-        dictabert_result = self.nikud_with_dictabert(text)
-        if dictabert_result:
-            print(f"   תוצאה: {dictabert_result}")
-        
-        # שלב 2: Nakdimon
-        print("\nשלב 2: ניקוד עם Nakdimon...")
-        nakdimon_result = self.nikud_with_nakdimon(text)
-        if nakdimon_result:
-            print(f"   תוצאה: {nakdimon_result}")
-        
-        # שלב 3: הכרעה
-        print("\nשלב 3: הכרעה...")
-        decision = self.decide_nikud(text, dictabert_result, nakdimon_result)
         
+        בלי הדפסות; verbose=True מדפיס את הקלט וההכרעה (להדגמה).
+        """
+        decision = self.process_many([text], batch_size=1)[0]
+        if verbose:
+            print("\n" + "=" * 70)
+            print("מעבד טקסט:")
+            print("=" * 70)
+            print(f"קלט: {text}")
+            self._print_decision(decision)
+        return decision
+    
+    def errors(self):
+        """
+        מונה שגיאות לפי סוג (errors.* ב-stats), למשל
+        {'dictabert': 2, 'nakdimon': 1, 'load.nakdimon': 1}
+        """
+        prefix = 'errors.'
+        return {
+            name[len(prefix):]: value
+            for name, value in dict(self.stats.counters).items()
+            if name.startswith(prefix) and value
+        }
+    
+    @property
+    def error_count(self):
+        return sum(self.errors().values())
+    
+    def _print_decision(self, decision):
+        """מדפיס הכרעה סופית"""
         print(f"\n{'=' * 70}")
         print("תוצאה סופית:")
         print(f"{'=' * 70}")
@@ -239,20 +962,229 @@ class HebrewNikudPipeline:
         print(f"ביטחון: {decision['confidence']}")
         print(f"הערות: {decision['notes']}")
         
+        for abbreviation, expansion in decision.get('abbreviations', []):
+            print(f"קיצור: {abbreviation} -> {expansion}")
+        
         if 'alternative' in decision:
             print(f"\nאלטרנטיבה: {decision['alternative']}")
         
+        for word in decision.get('disputed_words', []):
+            mark = " ⚠️" if word['requires_review'] else ""
+            print(f"   מילה {word['index']}: {word['dictabert']} / {word['nakdimon']}{mark}")
+        
         if decision.get('requires_review'):
             print("\n⚠️  דורש בדיקה ידנית!")
+    
+    def process_many(self, texts, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מעבד רשימת טקסטים באצוות:
+        1. מנקד את כולם עם DictaBERT (אצוות של batch_size)
+        2. מנקד את כולם עם Nakdimon (במקביל ל-1 אם workers >= 2)
+        3. מריץ מורפולוגיה באצווה רק על המשפטים שבהם יש מחלוקת
+        4. מכריע לכל טקסט
         
-        return decision
+        מחזיר רשימת הכרעות באותו סדר כמו הקלט. אם יש מטמון, רק טקסטים
+        שלא נמצאו בו עוברים במודלים.
+        """
+        texts = list(texts)
+        with self.profiler:
+            if self.cache is None:
+                return self._process_batch(texts, batch_size)
+            return self._process_cached(texts, batch_size)
+    
+    def _process_cached(self, texts, batch_size):
+        """process_many דרך המטמון - רק החטאות עוברות במודלים"""
+        start = time.perf_counter()
+        decisions = self.cache.get_many(texts)
+        missing = [i for i, decision in enumerate(decisions) if decision is None]
+        self.stats.record(
+            'cache', time.perf_counter() - start, len(texts),
+            cache_hits=len(texts) - len(missing), cache_misses=len(missing)
+        )
+        if missing:
+            computed = self._process_batch([texts[i] for i in missing], batch_size)
+            for i, decision in zip(missing, computed):
+                decisions[i] = decision
+            cacheable = [
+                (texts[i], decision) for i, decision in zip(missing, computed)
+                if not is_degraded(decision)
+            ]
+            self.stats.count('cache.degraded', len(missing) - len(cacheable))
+            self.cache.put_many(cacheable)
+        return decisions
+    
+    def process_stream(self, lines, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        מעבד זרם שורות (קובץ פתוח, stdin או כל iterable) בזיכרון קבוע
+        
+        השורות נאספות לאצוות של batch_size ועוברות ב-process_many, כך
+        שבכל רגע נמצאת בזיכרון אצווה אחת בלבד. שורות ריקות מדולגות.
+        
+        Yields:
+            (מספר שורה מ-1, טקסט השורה, הכרעה) לפי סדר הקלט
+        """
+        batch = []
+        for line_number, line in enumerate(lines, start=1):
+            text = line.rstrip('\r\n')
+            if not text.strip():
+                continue
+            batch.append((line_number, text))
+            if len(batch) >= batch_size:
+                yield from self._process_stream_batch(batch, batch_size)
+                batch = []
+        if batch:
+            yield from self._process_stream_batch(batch, batch_size)
+    
+    def _process_stream_batch(self, batch, batch_size):
+        decisions = self.process_many([text for _, text in batch], batch_size)
+        for (line_number, text), decision in zip(batch, decisions):
+            yield line_number, text, decision
+    
+    def _process_batch(self, texts, batch_size):
+        """מריץ את המודלים וההכרעה על רשימת טקסטים (בלי מטמון)"""
+        abbreviations = None
+        if self.expand_abbreviations:
+            texts, abbreviations = self.expand_abbreviations_many(texts)
+        if self.lexicon is None:
+            decisions = self._decide(texts, batch_size)
+        else:
+            decisions = self._decide_with_lexicon(texts, batch_size)
+        if abbreviations:
+            for decision, found in zip(decisions, abbreviations):
+                if found:
+                    decision['abbreviations'] = [list(pair) for pair in found]
+        return decisions
+    
+    def _decide_with_lexicon(self, texts, batch_size):
+        """טקסטים שמכוסים כולם בלקסיקון לא עוברים במנועים"""
+        decisions = [None] * len(texts)
+        total_tokens = 0
+        lexicon_tokens = 0
+        with self.stats.stage('lexicon', len(texts)):
+            for i, text in enumerate(texts):
+                total_tokens += len(text.split())
+                covered = self.lexicon.vocalize(text)
+                if covered is not None:
+                    vocalized, num_words, whole = covered
+                    decisions[i] = lexicon_decision(vocalized, whole)
+                    lexicon_tokens += num_words
+        self.stats.count('tokens.total', total_tokens)
+        self.stats.count('lexicon.tokens', lexicon_tokens)
+        
+        missing = [i for i, decision in enumerate(decisions) if decision is None]
+        if missing:
+            computed = self._decide([texts[i] for i in missing], batch_size)
+            for i, decision in zip(missing, computed):
+                decisions[i] = decision
+        return decisions
+    
+    def _decide(self, texts, batch_size):
+        if self.skip_margin is None:
+            return self._decide_batch(texts, batch_size)
+        return self._decide_gated(texts, batch_size)
+    
+    def _decide_gated(self, texts, batch_size):
+        """
+        שער ביטחון: DictaBERT קודם, ורק משפטים עם אות מתחת ל-skip_margin
+        ממשיכים ל-Nakdimon, למורפולוגיה ולהכרעה הרגילה
+        
+        ההסלמה היא ברמת משפט - Nakdimon צריך את המשפט כולו כהקשר - וכבר
+        בתוכה המורפולוגיה רצה רק סביב המילים שבמחלוקת.
+        """
+        with_margins = self.nikud_many_with_margins(texts, batch_size)
+        decisions = [None] * len(texts)
+        escalated = []
+        for i, (text, margins) in enumerate(with_margins):
+            if text is not None and margins is not None:
+                margin = min_margin(margins)
+                if margin >= self.skip_margin:
+                    decisions[i] = confident_decision(text, margin, self.skip_margin)
+                    continue
+            escalated.append(i)
+        self.stats.count('gate.skipped', len(texts) - len(escalated))
+        self.stats.count('gate.escalated', len(escalated))
+        
+        if escalated:
+            computed = self._decide_batch(
+                [texts[i] for i in escalated], batch_size,
+                dictabert_results=[with_margins[i][0] for i in escalated]
+            )
+            for i, decision in zip(escalated, computed):
+                margins = with_margins[i][1]
+                if margins is not None:
+                    decision['low_margin_words'] = low_margin_words(
+                        texts[i], margins, self.skip_margin
+                    )
+                decisions[i] = decision
+        return decisions
+    
+    def _decide_batch(self, texts, batch_size, dictabert_results=None):
+        """
+        מריץ את המודלים וההכרעה על טקסטים מוכנים
+        
+        dictabert_results - פלט DictaBERT שכבר חושב (למשל בשער הביטחון).
+        """
+        precomputed = dictabert_results
+        dictabert_results, nakdimon_results, morph_future = self._run_engines(
+            lambda: precomputed if precomputed is not None
+            else self.nikud_many_with_dictabert(texts, batch_size),
+            lambda: self.nikud_many_with_nakdimon(texts, batch_size),
+            lambda: self.get_morphology_many(texts, batch_size)
+        )
+        disputed = [
+            i for i, (d, n) in enumerate(zip(dictabert_results, nakdimon_results))
+            if n and d != n
+        ]
+        
+        # מורפולוגיה ספקולטיבית של המשפטים המלאים כבר רצה במקביל
+        if morph_future is not None:
+            if not disputed:
+                morph_future.cancel()
+                whole_morphs = {}
+            else:
+                whole = morph_future.result()
+                whole_morphs = {i: whole[i] for i in disputed}
+            with self.stats.stage('decision', len(texts)):
+                return [
+                    self.decide_nikud(
+                        text, dictabert_results[i], nakdimon_results[i],
+                        morph=whole_morphs.get(i, _MORPH_NOT_COMPUTED)
+                    )
+                    for i, text in enumerate(texts)
+                ]
+        
+        # מורפולוגיה נדרשת רק סביב המילים שבמחלוקת - כל הטווחים באצווה אחת
+        span_texts = []
+        span_ranges = {}
+        for i in disputed:
+            _, spans = self.dispute_spans(texts[i], dictabert_results[i], nakdimon_results[i])
+            words = self.dispute_words(texts[i], dictabert_results[i])
+            first = len(span_texts)
+            span_texts.extend(' '.join(words[start:end]) for start, end in spans)
+            span_ranges[i] = (first, len(span_texts))
+        analyzed = self.get_morphology_many(span_texts, batch_size) if span_texts else []
+        
+        decisions = []
+        with self.stats.stage('decision', len(texts)):
+            for i, text in enumerate(texts):
+                span_morphs = None
+                if i in span_ranges:
+                    first, last = span_ranges[i]
+                    span_morphs = analyzed[first:last]
+                decisions.append(self.decide_nikud(
+                    text, dictabert_results[i], nakdimon_results[i],
+                    span_morphs=span_morphs
+                ))
+        return decisions
 
 
 def main():
     """בדיקה של הפייפליין"""
+    _ensure_utf8_stdout()
+    configure_logging('INFO')
     
     # צור פייפליין
-    pipeline = HebrewNikudPipeline()
+    pipeline = HebrewNikudPipeline(expand_abbreviations=True)
     pipeline.load_models()
     
     # משפטי בדיקה
@@ -268,8 +1200,14 @@ def main():
     print("=" * 70)
     
     for sentence in test_sentences:
-        result = pipeline.process(sentence)
+        result = pipeline.process(sentence, verbose=True)
         print("\n" + "-" * 70 + "\n")
+    
+    print("זמנים לפי שלב:")
+    pipeline.stats.dump()
+    if pipeline.error_count:
+        print(f"⚠️  שגיאות: {pipeline.errors()}")
+    pipeline.close()
 
 
 if __name__ == "__main__":
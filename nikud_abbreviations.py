@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+אינדקס קיצורים מקומפל (trie בינארי) והרחבת ראשי תיבות במעבר אחד
+
+במקום להריץ exec על simple_abbreviations_dict.py בכל טעינה, המילון
+מקומפל פעם אחת לקובץ בינארי שנפתח ב-mmap ונטען במילישניות:
+
+    python nikud_abbreviations.py simple_abbreviations_dict.py -o simple_abbreviations_dict.idx
+
+מבנה הקובץ (little-endian):
+    header  : MAGIC, מספר צמתים, מספר קשתות, מספר ערכים
+    nodes   : לכל צומת (קשת ראשונה, מספר קשתות, אינדקס ערך או -1)
+    edges   : לכל קשת (קוד התו, צומת יעד), ממוינות לפי תו בתוך כל צומת
+    values  : טבלת offsets + הרחבות ב-UTF-8
+
+expand() סורק את המשפט פעם אחת: רק מילים עם גרשיים/גרש נבדקות, וכל
+אחת מהן מהולכת ב-trie - גם אחרי אותיות שימוש בתחילתה (ב"ה בתוך
+"ושב"ה"). גרשיים וגרש עבריים (״ ׳) מותאמים כמו ב-ASCII, וסוגריים
+ומרכאות בתחילת המילה מדולגים ("(ב״ה)" נמצא כמו ב"ה).
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import mmap
+import os
+import re
+import struct
+import uuid
+from pathlib import Path
+
+MAGIC = b'ABBRIDX1'
+_HEADER = struct.Struct('<8sIII')
+_NODE = struct.Struct('<IIi')
+_EDGE = struct.Struct('<II')
+_OFFSET = struct.Struct('<I')
+
+# אותיות שימוש שיכולות להופיע לפני ראשי תיבות
+PREFIX_LETTERS = 'ובהכלמש'
+MAX_PREFIX_LETTERS = 3
+
+# מילה שיש בה גרשיים או גרש (ASCII או עבריים)
+_CANDIDATE_RE = re.compile(r'\S*["\'״׳]\S*')
+_TRAILING_PUNCT = '.,:;!?)]׃'
+_LEADING_PUNCT = '([{"\'״׳'
+# המפתחות במילון כתובים בגרשיים/גרש של ASCII
+_QUOTES = str.maketrans({'״': '"', '׳': "'"})
+
+
+def load_abbreviations_source(path):
+    """טוען את ABBREVIATIONS מקובץ המקור (פעם אחת, בזמן קומפילציה)"""
+    spec = importlib.util.spec_from_file_location("abbrev_dict", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ABBREVIATIONS
+
+
+def _expansion_text(value):
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ''
+    return str(value)
+
+
+def build_index(abbreviations):
+    """בונה את הקובץ הבינארי (bytes) ממילון קיצור -> הרחבה"""
+    # trie בזיכרון: כל צומת הוא [ילדים, אינדקס ערך]
+    root = [{}, -1]
+    values = []
+    for abbreviation, expansion in abbreviations.items():
+        node = root
+        for char in abbreviation:
+            node = node[0].setdefault(char, [{}, -1])
+        if node[1] == -1:
+            values.append(_expansion_text(expansion))
+            node[1] = len(values) - 1
+        else:
+            values[node[1]] = _expansion_text(expansion)
+
+    # סריאליזציה ב-BFS: הקשתות של כל צומת רציפות וממוינות
+    nodes = [root]
+    node_records = []
+    edge_records = []
+    position = 0
+    while position < len(nodes):
+        children, value_index = nodes[position]
+        first_edge = len(edge_records)
+        for char in sorted(children):
+            edge_records.append((ord(char), len(nodes)))
+            nodes.append(children[char])
+        node_records.append((first_edge, len(children), value_index))
+        position += 1
+
+    encoded = [value.encode('utf-8') for value in values]
+    parts = [_HEADER.pack(MAGIC, len(node_records), len(edge_records), len(encoded))]
+    parts.extend(_NODE.pack(*record) for record in node_records)
+    parts.extend(_EDGE.pack(*record) for record in edge_records)
+    offset = 0
+    for value in encoded:
+        parts.append(_OFFSET.pack(offset))
+        offset += len(value)
+    parts.append(_OFFSET.pack(offset))
+    parts.extend(encoded)
+    return b''.join(parts)
+
+
+def compile_index(source_path, index_path):
+    """מקמפל את קובץ המילון לאינדקס בינארי; מחזיר את מספר הקיצורים"""
+    abbreviations = load_abbreviations_source(source_path)
+    data = build_index(abbreviations)
+    # שם זמני ייחודי: כמה תהליכים (או מחשבים) יכולים לקמפל בו-זמנית
+    tmp_path = f"{index_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    return len(abbreviations)
+
+
+class AbbreviationIndex:
+    """
+    אינדקס קיצורים לקריאה בלבד מעל buffer (mmap של קובץ, או bytes)
+
+    מתנהג כמו מילון לקריאה (len, in, [], get) ומוסיף find()/expand().
+    """
+
+    def __init__(self, buffer, mapped_file=None):
+        self._buffer = buffer
+        self._file = mapped_file
+        magic, self._node_count, self._edge_count, self._value_count = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("קובץ אינדקס קיצורים לא תקין")
+        self._nodes_at = _HEADER.size
+        self._edges_at = self._nodes_at + self._node_count * _NODE.size
+        self._offsets_at = self._edges_at + self._edge_count * _EDGE.size
+        self._values_at = self._offsets_at + (self._value_count + 1) * _OFFSET.size
+
+    @classmethod
+    def open(cls, index_path):
+        """פותח קובץ אינדקס ב-mmap (נטען לפי דרישה על ידי מערכת ההפעלה)"""
+        f = open(index_path, 'rb')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, f)
+
+    @classmethod
+    def from_dict(cls, abbreviations):
+        return cls(build_index(abbreviations))
+
+    def close(self):
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return self._value_count
+
+    def _child(self, node, char):
+        """צומת הילד בתו char, או -1 (חיפוש בינארי בקשתות הצומת)"""
+        first, count, _ = _NODE.unpack_from(self._buffer, self._nodes_at + node * _NODE.size)
+        code = ord(char)
+        low, high = first, first + count
+        while low < high:
+            middle = (low + high) // 2
+            edge_char, child = _EDGE.unpack_from(self._buffer, self._edges_at + middle * _EDGE.size)
+            if edge_char == code:
+                return child
+            if edge_char < code:
+                low = middle + 1
+            else:
+                high = middle
+        return -1
+
+    def _value(self, node):
+        value_index = _NODE.unpack_from(self._buffer, self._nodes_at + node * _NODE.size)[2]
+        if value_index < 0:
+            return None
+        start, end = struct.unpack_from(
+            '<II', self._buffer, self._offsets_at + value_index * _OFFSET.size
+        )
+        return bytes(self._buffer[self._values_at + start:self._values_at + end]).decode('utf-8')
+
+    def get(self, abbreviation, default=None):
+        node = 0
+        for char in abbreviation:
+            node = self._child(node, char)
+            if node < 0:
+                return default
+        value = self._value(node)
+        return default if value is None else value
+
+    def __getitem__(self, abbreviation):
+        value = self.get(abbreviation)
+        if value is None:
+            raise KeyError(abbreviation)
+        return value
+
+    def __contains__(self, abbreviation):
+        return self.get(abbreviation) is not None
+
+    def _match_token(self, token):
+        """
+        מנסה להתאים מילה שלמה (אחרי אותיות שימוש ובלי פיסוק בסופה)
+
+        Returns:
+            (offset תחילת הקיצור, אורך, הרחבה) או None
+        """
+        stripped = token.rstrip(_TRAILING_PUNCT)
+        leading = len(stripped) - len(stripped.lstrip(_LEADING_PUNCT))
+        stripped = stripped[leading:].translate(_QUOTES)
+        candidates = [stripped]
+        if leading and stripped[-1:] in ('"', "'"):
+            # מילה במרכאות ("ב"ה") - גם בלי המרכאה הסוגרת
+            candidates.append(stripped[:-1])
+        for candidate in candidates:
+            for skip in range(min(MAX_PREFIX_LETTERS, len(candidate) - 1) + 1):
+                if skip and candidate[skip - 1] not in PREFIX_LETTERS:
+                    break
+                expansion = self.get(candidate[skip:])
+                if expansion is not None:
+                    return leading + skip, len(candidate) - skip, expansion
+        return None
+
+    def find(self, text):
+        """
+        מוצא את כל הקיצורים במשפט במעבר אחד
+
+        Returns:
+            רשימת (start, end, קיצור, הרחבה) לפי הסדר בטקסט
+        """
+        matches = []
+        for match in _CANDIDATE_RE.finditer(text):
+            found = self._match_token(match.group())
+            if found is not None:
+                skip, length, expansion = found
+                start = match.start() + skip
+                matches.append((start, start + length, text[start:start + length], expansion))
+        return matches
+
+    def expand(self, text):
+        """
+        מחליף כל קיצור בהרחבה שלו
+
+        Returns:
+            (הטקסט המורחב, רשימת (קיצור, הרחבה))
+        """
+        matches = self.find(text)
+        if not matches:
+            return text, []
+        pieces = []
+        previous_end = 0
+        for start, end, _, expansion in matches:
+            pieces.append(text[previous_end:start])
+            pieces.append(expansion)
+            previous_end = end
+        pieces.append(text[previous_end:])
+        return ''.join(pieces), [(abbreviation, expansion) for _, _, abbreviation, expansion in matches]
+
+
+def load_index(source_path, index_path=None):
+    """
+    טוען את אינדקס הקיצורים, ומקמפל אותו מחדש אם קובץ המקור חדש ממנו
+
+    Returns:
+        AbbreviationIndex, או None אם אין קובץ מקור ואין אינדקס
+    """
+    source_path = Path(source_path)
+    index_path = Path(index_path) if index_path else source_path.with_suffix('.idx')
+    stale = source_path.exists() and (
+        not index_path.exists()
+        or index_path.stat().st_mtime < source_path.stat().st_mtime
+    )
+    if stale:
+        compile_index(source_path, index_path)
+    if not index_path.exists():
+        return None
+    return AbbreviationIndex.open(index_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="קומפילציה של מילון קיצורים לאינדקס בינארי")
+    parser.add_argument('source', help="קובץ Python עם מילון ABBREVIATIONS")
+    parser.add_argument('-o', '--output', help="קובץ האינדקס (ברירת מחדל: אותו שם עם .idx)")
+    args = parser.parse_args()
+
+    output = args.output or str(Path(args.source).with_suffix('.idx'))
+    count = compile_index(args.source, output)
+    size = Path(output).stat().st_size / 1024
+    print(f"✅ {count:,} קיצורים -> {output} ({size:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+תזמון אצוות לפי אורך עבור מודלי DictaBERT
+
+משפטים בספרים נעים בין 3 ל-300+ מילים. predict() מרפד כל אצווה לאורך
+המשפט הארוך בה, כך שאצווה מעורבת מבזבזת את רוב החישוב על ריפוד.
+plan_batches() ממיין את המשפטים לפי אורך בטוקנים ובונה אצוות תחת
+תקציב של max_tokens טוקנים מרופדים (אורך מקסימלי x מספר משפטים),
+והתוצאות מוחזרות לסדר המקורי לפי האינדקסים.
+"""
+
+# תקציב ברירת מחדל: 16 משפטים באורך 512 טוקנים
+DEFAULT_MAX_BATCH_TOKENS = 8192
+
+
+def token_lengths(tokenizer, texts, cache=None):
+    """
+    אורך כל טקסט בטוקנים (כולל טוקנים מיוחדים); הערכה לפי תווים אם אין tokenizer
+
+    cache (nikud_encoding.EncodingCache) חוסך טוקניזציה חוזרת של אותו
+    טקסט. tokenizer שמחזיק מטמון משלו (OnnxTokenizer) נקרא ישירות.
+    """
+    texts = list(texts)
+    try:
+        if cache is not None and getattr(tokenizer, 'cache', None) is None:
+            encodings = cache.encode_many(
+                tokenizer, texts, lambda batch: tokenizer(batch)['input_ids']
+            )
+            return [len(ids) for ids in encodings]
+        return [len(ids) for ids in tokenizer(texts)['input_ids']]
+    except Exception:
+        return [len(text) + 2 for text in texts]
+
+
+def plan_batches(lengths, max_tokens=DEFAULT_MAX_BATCH_TOKENS, max_batch_size=None):
+    """
+    מחלק אינדקסים לאצוות לפי אורך
+
+    Args:
+        lengths: אורך כל פריט בטוקנים
+        max_tokens: תקציב טוקנים מרופדים לאצווה (פריט ארוך מהתקציב מקבל אצווה משלו)
+        max_batch_size: מספר פריטים מקסימלי לאצווה (None = ללא הגבלה)
+
+    Returns:
+        רשימת אצוות, כל אחת רשימת אינדקסים לקלט
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches = []
+    current = []
+    current_max = 0
+    for index in order:
+        length = lengths[index]
+        padded_max = max(current_max, length)
+        full = max_batch_size is not None and len(current) >= max_batch_size
+        if current and (full or padded_max * (len(current) + 1) > max_tokens):
+            batches.append(current)
+            current = []
+            padded_max = length
+        current.append(index)
+        current_max = padded_max
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,347 @@
+"""
+מטמון תוצאות ניקוד - שתי שכבות
+1. LRU בזיכרון עם מגבלת גודל
+2. קובץ sqlite על הדיסק שנשמר בין ריצות
+
+המפתח הוא hash של הטקסט המנורמל יחד עם "טביעת האצבע" של המודלים
+וההגדרות (נתיב, גרסה ותאריך שינוי של הקבצים, פרמטרי ההכרעה), והערך הוא
+ההכרעה המלאה של decide_nikud(). כשמודל או הגדרה משתנים, טביעת האצבע
+משתנה והרשומות הישנות פשוט לא נמצאות - בלי למחוק אותן. כך כמה תצורות
+(עובדי מאגר, שרת, רסיסים) יכולות לשתף קובץ sqlite אחד.
+"""
+
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from nikud_text import normalize_text
+
+DEFAULT_MEMORY_SIZE = 100_000
+
+# קבצים שמזהים גרסה של מודל מקומי
+_MODEL_IDENTITY_FILES = (
+    'config.json',
+    'labels.json',
+    'model.onnx',
+    'model.safetensors',
+    'pytorch_model.bin',
+    'tokenizer.json',
+    'vocab.txt',
+)
+
+
+def model_identity(path):
+    """
+    מחזיר מזהה יציב למודל: נתיב מוחלט + גודל ותאריך שינוי של קבצי המודל
+
+    עבור שם מודל ב-HuggingFace Hub (תיקייה שלא קיימת) - השם עצמו.
+    """
+    model_dir = Path(path)
+    if not model_dir.exists():
+        return str(path)
+
+    parts = [str(model_dir.resolve())]
+    for name in _MODEL_IDENTITY_FILES:
+        model_file = model_dir / name
+        if model_file.exists():
+            stat = model_file.stat()
+            parts.append(f"{name}:{stat.st_size}:{int(stat.st_mtime)}")
+    return '|'.join(parts)
+
+
+def file_identity(path):
+    """מזהה לקובץ יחיד (נתיב, גודל ותאריך שינוי), או None אם אינו קיים"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def package_version(name):
+    """גרסת חבילה מותקנת, או None אם אינה מותקנת"""
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def make_fingerprint(identities):
+    """טביעת אצבע קצרה למילון מזהי מודלים"""
+    payload = json.dumps(identities, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class LRUCache:
+    """מטמון LRU פשוט ובטוח ל-threads"""
+
+    def __init__(self, max_size=DEFAULT_MEMORY_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class MemoryBudgetLRU:
+    """
+    מטמון LRU מוגבל בזיכרון (בבתים משוערים) ולא במספר פריטים
+
+    Args:
+        max_bytes: תקציב הזיכרון (0 = מטמון כבוי)
+        sizeof: פונקציה שמעריכה את הגודל בבתים של (key, value)
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._items),
+            'bytes': self.nbytes,
+        }
+
+
+class SqliteStore:
+    """אחסון הכרעות בקובץ sqlite (מפתח -> JSON)"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS decisions '
+            '(key TEXT PRIMARY KEY, decision TEXT NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS meta '
+            '(name TEXT PRIMARY KEY, value TEXT NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT decision FROM decisions WHERE key = ?', (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys):
+        """מחזיר מילון key -> הכרעה עבור המפתחות שנמצאו"""
+        found = {}
+        keys = list(keys)
+        # sqlite מגביל את מספר הפרמטרים בשאילתה
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT key, decision FROM decisions WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall()
+            for key, decision in rows:
+                found[key] = json.loads(decision)
+        return found
+
+    def put_many(self, items):
+        """שומר זוגות (key, הכרעה) בטרנזקציה אחת"""
+        rows = [(key, json.dumps(decision, ensure_ascii=False)) for key, decision in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO decisions (key, decision) VALUES (?, ?)', rows
+            )
+            self._conn.commit()
+
+    def get_meta(self, name):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM meta WHERE name = ?', (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, value)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM decisions')
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class NikudResultCache:
+    """
+    מטמון הכרעות ניקוד דו-שכבתי
+
+    Args:
+        fingerprint: טביעת האצבע של המודלים (HebrewNikudPipeline.model_fingerprint())
+        db_path: קובץ sqlite לשכבת הדיסק (None = זיכרון בלבד)
+        memory_size: מספר ההכרעות המקסימלי בשכבת הזיכרון
+    """
+
+    def __init__(self, fingerprint, db_path=None, memory_size=DEFAULT_MEMORY_SIZE):
+        self.fingerprint = fingerprint
+        self.memory = LRUCache(memory_size)
+        self.disk = SqliteStore(db_path) if db_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def key(self, text):
+        """מפתח תוכן: hash של טביעת האצבע + הטקסט המנורמל"""
+        payload = f"{self.fingerprint}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text):
+        """מחזיר עותק של ההכרעה השמורה, או None"""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        """מחזיר רשימת הכרעות (או None) באותו סדר כמו texts"""
+        keys = [self.key(text) for text in texts]
+        results = [self.memory.get(key) for key in keys]
+        memory_hits = sum(result is not None for result in results)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        disk_hits = 0
+        if missing and self.disk is not None:
+            found = self.disk.get_many({keys[i] for i in missing})
+            for i in missing:
+                decision = found.get(keys[i])
+                if decision is not None:
+                    self.memory.put(keys[i], decision)
+                    results[i] = decision
+                    disk_hits += 1
+
+        with self._counter_lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += len(texts) - memory_hits - disk_hits
+
+        return [copy.deepcopy(result) if result is not None else None for result in results]
+
+    def put(self, text, decision):
+        self.put_many([(text, decision)])
+
+    def put_many(self, items):
+        """שומר זוגות (טקסט, הכרעה) בשתי השכבות"""
+        keyed = []
+        for text, decision in items:
+            if decision is None:
+                continue
+            key = self.key(text)
+            decision = copy.deepcopy(decision)
+            self.memory.put(key, decision)
+            keyed.append((key, decision))
+        if self.disk is not None:
+            self.disk.put_many(keyed)
+
+    def invalidate(self, fingerprint=None):
+        """
+        מנקה את המטמון
+
+        אם ניתנה טביעת אצבע חדשה (למשל אחרי שינוי נתיב מודל), היא משמשת
+        למפתחות מכאן והלאה ושכבת הזיכרון מתרוקנת; הרשומות בדיסק נשארות
+        לתצורות אחרות שמשתפות את הקובץ. בלי טביעת אצבע - גם הדיסק נמחק.
+        """
+        self.memory.clear()
+        if fingerprint is not None:
+            self.fingerprint = fingerprint
+        elif self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        """מונים של פגיעות והחטאות"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,200 @@
+"""
+נקודות שמירה לריצות קורפוס ארוכות - המשך בדיוק מהמקום שבו התהליך נעצר
+
+    python nikud_corpus.py library.txt -o library.jsonl --checkpoint
+    # התהליך נהרג באמצע...
+    python nikud_corpus.py library.txt -o library.jsonl --checkpoint --resume
+
+היומן (library.jsonl.journal) הוא קובץ JSONL שנכתב רק בהוספה: שורת
+כותרת עם מזהה קובץ הקלט, ואחריה נקודת שמירה לכל היותר פעם ב-interval
+שניות - מספר האצווה שהושלמה, מספר השורה האחרונה שנכתבה, ההיסט בקובץ
+הקלט שאחריה וגודל קובץ הפלט. לפני כל נקודה הפלט עובר fsync, כך שכל מה
+שהיומן מצביע עליו כבר נמצא בדיסק.
+
+בהמשך ריצה הפלט נחתך לגודל שבנקודה האחרונה (רשומות שנכתבו אחריה יחושבו
+שוב), והקלט נקרא מההיסט שבה - בלי כפילויות ובלי חורים. שורה אחרונה
+קטועה ביומן (קריסה באמצע כתיבה) פשוט מדולגת.
+"""
+
+import collections
+import json
+import os
+import time
+
+from nikud_cache import file_identity
+
+# מרווח מינימלי בין נקודות שמירה (fsync של הפלט ושל היומן)
+DEFAULT_CHECKPOINT_SECONDS = 10.0
+
+
+def journal_path(output_path):
+    return f"{output_path}.journal"
+
+
+class TrackedInput:
+    """
+    קורא קובץ קלט בבינארי וזוכר את ההיסט שאחרי כל שורה שנקראה
+
+    Args:
+        path: קובץ הקלט
+        offset: היסט התחלה (בהמשך ריצה)
+        first_line: מספר השורה שמתחילה בהיסט הזה
+    """
+
+    def __init__(self, path, offset=0, first_line=1):
+        self.path = path
+        self.first_line = first_line
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+        self._offset = offset
+        self._pending = collections.deque()
+
+    def __iter__(self):
+        line_number = self.first_line
+        for raw in self._file:
+            self._offset += len(raw)
+            self._pending.append((line_number, self._offset))
+            line_number += 1
+            yield raw.decode('utf-8')
+
+    def offset_after(self, line_number):
+        """ההיסט שאחרי שורה line_number (ושוכח את השורות שלפניה)"""
+        offset = None
+        while self._pending and self._pending[0][0] <= line_number:
+            offset = self._pending.popleft()[1]
+        return offset
+
+    def close(self):
+        self._file.close()
+
+
+def read_journal(path):
+    """
+    Returns:
+        (כותרת, נקודת השמירה האחרונה או None) - או (None, None) אם אין יומן
+    """
+    if not os.path.exists(path):
+        return None, None
+    header, last = None, None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break   # שורה קטועה בסוף היומן
+            if header is None:
+                header = entry
+            else:
+                last = entry
+    return header, last
+
+
+class CorpusJournal:
+    """
+    יומן נקודות שמירה לריצת קורפוס אחת
+
+    Args:
+        path: קובץ היומן
+        source: TrackedInput שממנו נקראות השורות
+        interval: מרווח מינימלי בשניות בין נקודות שמירה
+        state: נקודת השמירה שממנה ממשיכים (None = ריצה חדשה)
+    """
+
+    def __init__(self, path, source, interval=DEFAULT_CHECKPOINT_SECONDS, state=None):
+        self.path = path
+        self.source = source
+        self.interval = interval
+        self.batch = state['batch'] if state else 0
+        self.records = state['records'] if state else 0
+        self.line = state['line'] if state else 0
+        self.input_offset = state['input_offset'] if state else 0
+        self.checkpoints = 0
+        self.seconds = 0.0
+        self._last = time.monotonic()
+        if state is None:
+            self._file = open(path, 'w', encoding='utf-8')
+            self._append({'input': file_identity(source.path), 'started': time.time()})
+        else:
+            self._file = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def open(cls, input_path, output_path, resume=False, interval=DEFAULT_CHECKPOINT_SECONDS):
+        """
+        פותח את היומן, הקלט והפלט - מאפס, או מנקודת השמירה האחרונה
+
+        Returns:
+            (journal, output) - או (None, None) אם הריצה כבר הושלמה
+        """
+        path = journal_path(output_path)
+        header, state = read_journal(path) if resume else (None, None)
+        if state is not None and header['input'] != file_identity(input_path):
+            raise ValueError(f"קובץ הקלט השתנה מאז הריצה שביומן {path}")
+        if state is not None and state.get('done'):
+            return None, None
+
+        if state is None:
+            source = TrackedInput(input_path)
+            output = open(output_path, 'w', encoding='utf-8')
+            return cls(path, source, interval), output
+
+        if os.path.getsize(output_path) < state['output_offset']:
+            raise ValueError(f"קובץ הפלט {output_path} קצר מנקודת השמירה ביומן")
+        with open(output_path, 'r+b') as f:
+            f.truncate(state['output_offset'])
+        source = TrackedInput(input_path, state['input_offset'], state['line'] + 1)
+        output = open(output_path, 'a', encoding='utf-8')
+        return cls(path, source, interval, state), output
+
+    @property
+    def first_line(self):
+        return self.source.first_line
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False))
+        self._file.write('\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def completed(self, output, line_number, count, done=False):
+        """
+        נקרא אחרי כל אצווה שנכתבה לפלט (ועברה flush)
+
+        נקודת שמירה נכתבת רק אם עבר interval מהקודמת, או בסוף הריצה.
+        """
+        self.batch += 1
+        self.records += count
+        if line_number is not None:
+            self.line = line_number
+            self.input_offset = self.source.offset_after(line_number)
+        if not done and time.monotonic() - self._last < self.interval:
+            return False
+
+        start = time.perf_counter()
+        os.fsync(output.fileno())
+        entry = {
+            'batch': self.batch,
+            'line': self.line,
+            'records': self.records,
+            'input_offset': self.input_offset,
+            'output_offset': os.fstat(output.fileno()).st_size,
+            'time': time.time(),
+        }
+        if done:
+            entry['done'] = True
+        self._append(entry)
+        self.seconds += time.perf_counter() - start
+        self.checkpoints += 1
+        self._last = time.monotonic()
+        return True
+
+    def stats(self):
+        return {
+            'checkpoints': self.checkpoints,
+            'batches': self.batch,
+            'records': self.records,
+            'seconds': round(self.seconds, 3),
+        }
+
+    def close(self):
+        self._file.close()
+        self.source.close()
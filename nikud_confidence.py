@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+שער ביטחון: מדלגים על Nakdimon ועל המורפולוגיה כש-DictaBERT בטוח
+
+DictaBERT-nikud מחזיר לכל אות התפלגות על מחלקות הניקוד. המרווח בין
+המחלקה שנבחרה לשנייה (nikud_decoding.letter_margins) הוא מדד ביטחון:
+אם המרווח של כל אות במשפט מעל הסף, הפייפליין מחזיר את DictaBERT
+בלי להריץ את שאר המנועים. רק משפטים עם אות אחת או יותר מתחת לסף
+עוברים הלאה ל-Nakdimon ולהכרעה הרגילה.
+
+    HebrewNikudPipeline(skip_margin=0.9)
+
+כיול הסף על סט מנוקד ידנית - אחוז הדילוג מול אחוז ההסכמה והדיוק:
+
+    python nikud_confidence.py gold.txt --thresholds 0.5 0.8 0.9 0.95 0.99
+
+משפט שנבדק בשער רץ ב-DictaBERT פעם אחת: הטקסט והמרווחים מפוענחים מאותו
+forward. --check-decoding מוודא שהפענוח זהה ל-predict() של המודל, ו-
+benchmark_nikud_pipeline.py --skip-margin משווה תפוקה עם השער ובלעדיו.
+"""
+
+import argparse
+import contextlib
+import re
+import sys
+
+from nikud_text import remove_nikud
+
+DEFAULT_THRESHOLDS = (0.5, 0.8, 0.9, 0.95, 0.99)
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def _torch_predict_with_margins(model, sentences, tokenizer):
+    """
+    forward אחד של DictaBERT-nikud ב-torch, במקום predict() של ה-remote
+    code: מאותם logits מפוענח הטקסט המנוקד (nikud_decoding, כמו ב-ONNX)
+    ומחושבים המרווחים - כך שמשפט שעובר בשער רץ במודל פעם אחת בלבד.
+    ההתאמה לפלט של predict() נבדקת ב---check-decoding.
+    """
+    import torch
+
+    from nikud_cpu import InferenceModeModel
+    from nikud_decoding import collect_labels, decode_nikud, flatten_logits, letter_margins
+
+    module = model.model if isinstance(model, InferenceModeModel) else model
+    labels = collect_labels(module, 'nikud', [])
+    sentences = [remove_nikud(sentence) for sentence in sentences]
+    inputs = tokenizer(sentences, padding=True, truncation=True,
+                       return_offsets_mapping=True, return_tensors='pt')
+    offsets = inputs.pop('offset_mapping').tolist()
+    device = next(module.parameters()).device
+    with torch.inference_mode():
+        output = module(**{name: value.to(device) for name, value in inputs.items()},
+                        return_dict=True)
+    logits = dict(flatten_logits(output.logits))
+    nikud_logits = logits['nikud_logits'].float().cpu().numpy()
+    shin_logits = logits['shin_logits'].float().cpu().numpy()
+    nikud_ids = nikud_logits.argmax(axis=-1)
+    shin_ids = shin_logits.argmax(axis=-1)
+    return [
+        (
+            decode_nikud(sentence, offsets[row], nikud_ids[row], shin_ids[row], labels),
+            letter_margins(sentence, offsets[row], nikud_logits[row], shin_logits[row]),
+        )
+        for row, sentence in enumerate(sentences)
+    ]
+
+
+def predict_with_margins(model, sentences, tokenizer):
+    """
+    ניקוד + מרווח ביטחון לכל תו, לכל משפט: [(טקסט מנוקד, margins)]
+
+    מודל ONNX (או כל מודל עם predict_with_margins) מחשב בעצמו;
+    מודל torch רץ דרך forward ישיר אחד (טקסט ומרווחים מאותם logits).
+    """
+    if hasattr(model, 'predict_with_margins'):
+        return model.predict_with_margins(sentences, tokenizer)
+    return _torch_predict_with_margins(model, sentences, tokenizer)
+
+
+def min_margin(margins):
+    """המרווח הנמוך ביותר במשפט (1.0 למשפט בלי אותיות)"""
+    return min(margins, default=1.0)
+
+
+def low_margin_words(text, margins, threshold):
+    """אינדקסי המילים (לפי text.split()) שיש בהן אות מתחת לסף"""
+    text = remove_nikud(text)
+    return [
+        index for index, match in enumerate(_WORD_RE.finditer(text))
+        if min_margin(margins[match.start():match.end()]) < threshold
+    ]
+
+
+def confident_decision(text, margin, threshold):
+    """הכרעה למשפט שכל האותיות בו מעל הסף - בלי Nakdimon ובלי מורפולוגיה"""
+    return {
+        'text': text,
+        'source': 'DictaBERT (confident)',
+        'confidence': 'high',
+        'notes': sys.intern(f'כל האותיות מעל סף הביטחון {threshold}'),
+        'min_margin': round(margin, 4),
+    }
+
+
+def calibration_report(pipeline, gold, thresholds=DEFAULT_THRESHOLDS, batch_size=32):
+    """
+    אחוז הדילוג מול הסכמה ודיוק לכל סף, על סט מנוקד ידנית
+
+    ההכרעה המלאה (שני המנועים) מחושבת פעם אחת לכל משפט, ולכל סף
+    מרכיבים את הפלט המדורג: DictaBERT למשפטים שדולגו, ההכרעה המלאה
+    לשאר.
+
+    Returns:
+        רשימת שורות: threshold, skip_rate, skipped_engine_agreement
+        (כמה מהמשפטים שדולגו Nakdimon היה מסכים איתם), skipped_word_accuracy,
+        gated_word_accuracy, full_word_accuracy
+    """
+    from nikud_text import vocalization_agreement
+
+    sentences = [remove_nikud(line) for line in gold]
+    with_margins = pipeline.nikud_many_with_margins(sentences, batch_size)
+    full = pipeline.process_many(sentences, batch_size)
+    full_texts = [decision['text'] or '' for decision in full]
+    full_accuracy = vocalization_agreement(full_texts, gold)['word_agreement']
+
+    rows = []
+    for threshold in thresholds:
+        skipped = [
+            i for i, (text, margins) in enumerate(with_margins)
+            if text is not None and margins is not None and min_margin(margins) >= threshold
+        ]
+        skipped_set = set(skipped)
+        gated = [
+            with_margins[i][0] if i in skipped_set else full_texts[i]
+            for i in range(len(sentences))
+        ]
+        agreeing = sum(full[i]['confidence'] == 'very_high' for i in skipped)
+        rows.append({
+            'threshold': threshold,
+            'skip_rate': len(skipped) / len(sentences) if sentences else 0.0,
+            'skipped_engine_agreement': agreeing / len(skipped) if skipped else 0.0,
+            'skipped_word_accuracy': vocalization_agreement(
+                [gated[i] for i in skipped], [gold[i] for i in skipped]
+            )['word_agreement'] if skipped else 0.0,
+            'gated_word_accuracy': vocalization_agreement(gated, gold)['word_agreement'],
+            'full_word_accuracy': full_accuracy,
+        })
+    return rows
+
+
+def decoding_mismatches(pipeline, sentences, batch_size=32):
+    """
+    משווה את הטקסט של predict_with_margins לזה של predict() של המודל
+
+    Returns:
+        רשימת (אינדקס, predict(), predict_with_margins) למשפטים שבהם
+        הפענוח מה-logits לא זהה לפלט של ה-remote code
+    """
+    model = pipeline.dictabert_nikud['model']
+    tokenizer = pipeline.dictabert_nikud['tokenizer']
+    mismatches = []
+    for first in range(0, len(sentences), batch_size):
+        batch = sentences[first:first + batch_size]
+        expected = model.predict(batch, tokenizer)
+        gated = predict_with_margins(model, batch, tokenizer)
+        for offset, (text, (gated_text, _)) in enumerate(zip(expected, gated)):
+            if text != gated_text:
+                mismatches.append((first + offset, text, gated_text))
+    return mismatches
+
+
+def main():
+    from complete_nikud_pipeline import HebrewNikudPipeline
+
+    parser = argparse.ArgumentParser(description="כיול סף הביטחון של DictaBERT")
+    parser.add_argument('gold', help="קובץ מנוקד ידנית (שורה לכל משפט)")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=list(DEFAULT_THRESHOLDS))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    parser.add_argument('--check-decoding', action='store_true',
+                        help="בדיקה שהפענוח מה-logits זהה ל-predict() של המודל")
+    args = parser.parse_args()
+
+    with open(args.gold, encoding='utf-8') as f:
+        gold = [line.rstrip('\n') for line in f if line.strip()]
+
+    with contextlib.redirect_stdout(sys.stderr), HebrewNikudPipeline(
+        workers=args.workers, backend=args.backend, expand_abbreviations=False
+    ) as pipeline:
+        rows = calibration_report(pipeline, gold, args.thresholds, args.batch_size)
+        mismatches = None
+        if args.check_decoding:
+            mismatches = decoding_mismatches(
+                pipeline, [remove_nikud(line) for line in gold], args.batch_size
+            )
+
+    print("=" * 70)
+    print(f"כיול שער הביטחון ({len(gold)} משפטים)")
+    print("=" * 70)
+    print(f"{'סף':>8}{'דילוג':>10}{'הסכמה':>10}{'דיוק מדולגים':>16}{'דיוק מדורג':>14}{'דיוק מלא':>12}")
+    for row in rows:
+        print(f"{row['threshold']:>8.2f}{row['skip_rate']:>10.2%}"
+              f"{row['skipped_engine_agreement']:>10.2%}{row['skipped_word_accuracy']:>16.2%}"
+              f"{row['gated_word_accuracy']:>14.2%}{row['full_word_accuracy']:>12.2%}")
+    if mismatches is not None:
+        print(f"\n🔍 פענוח מה-logits מול predict(): {len(mismatches)} משפטים שונים")
+        for index, expected, gated in mismatches[:10]:
+            print(f"  {index}: {expected}\n  {' ' * len(str(index))}  {gated}")
+
+
+if __name__ == "__main__":
+    main()
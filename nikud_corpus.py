@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+ניקוד קורפוס שלם - קורא קובץ טקסט (או stdin) שורה אחרי שורה
+וכותב הכרעת ניקוד לכל שורה כ-JSONL, בזיכרון קבוע בלי קשר לגודל הקלט
+
+שימוש:
+    python nikud_corpus.py book.txt -o book.jsonl
+    cat book.txt | python nikud_corpus.py - > book.jsonl
+    python nikud_corpus.py library.txt -o library.jsonl --dedupe
+    python nikud_corpus.py library.txt -o library.jsonl --checkpoint [--resume]
+
+--dedupe מוסיף מעבר מקדים: השורות מנורמלות ומזוהות לפי hash, רק שורות
+ייחודיות נשלחות למודלים, וההכרעה משוכפלת לכל מופע. בתוך בלוק של
+dedupe_block שורות הכפילויות מזוהות כולן; בין בלוקים - לפי אינדקס
+hash -> הכרעה מוגבל בזיכרון, שמחזיק את הנוסחים השכיחים לאורך כל הריצה.
+
+--checkpoint כותב יומן נקודות שמירה לצד הפלט, ו---resume ממשיך ממנו
+אחרי שהתהליך נעצר (ראה nikud_checkpoint.py).
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import sys
+import time
+
+from complete_nikud_pipeline import DEFAULT_BATCH_SIZE, DEFAULT_ONNX_DIR, HebrewNikudPipeline
+from nikud_batching import DEFAULT_MAX_BATCH_TOKENS
+from nikud_cache import MemoryBudgetLRU
+from nikud_checkpoint import DEFAULT_CHECKPOINT_SECONDS, CorpusJournal
+from nikud_logging import configure_logging
+from nikud_pool import PipelinePool
+from nikud_records import ColumnarWriter, DecisionRecord
+from nikud_text import normalize_text
+
+# כל כמה שורות לדווח התקדמות
+PROGRESS_EVERY = 10_000
+
+# מעבר הכפילויות: שורות לבלוק, ותקציב הזיכרון של האינדקס בין בלוקים
+DEFAULT_DEDUPE_BLOCK = 50_000
+DEFAULT_DEDUPE_MEMORY = 256 * 1024 * 1024
+
+
+def decision_record(line_number, text, decision):
+    """רשומת JSONL אחת: מספר שורה, קלט והכרעה"""
+    return {'line': line_number, 'input': text, **decision}
+
+
+def write_jsonl(records, output):
+    """כותב רשומות JSONL ומחזיר כמה נכתבו"""
+    count = 0
+    for record in records:
+        output.write(json.dumps(record, ensure_ascii=False))
+        output.write('\n')
+        count += 1
+    return count
+
+
+def _record_size(key, record):
+    """הערכת זיכרון (בבתים) ל-DecisionRecord באינדקס הכפילויות"""
+    text_size = len(record.text or '') + len(record.alternative or '')
+    return 150 + len(key) + 2 * text_size + 200 * len(record.disputed)
+
+
+class Deduplicator:
+    """
+    מעבר כפילויות לפני המודלים
+
+    Args:
+        block_size: מספר השורות שנאספות ומזוהות יחד
+        memory_bytes: תקציב האינדקס hash -> הכרעה בין בלוקים
+    """
+
+    def __init__(self, block_size=DEFAULT_DEDUPE_BLOCK, memory_bytes=DEFAULT_DEDUPE_MEMORY):
+        self.block_size = block_size
+        self.index = MemoryBudgetLRU(memory_bytes, _record_size)
+        self.lines = 0
+        self.inferred = 0
+
+    @staticmethod
+    def key(normalized):
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+    def ratio(self):
+        """החלק של השורות שלא עברו במודלים"""
+        return 1 - self.inferred / self.lines if self.lines else 0.0
+
+    def stats(self):
+        return {
+            'lines': self.lines,
+            'model_inputs': self.inferred,
+            'dedupe_ratio': round(self.ratio(), 4),
+            'index_entries': len(self.index),
+        }
+
+    def stream(self, pipeline, lines, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        כמו process_stream: (מספר שורה, טקסט, הכרעה) לפי סדר הקלט, בלי
+        שורות ריקות - אבל כל טקסט ייחודי עובר במודלים פעם אחת בלבד
+        """
+        block = []
+        for line_number, line in enumerate(lines, start=1):
+            text = line.rstrip('\r\n')
+            if not text.strip():
+                continue
+            block.append((line_number, text))
+            if len(block) >= self.block_size:
+                yield from self._process_block(pipeline, block, batch_size)
+                block = []
+        if block:
+            yield from self._process_block(pipeline, block, batch_size)
+
+    def _process_block(self, pipeline, block, batch_size):
+        # למודלים נשלח הנוסח המנורמל, כך שכל המופעים מקבלים אותו פלט
+        # בלי קשר לשאלה איזה מהם הופיע ראשון
+        normalized = [normalize_text(text) for _, text in block]
+        keys = [self.key(text) for text in normalized]
+        decided = {}
+        unique = {}
+        for key, text in zip(keys, normalized):
+            if key in decided or key in unique:
+                continue
+            record = self.index.get(key)
+            if record is not None:
+                decided[key] = record.to_dict()
+            else:
+                unique[key] = text
+
+        if unique:
+            decisions = pipeline.process_many(list(unique.values()), batch_size)
+            for key, decision in zip(unique, decisions):
+                decided[key] = decision
+                if decision['text'] is not None:
+                    self.index.put(key, DecisionRecord.from_dict(decision))
+
+        self.lines += len(block)
+        self.inferred += len(unique)
+        for key, (line_number, text) in zip(keys, block):
+            yield line_number, text, decided[key]
+
+
+def run_corpus(pipeline, lines, output, batch_size=DEFAULT_BATCH_SIZE, log=sys.stderr,
+               dedupe=None, journal=None):
+    """
+    מעבד זרם שורות וכותב JSONL באופן מצטבר (flush אחרי כל אצווה)
+
+    output יכול להיות גם ColumnarWriter (nikud_records.py). dedupe
+    (Deduplicator) שולח למודלים רק שורות ייחודיות. journal (CorpusJournal)
+    מקבל כל אצווה שנכתבה, ו-lines צריך להיות ה-source שלו.
+
+    Returns:
+        מספר השורות שעובדו
+    """
+    start = time.time()
+    first_line = journal.first_line if journal is not None else 1
+    written = 0
+    pending = []
+    if dedupe is not None:
+        results = dedupe.stream(pipeline, lines, batch_size)
+    else:
+        results = pipeline.process_stream(lines, batch_size)
+    for line_number, text, decision in results:
+        pending.append(decision_record(line_number + first_line - 1, text, decision))
+        if len(pending) >= batch_size:
+            written += _flush(pending, output, journal)
+            pending = []
+            if written % PROGRESS_EVERY < batch_size:
+                elapsed = time.time() - start
+                print(f"📊 {written:,} שורות | {written / elapsed:.1f} שורות/שנייה", file=log)
+    written += _flush(pending, output, journal, done=True)
+    return written
+
+
+def _flush(records, output, journal, done=False):
+    if isinstance(output, ColumnarWriter):
+        return output.write_records(records)
+    count = write_jsonl(records, output)
+    output.flush()
+    if journal is not None:
+        journal.completed(output, records[-1]['line'] if records else None, count, done)
+    return count
+
+
+def make_runner(args):
+    """פייפליין בתהליך אחד, או מאגר תהליכים אם ביקשו --processes"""
+    pipeline_kwargs = {
+        'workers': args.workers,
+        'max_batch_tokens': args.max_batch_tokens,
+        'cpu_fast': args.cpu_fast,
+        'backend': args.backend,
+        'onnx_dir': args.onnx_dir,
+        'expand_abbreviations': args.expand_abbreviations,
+        'lexicon': args.lexicon,
+        'skip_margin': args.skip_margin,
+    }
+    if args.processes:
+        return PipelinePool(
+            args.processes,
+            threads_per_worker=args.threads_per_worker,
+            batch_size=args.batch_size,
+            cache_path=args.cache,
+            pipeline_kwargs=pipeline_kwargs
+        )
+    pipeline = HebrewNikudPipeline(**pipeline_kwargs)
+    if args.cache:
+        pipeline.enable_cache(args.cache)
+    return pipeline
+
+
+def add_pipeline_arguments(parser):
+    """הארגומנטים שבונים את הפייפליין (משותפים ל-nikud_shards.py)"""
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--max-batch-tokens', type=int, default=DEFAULT_MAX_BATCH_TOKENS,
+                        help="תקציב טוקנים מרופדים לאצווה של DictaBERT")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="threads להרצת DictaBERT ו-Nakdimon במקביל")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="מספר תהליכי עבודה (0 = תהליך אחד, בלי מאגר)")
+    parser.add_argument('--threads-per-worker', type=int, default=1,
+                        help="threads של torch בכל תהליך עבודה")
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch',
+                        help="onnx = ONNX Runtime בלי torch (ראה nikud_onnx.py export)")
+    parser.add_argument('--onnx-dir', default=DEFAULT_ONNX_DIR)
+    parser.add_argument('--cpu-fast', action='store_true',
+                        help="קוונטיזציה int8 + inference_mode (ראה nikud_cpu.py)")
+    parser.add_argument('--expand-abbreviations', action='store_true',
+                        help="הרחבת ראשי תיבות לפני המודלים (ההרחבה נשארת בפלט)")
+    parser.add_argument('--skip-margin', type=float,
+                        help="שער ביטחון: בלי Nakdimon כשכל האותיות מעל הסף (ראה nikud_confidence.py)")
+    parser.add_argument('--lexicon', help="לקסיקון ביטויים (nikud_lexicon.py build)")
+    parser.add_argument('--cache', metavar='DB', help="קובץ sqlite למטמון הכרעות")
+    parser.add_argument('--log-level', default='WARNING',
+                        help="לוגים כ-JSON lines ל-stderr (DEBUG/INFO/WARNING/ERROR)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ניקוד קורפוס שלם ל-JSONL")
+    parser.add_argument('input', help="קובץ טקסט, או - עבור stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="קובץ JSONL, או תיקייה עם --format columnar (ברירת מחדל: stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'columnar'], default='jsonl',
+                        help="columnar = תיקיית עמודות לכלי הגהה (ראה nikud_records.py)")
+    add_pipeline_arguments(parser)
+    parser.add_argument('--dedupe', action='store_true',
+                        help="רק שורות ייחודיות (אחרי נרמול) עוברות במודלים")
+    parser.add_argument('--dedupe-block', type=int, default=DEFAULT_DEDUPE_BLOCK)
+    parser.add_argument('--checkpoint', action='store_true',
+                        help="יומן נקודות שמירה ב-<output>.journal (דורש קובץ קלט ו--o)")
+    parser.add_argument('--checkpoint-seconds', type=float, default=DEFAULT_CHECKPOINT_SECONDS,
+                        help="מרווח מינימלי בין נקודות שמירה")
+    parser.add_argument('--resume', action='store_true',
+                        help="המשך מנקודת השמירה האחרונה ביומן")
+    parser.add_argument('--stats', action='store_true',
+                        help="הדפס זמנים לפי שלב בסוף (בתהליך אחד בלבד)")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume דורש --checkpoint")
+    if args.checkpoint and '-' in (args.input, args.output):
+        parser.error("--checkpoint דורש קובץ קלט וקובץ פלט (לא stdin/stdout)")
+    if args.format == 'columnar' and (args.output == '-' or args.checkpoint):
+        parser.error("--format columnar דורש -o (תיקייה) ולא תומך ב---checkpoint")
+
+    journal = None
+    if args.checkpoint:
+        try:
+            journal, output = CorpusJournal.open(
+                args.input, args.output, args.resume, args.checkpoint_seconds
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        if journal is None:
+            print(f"✅ הריצה על {args.input} כבר הושלמה", file=sys.stderr)
+            return
+        source = journal.source
+        if journal.line:
+            print(f"🔁 ממשיך משורה {journal.line + 1:,} "
+                  f"({journal.records:,} רשומות כבר בפלט)", file=sys.stderr)
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        if args.format == 'columnar':
+            output = ColumnarWriter(args.output)
+        elif args.output == '-':
+            output = sys.stdout
+        else:
+            output = open(args.output, 'w', encoding='utf-8')
+    if args.input == '-':
+        sys.stdin.reconfigure(encoding='utf-8')
+    if args.output == '-':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    dedupe = Deduplicator(args.dedupe_block) if args.dedupe else None
+    start = time.time()
+    # הודעות הפייפליין הולכות ל-stderr כדי לא לשבש את ה-JSONL
+    with contextlib.redirect_stdout(sys.stderr), make_runner(args) as pipeline:
+        try:
+            count = run_corpus(pipeline, source, output, args.batch_size,
+                               dedupe=dedupe, journal=journal)
+        finally:
+            if journal is not None:
+                journal.close()
+            elif source is not sys.stdin:
+                source.close()
+            if output is not sys.stdout:
+                output.close()
+
+    elapsed = time.time() - start
+    print(f"✅ {count:,} שורות עובדו תוך {elapsed:.1f} שניות", file=sys.stderr)
+    if journal is not None:
+        overhead = journal.seconds / elapsed if elapsed else 0.0
+        print(f"💾 נקודות שמירה: {journal.stats()} ({overhead:.2%} מזמן הריצה)", file=sys.stderr)
+    if dedupe is not None:
+        print(f"♻️  כפילויות: {dedupe.stats()}", file=sys.stderr)
+    if pipeline.error_count:
+        print(f"⚠️  שגיאות: {pipeline.errors()}", file=sys.stderr)
+    if args.processes:
+        return
+    if args.cache:
+        print(f"📦 מטמון: {pipeline.cache.stats()}", file=sys.stderr)
+    if args.stats:
+        pipeline.stats.dump(sys.stderr)
+        print(f"🔤 קידודים: {pipeline.encodings.stats()}", file=sys.stderr)
+        print(f"🔍 מורפולוגיה: {pipeline.morph_cache.stats()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
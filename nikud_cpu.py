@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+מצב cpu-fast למודלי DictaBERT - לשרתים בלי GPU
+
+1. קוונטיזציה דינמית int8 לשכבות Linear (torch.quantization.quantize_dynamic)
+2. הרצת predict() תחת torch.inference_mode()
+3. כיוון threads: intra-op לפי מספר הליבות, inter-op = 1
+
+הקוונטיזציה משנה מעט את ההסתברויות, ולכן לפני שמפעילים את המצב בייצור
+צריך למדוד את ההפרש מול fp32 על סט ייחוס:
+
+    python nikud_cpu.py reference.txt [--gold gold.txt] [--min-word-agreement 0.99]
+
+הדוח מציג תפוקה (משפטים/שנייה) לכל מצב, אחוז התאמה בין הפלטים, ואם יש
+קובץ gold מנוקד - דיוק של כל מצב והפרש הדיוק ביניהם. הקוד יוצא עם
+קוד שגיאה אם ההתאמה נמוכה מהסף, כך שאפשר להריץ אותו כבדיקת רגרסיה.
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+
+
+class InferenceModeModel:
+    """עוטף מודל כך ש-predict() רץ תחת torch.inference_mode()"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, *args, **kwargs):
+        import torch
+        with torch.inference_mode():
+            return self.model.predict(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def tune_cpu_threads(threads=None):
+    """קובע threads ל-torch: intra-op לפי הליבות (או threads), inter-op = 1"""
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    try:
+        # אפשר לקבוע רק לפני שהופעל חישוב מקבילי ראשון
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def apply_cpu_fast(model_entry, threads=None):
+    """
+    ממיר {'tokenizer', 'model'} של DictaBERT למצב cpu-fast
+
+    המודל המקורי לא משתנה - quantize_dynamic מחזיר עותק שבו כל
+    nn.Linear הוחלף בגרסת int8, עם אותה מחלקה ואותה predict().
+    """
+    import torch
+    tune_cpu_threads(threads)
+    quantized = torch.quantization.quantize_dynamic(
+        model_entry['model'], {torch.nn.Linear}, dtype=torch.qint8
+    )
+    quantized.eval()
+    return {
+        'tokenizer': model_entry['tokenizer'],
+        'model': InferenceModeModel(quantized),
+    }
+
+
+def _read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def _timed_nikud(pipeline, sentences, batch_size):
+    start = time.perf_counter()
+    outputs = pipeline.nikud_many_with_dictabert(sentences, batch_size)
+    return outputs, time.perf_counter() - start
+
+
+def compare_cpu_fast(sentences, gold=None, batch_size=32, threads=None):
+    """
+    מריץ DictaBERT-nikud ב-fp32 וב-cpu-fast על אותם משפטים ומשווה
+
+    Returns:
+        מילון דוח: תפוקה לכל מצב, התאמה ביניהם, ודיוק מול gold (אם ניתן)
+    """
+    from complete_nikud_pipeline import HebrewNikudPipeline
+    from nikud_text import remove_nikud, vocalization_agreement
+
+    if gold is not None:
+        sentences = [remove_nikud(line) for line in gold]
+
+    with contextlib.redirect_stdout(sys.stderr):
+        fp32 = HebrewNikudPipeline(cpu_threads=threads)
+        fast = HebrewNikudPipeline(cpu_fast=True, cpu_threads=threads)
+        # טעינה מראש, כדי שזמן הטעינה לא ייכנס למדידה
+        for pipeline in (fp32, fast):
+            pipeline.prefetch('dictabert_nikud')[0].join()
+
+    # חימום - הקריאה הראשונה כוללת אתחולים חד-פעמיים
+    fp32.nikud_many_with_dictabert(sentences[:batch_size], batch_size)
+    fast.nikud_many_with_dictabert(sentences[:batch_size], batch_size)
+
+    fp32_outputs, fp32_seconds = _timed_nikud(fp32, sentences, batch_size)
+    fast_outputs, fast_seconds = _timed_nikud(fast, sentences, batch_size)
+
+    report = {
+        'sentences': len(sentences),
+        'fp32_sentences_per_sec': len(sentences) / fp32_seconds,
+        'cpu_fast_sentences_per_sec': len(sentences) / fast_seconds,
+        'speedup': fp32_seconds / fast_seconds,
+        'agreement': vocalization_agreement(fast_outputs, fp32_outputs),
+    }
+    if gold is not None:
+        fp32_accuracy = vocalization_agreement(fp32_outputs, gold)
+        fast_accuracy = vocalization_agreement(fast_outputs, gold)
+        report['fp32_accuracy'] = fp32_accuracy
+        report['cpu_fast_accuracy'] = fast_accuracy
+        report['word_accuracy_delta'] = (
+            fast_accuracy['word_agreement'] - fp32_accuracy['word_agreement']
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="בדיקת דיוק ותפוקה של מצב cpu-fast")
+    parser.add_argument('reference', help="קובץ משפטי ייחוס (שורה לכל משפט)")
+    parser.add_argument('--gold', help="קובץ מנוקד ידנית (מחליף את המשפטים בגרסה בלי ניקוד שלו)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, help="threads של torch")
+    parser.add_argument('--min-word-agreement', type=float, default=0.99,
+                        help="סף התאמה ברמת מילה בין cpu-fast ל-fp32")
+    args = parser.parse_args()
+
+    gold = _read_lines(args.gold) if args.gold else None
+    sentences = _read_lines(args.reference)
+    report = compare_cpu_fast(sentences, gold, args.batch_size, args.threads)
+
+    agreement = report['agreement']
+    print("=" * 70)
+    print("cpu-fast מול fp32")
+    print("=" * 70)
+    print(f"משפטים: {report['sentences']}")
+    print(f"fp32:     {report['fp32_sentences_per_sec']:.1f} משפטים/שנייה")
+    print(f"cpu-fast: {report['cpu_fast_sentences_per_sec']:.1f} משפטים/שנייה "
+          f"(x{report['speedup']:.2f})")
+    print(f"התאמה: משפטים {agreement['sentence_agreement']:.2%} | "
+          f"מילים {agreement['word_agreement']:.2%} | "
+          f"אותיות {agreement['letter_agreement']:.2%}")
+    if 'word_accuracy_delta' in report:
+        print(f"דיוק מול gold (מילים): fp32 {report['fp32_accuracy']['word_agreement']:.2%} | "
+              f"cpu-fast {report['cpu_fast_accuracy']['word_agreement']:.2%} | "
+              f"הפרש {report['word_accuracy_delta']:+.2%}")
+
+    if agreement['word_agreement'] < args.min_word_agreement:
+        print(f"❌ התאמה ברמת מילה מתחת לסף {args.min_word_agreement:.2%}")
+        sys.exit(1)
+    print("✅ בתוך הסף")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+פענוח הפלט של מודלי DictaBERT בלי torch
+
+מימוש מחדש (על מערכי numpy) של השלב שאחרי ה-forward ב-predict() של
+ה-remote code: מ-logits של ניקוד/שי"ן לטקסט מנוקד, ומ-logits של
+מורפולוגיה לרשימת טוקנים עם POS. משמש את ה-backend של ONNX Runtime,
+שבו אין את קוד המודל של HuggingFace.
+
+letter_margins() מחשב לכל אות את המרווח בין ההסתברות של המחלקה
+שנבחרה לזו שאחריה - מדד הביטחון שמשמש את שער הביטחון (nikud_confidence).
+
+התוויות (nikud_classes, shin_classes, ALL_POS וכו') לא מוגדרות כאן -
+הן נשמרות ב-labels.json בזמן הייצוא (nikud_onnx.py export) מתוך
+ה-config וה-remote code של המודל (collect_labels), כך שהפענוח תמיד
+תואם למודל שיוצא.
+"""
+
+import sys
+
+from nikud_text import is_hebrew_letter
+
+# אותיות שיכולות לשמש אם קריאה
+MATRES_LETTERS = 'אוי'
+
+
+def flatten_logits(logits):
+    """פורש את ה-logits של המודל (tensor / ModelOutput / NamedTuple) לזוגות (שם, tensor)"""
+    if hasattr(logits, 'items'):
+        return list(logits.items())
+    if hasattr(logits, '_asdict'):
+        return list(logits._asdict().items())
+    return [('logits', logits)]
+
+
+def collect_labels(model, kind, output_names):
+    """אוסף את התוויות שהפענוח צריך, מה-config ומהמודול של ה-remote code"""
+    labels = {'kind': kind, 'outputs': output_names}
+    config = model.config
+    if kind == 'nikud':
+        labels['nikud_classes'] = list(config.nikud_classes)
+        labels['shin_classes'] = list(config.shin_classes)
+        labels['mat_lect_token'] = getattr(config, 'mat_lect_token', None)
+    else:
+        remote_module = sys.modules[type(model).__module__]
+        for name in dir(remote_module):
+            value = getattr(remote_module, name)
+            if name.startswith('ALL_') and isinstance(value, (list, tuple)):
+                labels[name] = [list(v) if isinstance(v, tuple) else v for v in value]
+    return labels
+
+
+def decode_nikud(sentence, offsets, nikud_ids, shin_ids, labels, mark_matres_lectionis=None):
+    """
+    מרכיב את הטקסט המנוקד של משפט אחד (כמו predict() של DictaBERT-nikud)
+
+    Args:
+        sentence: המשפט בלי ניקוד
+        offsets: טווחי התווים של כל טוקן (tokenizer עם offsets)
+        nikud_ids, shin_ids: המחלקה שנבחרה לכל טוקן
+        labels: {'nikud_classes', 'shin_classes', 'mat_lect_token'}
+    """
+    nikud_classes = labels['nikud_classes']
+    shin_classes = labels['shin_classes']
+    mat_lect_token = labels.get('mat_lect_token')
+
+    output = []
+    previous_end = 0
+    for index, (start, end) in enumerate(offsets):
+        if start > previous_end:
+            output.append(sentence[previous_end:start])
+        # טוקנים מיוחדים וטוקנים של יותר מתו אחד לא מקבלים ניקוד
+        if end - start != 1:
+            continue
+        char = sentence[start:end]
+        previous_end = end
+        if not is_hebrew_letter(char):
+            output.append(char)
+            continue
+        nikud = nikud_classes[int(nikud_ids[index])]
+        shin = shin_classes[int(shin_ids[index])] if char == 'ש' else ''
+        if nikud == mat_lect_token:
+            if char in MATRES_LETTERS and mark_matres_lectionis is not None:
+                nikud = mark_matres_lectionis
+            else:
+                nikud = ''
+        output.append(char + shin + nikud)
+    output.append(sentence[previous_end:])
+    return ''.join(output)
+
+
+def softmax(logits):
+    """softmax על הציר האחרון של מערך numpy"""
+    import numpy as np
+
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+def _top_margin(probabilities):
+    """הפרש בין שתי ההסתברויות הגבוהות ביותר"""
+    import numpy as np
+
+    if probabilities.shape[-1] < 2:
+        return 1.0
+    top_two = np.partition(probabilities, -2)[-2:]
+    return float(top_two[1] - top_two[0])
+
+
+def letter_margins(sentence, offsets, nikud_logits, shin_logits):
+    """
+    מרווח הביטחון של כל תו במשפט (1.0 לתווים שאינם אותיות)
+
+    לכל אות: p(המחלקה שנבחרה) - p(המחלקה השנייה) של ראש הניקוד, ובשי"ן
+    גם של ראש השי"ן (הנמוך מביניהם).
+
+    Args:
+        sentence: המשפט בלי ניקוד
+        offsets: טווחי התווים של כל טוקן
+        nikud_logits, shin_logits: מערכים [tokens, classes]
+    """
+    margins = [1.0] * len(sentence)
+    nikud_probabilities = softmax(nikud_logits)
+    shin_probabilities = softmax(shin_logits)
+    for index, (start, end) in enumerate(offsets):
+        if end - start != 1 or not is_hebrew_letter(sentence[start]):
+            continue
+        margin = _top_margin(nikud_probabilities[index])
+        if sentence[start] == 'ש':
+            margin = min(margin, _top_margin(shin_probabilities[index]))
+        margins[start] = margin
+    return margins
+
+
+def decode_morph(sentence, word_ids, offsets, logits, labels):
+    """
+    מפענח ניתוח מורפולוגי של משפט אחד
+
+    כל מילה מקבלת את התחזית של ה-subword הראשון שלה. מחזיר את השדות
+    שהפייפליין משתמש בהם - token, pos, prefixes, suffix - ולא את כל
+    הפלט של predict() המקורי (למשל בלי features).
+
+    Args:
+        word_ids: אינדקס המילה של כל טוקן (None לטוקנים מיוחדים)
+        offsets: טווחי התווים של כל טוקן
+        logits: מילון שם פלט -> מערך [tokens, classes] (pos_logits וכו')
+        labels: {'ALL_POS', 'ALL_PREFIX_POS', 'ALL_SUFFIX_POS', ...}
+    """
+    words = {}
+    for index, word_id in enumerate(word_ids):
+        if word_id is None:
+            continue
+        start, end = offsets[index]
+        if word_id not in words:
+            words[word_id] = [index, start, end]
+        else:
+            words[word_id][2] = end
+
+    pos_labels = labels.get('ALL_POS', [])
+    prefix_labels = labels.get('ALL_PREFIX_POS', [])
+    suffix_labels = labels.get('ALL_SUFFIX_POS', [])
+
+    tokens = []
+    for word_id in sorted(words):
+        index, start, end = words[word_id]
+        token = {'token': sentence[start:end], 'pos': None, 'prefixes': [], 'suffix': False}
+        if 'pos_logits' in logits and pos_labels:
+            token['pos'] = pos_labels[int(logits['pos_logits'][index].argmax())]
+        if 'prefix_logits' in logits and prefix_labels:
+            # כמה תחיליות אפשריות לכל מילה - סיווג בינארי לכל תווית
+            chosen = logits['prefix_logits'][index] > 0
+            token['prefixes'] = [label for label, on in zip(prefix_labels, chosen) if on]
+        if 'suffix_logits' in logits and suffix_labels:
+            suffix = suffix_labels[int(logits['suffix_logits'][index].argmax())]
+            token['suffix'] = suffix if suffix not in ('', 'NONE', None) else False
+        tokens.append(token)
+    return {'text': sentence, 'tokens': tokens}
@@ -0,0 +1,295 @@
+"""
+ניקוד מצטבר של מסמך שעובר הגהה
+
+NikudDocument שומר לכל פסקה hash של התוכן, ולכל משפט את ההכרעה שלו.
+אחרי עריכה, update() משווה את הפסקאות החדשות לישנות לפי hash, ובתוך
+פסקה שהשתנתה - את המשפטים. רק משפטים שהשתנו רצים שוב בפייפליין, יחד
+עם context_sentences משפטי הקשר מכל צד (ההקשר רק נכנס למודל - ההכרעות
+של משפטי ההקשר עצמם נשמרות כמו שהן), והתוצאות משובצות בחזרה במסמך.
+
+    document = NikudDocument(pipeline)
+    document.update(page_text)          # פעם ראשונה: כל המסמך
+    document.update(edited_page_text)   # רק המשפטים שהשתנו
+    print(document.vocalized())
+    document.save('book.nikud.json')    # להמשך ההגהה בפעם הבאה
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import time
+
+from complete_nikud_pipeline import DEFAULT_BATCH_SIZE, dispute_decision
+from nikud_text import normalize_text, sentence_spans
+
+DEFAULT_CONTEXT_SENTENCES = 1
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _splice_words(plain, words):
+    """משבץ מילים מנוקדות ברווחים של הטקסט המקורי"""
+    pieces = []
+    previous_end = 0
+    for match, word in zip(_WORD_RE.finditer(plain), words):
+        pieces.append(plain[previous_end:match.start()])
+        pieces.append(word)
+        previous_end = match.end()
+    pieces.append(plain[previous_end:])
+    return ''.join(pieces)
+
+
+def _shift_words(words, first_word, last_word):
+    """המילים שבטווח המשפט, עם אינדקסים יחסית למשפט"""
+    return [
+        dict(word, index=word['index'] - first_word)
+        for word in words
+        if first_word <= word['index'] < last_word
+    ]
+
+
+def slice_decision(decision, plain, first_word, num_words, window_words):
+    """
+    חותך מהכרעה על חלון את החלק של משפט אחד
+
+    הכרעה עם מילים במחלוקת נבנית מחדש רק מהמילים שבמשפט, לפי הכללים
+    של decide_nikud: משפט בלי מחלוקת מקבל הסכמה מלאה בלי alternative,
+    וההערות סופרות רק את המילים הלא ברורות שבו. שדות שמתארים את החלון
+    כולו (abbreviations, min_margin) לא עוברים למשפט.
+
+    Args:
+        decision: ההכרעה על כל החלון
+        plain: טקסט המשפט (בלי ניקוד)
+        first_word: אינדקס המילה הראשונה של המשפט בחלון
+        num_words: מספר המילים במשפט
+        window_words: מספר המילים בחלון כולו
+
+    Returns:
+        הכרעה למשפט, או None אם מספר המילים בפלט לא תואם לחלון
+        (למשל אחרי הרחבת ראשי תיבות)
+    """
+    last_word = first_word + num_words
+    texts = {}
+    for field in ('text', 'alternative'):
+        if decision.get(field) is None:
+            continue
+        words = decision[field].split()
+        if len(words) != window_words:
+            return None
+        texts[field] = _splice_words(plain, words[first_word:last_word])
+
+    if 'disputed_words' in decision:
+        sliced = dispute_decision(
+            texts.get('text'), texts.get('alternative'),
+            _shift_words(decision['disputed_words'], first_word, last_word),
+            analyzed=decision['source'] != 'DictaBERT (no morph)'
+        )
+    else:
+        sliced = {
+            key: value for key, value in decision.items()
+            if key not in ('abbreviations', 'min_margin')
+        }
+        sliced.update(texts)
+    if 'low_margin_words' in decision:
+        sliced['low_margin_words'] = [
+            index - first_word for index in decision['low_margin_words']
+            if first_word <= index < last_word
+        ]
+    return sliced
+
+
+class _Paragraph:
+    """פסקה: הטקסט, ה-hash, טווחי המשפטים וההכרעה של כל משפט"""
+
+    def __init__(self, text, decisions=None):
+        self.text = text
+        self.hash = content_hash(text)
+        self.spans = sentence_spans(text)
+        self.decisions = decisions or [None] * len(self.spans)
+
+    def sentence(self, index):
+        start, end = self.spans[index]
+        return self.text[start:end]
+
+    def vocalized(self):
+        pieces = []
+        previous_end = 0
+        for (start, end), decision in zip(self.spans, self.decisions):
+            pieces.append(self.text[previous_end:start])
+            text = decision.get('text') if decision else None
+            pieces.append(text if text is not None else self.text[start:end])
+            previous_end = end
+        pieces.append(self.text[previous_end:])
+        return ''.join(pieces)
+
+
+class NikudDocument:
+    """
+    מסמך מנוקד שמתעדכן באופן מצטבר
+
+    Args:
+        pipeline: HebrewNikudPipeline (או PipelinePool)
+        context_sentences: מספר משפטי ההקשר מכל צד של משפט שהשתנה
+        batch_size: גודל האצווה ל-process_many
+    """
+
+    def __init__(self, pipeline, context_sentences=DEFAULT_CONTEXT_SENTENCES,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.pipeline = pipeline
+        self.context_sentences = context_sentences
+        self.batch_size = batch_size
+        self.paragraphs = []
+        self.last_update = {}
+
+    def update(self, text):
+        """
+        מעדכן את המסמך לטקסט החדש ומריץ רק את המשפטים שהשתנו
+
+        Returns:
+            סיכום העדכון: פסקאות שהשתנו, משפטים שרצו שוב / נשמרו, זמן
+        """
+        start = time.perf_counter()
+        old = self.paragraphs
+        new_texts = text.split('\n')
+        matcher = difflib.SequenceMatcher(
+            a=[paragraph.hash for paragraph in old],
+            b=[content_hash(paragraph_text) for paragraph_text in new_texts],
+            autojunk=False
+        )
+
+        paragraphs = []
+        changed = []
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                paragraphs.extend(old[old_start:old_end])
+                continue
+            # משפטים מהפסקאות הישנות בטווח שהוחלף - לפי hash של הטקסט המנורמל
+            previous = {}
+            for paragraph in old[old_start:old_end]:
+                for index, decision in enumerate(paragraph.decisions):
+                    if decision is not None:
+                        previous[content_hash(normalize_text(paragraph.sentence(index)))] = decision
+            for paragraph_text in new_texts[new_start:new_end]:
+                paragraph = _Paragraph(paragraph_text)
+                for index in range(len(paragraph.spans)):
+                    key = content_hash(normalize_text(paragraph.sentence(index)))
+                    paragraph.decisions[index] = previous.get(key)
+                paragraphs.append(paragraph)
+                changed.append(paragraph)
+
+        self.paragraphs = paragraphs
+        rerun = self._rerun(changed)
+        total = sum(len(paragraph.spans) for paragraph in paragraphs)
+        self.last_update = {
+            'paragraphs': len(paragraphs),
+            'paragraphs_changed': len(changed),
+            'sentences': total,
+            'sentences_rerun': rerun,
+            'sentences_reused': total - rerun,
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        return self.last_update
+
+    def _windows(self, paragraph):
+        """
+        חלונות להרצה: כל רצף משפטים חסרי הכרעה, עם משפטי הקשר מכל צד
+
+        Yields:
+            (טקסט החלון, [(אינדקס משפט, מילה ראשונה בחלון, מספר מילים)])
+        """
+        # גם משפטים שהניקוד שלהם נכשל בפעם הקודמת רצים שוב
+        missing = [
+            i for i, decision in enumerate(paragraph.decisions)
+            if decision is None or decision.get('text') is None
+        ]
+        runs = []
+        for index in missing:
+            if runs and index == runs[-1][1]:
+                runs[-1][1] = index + 1
+            else:
+                runs.append([index, index + 1])
+
+        for run_start, run_end in runs:
+            first = max(0, run_start - self.context_sentences)
+            last = min(len(paragraph.spans), run_end + self.context_sentences)
+            window_start = paragraph.spans[first][0]
+            window_end = paragraph.spans[last - 1][1]
+            targets = []
+            for index in range(run_start, run_end):
+                start, end = paragraph.spans[index]
+                first_word = len(paragraph.text[window_start:start].split())
+                targets.append((index, first_word, len(paragraph.text[start:end].split())))
+            yield paragraph.text[window_start:window_end], targets
+
+    def _rerun(self, paragraphs):
+        """מריץ את כל החלונות של כל הפסקאות שהשתנו באצווה אחת"""
+        jobs = [
+            (paragraph, window, targets)
+            for paragraph in paragraphs
+            for window, targets in self._windows(paragraph)
+        ]
+        if not jobs:
+            return 0
+
+        decisions = self.pipeline.process_many([window for _, window, _ in jobs], self.batch_size)
+        fallback = []
+        rerun = 0
+        for (paragraph, window, targets), decision in zip(jobs, decisions):
+            for index, first_word, num_words in targets:
+                rerun += 1
+                sliced = slice_decision(
+                    decision, paragraph.sentence(index), first_word, num_words, len(window.split())
+                )
+                if sliced is None:
+                    fallback.append((paragraph, index))
+                else:
+                    paragraph.decisions[index] = sliced
+
+        # הפלט לא תואם מילה-מול-מילה לחלון - המשפט רץ לבד, בלי הקשר
+        if fallback:
+            alone = self.pipeline.process_many(
+                [paragraph.sentence(index) for paragraph, index in fallback], self.batch_size
+            )
+            for (paragraph, index), decision in zip(fallback, alone):
+                paragraph.decisions[index] = decision
+        return rerun
+
+    def vocalized(self):
+        """הטקסט המנוקד של כל המסמך"""
+        return '\n'.join(paragraph.vocalized() for paragraph in self.paragraphs)
+
+    def sentences(self):
+        """
+        Yields:
+            (מספר פסקה, מספר משפט, טקסט המשפט, הכרעה)
+        """
+        for paragraph_index, paragraph in enumerate(self.paragraphs):
+            for index, decision in enumerate(paragraph.decisions):
+                yield paragraph_index, index, paragraph.sentence(index), decision
+
+    def save(self, path):
+        """שומר את המסמך וההכרעות, כדי להמשיך מכאן בהפעלה הבאה"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'context_sentences': self.context_sentences,
+                'paragraphs': [
+                    {'text': paragraph.text, 'decisions': paragraph.decisions}
+                    for paragraph in self.paragraphs
+                ],
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, pipeline, batch_size=DEFAULT_BATCH_SIZE):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        document = cls(pipeline, data['context_sentences'], batch_size)
+        document.paragraphs = [
+            _Paragraph(paragraph['text'], paragraph['decisions'])
+            for paragraph in data['paragraphs']
+        ]
+        return document
@@ -0,0 +1,90 @@
+"""
+שכבת טוקניזציה משותפת: כל טקסט עובר טוקניזציה פעם אחת לכל tokenizer
+
+לפני כל אצווה הפייפליין מודד אורכים בטוקנים (nikud_batching), ה-backend
+של ONNX מקודד שוב את אותם טקסטים לפני ה-forward, והמורפולוגיה רצה שוב
+ושוב על אותם משפטים וטווחים. EncodingCache שומר את הקידוד לפי טביעת
+האצבע של ה-tokenizer + הטקסט, כך ששני מודלים עם אותו tokenizer
+(ואותו מודל בקריאות חוזרות) משתמשים באותו קידוד.
+
+DictaBERT-nikud עובד ברמת תו ו-DictaBERT-morph ב-wordpiece, כך שבפועל
+לכל אחד מהם קידוד משלו - אבל כל משפט מקודד לכל היותר פעם אחת לכל אחד.
+"""
+
+import hashlib
+
+from nikud_cache import MemoryBudgetLRU
+
+DEFAULT_ENCODING_CACHE_BYTES = 256 * 1024 * 1024
+
+# הערכת זיכרון לקידוד: ids, offsets, word ids ומבנה הפייתון שמסביב
+_ENTRY_OVERHEAD = 200
+_BYTES_PER_TOKEN = 48
+
+
+def tokenizer_fingerprint(tokenizer):
+    """מזהה קצר ל-tokenizer: סוג, מקור, גודל אוצר המילים ואורך מקסימלי"""
+    fingerprint = getattr(tokenizer, '_nikud_fingerprint', None)
+    if fingerprint is not None:
+        return fingerprint
+    try:
+        vocab_size = len(tokenizer)
+    except TypeError:
+        vocab_size = getattr(tokenizer, 'vocab_size', None)
+    parts = [
+        type(tokenizer).__name__,
+        str(getattr(tokenizer, 'name_or_path', '') or getattr(tokenizer, 'source', '')),
+        str(vocab_size),
+        str(getattr(tokenizer, 'model_max_length', '')),
+    ]
+    fingerprint = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+    try:
+        tokenizer._nikud_fingerprint = fingerprint
+    except AttributeError:
+        pass
+    return fingerprint
+
+
+def _encoding_size(key, encoding):
+    return _ENTRY_OVERHEAD + 2 * len(key[1]) + _BYTES_PER_TOKEN * len(encoding)
+
+
+class EncodingCache:
+    """
+    מטמון קידודים משותף, מוגבל בזיכרון
+
+    הערך הוא מה שפונקציית הקידוד מחזירה לטקסט אחד (רשימת ids, או
+    Encoding של ספריית tokenizers) - כל דבר שיש לו len() בטוקנים.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_ENCODING_CACHE_BYTES):
+        self._lru = MemoryBudgetLRU(max_bytes, _encoding_size)
+
+    def encode_many(self, tokenizer, texts, encode_batch):
+        """
+        מחזיר קידוד לכל טקסט; רק טקסטים שלא במטמון עוברים ב-encode_batch
+
+        Args:
+            tokenizer: ה-tokenizer (לטביעת האצבע)
+            encode_batch: פונקציה שמקבלת רשימת טקסטים ומחזירה קידוד לכל אחד
+        """
+        texts = list(texts)
+        fingerprint = tokenizer_fingerprint(tokenizer)
+        keys = [(fingerprint, text) for text in texts]
+        results = [self._lru.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            # טקסט שמופיע כמה פעמים באצווה מקודד פעם אחת
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = dict(zip(unique, encode_batch(unique)))
+            for i in missing:
+                results[i] = encoded[texts[i]]
+            for text, encoding in encoded.items():
+                self._lru.put((fingerprint, text), encoding)
+        return results
+
+    def clear(self):
+        self._lru.clear()
+
+    def stats(self):
+        return self._lru.stats()
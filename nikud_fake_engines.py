@@ -0,0 +1,177 @@
+"""
+מנועים מדומים ודטרמיניסטיים במקום DictaBERT-nikud, Nakdimon ו-DictaBERT-morph
+
+מאפשרים להריץ את HebrewNikudPipeline מקצה לקצה בלי להוריד מודלים -
+למדידת התקורה של הפייפליין עצמו (אצוות, threads, מטמון, הכרעה) ב-CI.
+
+כל מנוע מחזיר פלט באותו פורמט כמו המקורי, ו"ישן" זמן שנקבע מראש
+(time.sleep משחרר את ה-GIL, כמו חישוב של torch/TF):
+    - DictaBERT: זמן קבוע לאצווה + זמן לכל טוקן מרופד
+    - Nakdimon: זמן קבוע לקריאה + זמן לכל תו
+    - morph: זמן קבוע לאצווה + זמן לכל טוקן מרופד
+
+הניקוד נגזר מ-crc32 של המילה, כך שהוא זהה בין ריצות ובין תהליכים.
+disagreement_rate קובע איזה חלק מהמילים Nakdimon מנקד אחרת, ו-
+unclear_rate איזה חלק מהמילים מקבל מהמורפולוגיה pos=None.
+"""
+
+import time
+import zlib
+
+from nikud_text import is_hebrew_letter, remove_nikud
+
+# תנועות שהמנועים המדומים בוחרים מהן
+_VOWELS = ('ְ', 'ִ', 'ֵ', 'ֶ', 'ַ', 'ָ', 'ֹ', 'ֻ')
+_POS = ('NOUN', 'VERB', 'ADJ', 'ADP', 'ADV', 'PRON', 'PROPN')
+
+
+def _fraction(word, salt):
+    """מספר דטרמיניסטי בין 0 ל-1 לכל מילה"""
+    return zlib.crc32(f"{salt}\0{word}".encode('utf-8')) / 0xFFFFFFFF
+
+
+def _vocalize_word(word, salt=''):
+    vocalized = []
+    for position, char in enumerate(word):
+        vocalized.append(char)
+        if is_hebrew_letter(char):
+            index = zlib.crc32(f"{salt}\0{word}\0{position}".encode('utf-8'))
+            vocalized.append(_VOWELS[index % len(_VOWELS)])
+    return ''.join(vocalized)
+
+
+def fake_vocalize(text):
+    """הניקוד ה"נכון" של המנועים המדומים (מה ש-DictaBERT המדומה מחזיר)"""
+    return ' '.join(_vocalize_word(word) for word in remove_nikud(text).split(' '))
+
+
+def _sleep_ms(milliseconds):
+    if milliseconds > 0:
+        time.sleep(milliseconds / 1000)
+
+
+class FakeTokenizer:
+    """tokenizer ברמת תו (כמו DictaBERT-nikud): אורך = תווים + 2"""
+
+    def __init__(self, model_max_length=512):
+        self.model_max_length = model_max_length
+        self.name_or_path = 'fake-char-tokenizer'
+
+    def __call__(self, texts):
+        return {'input_ids': [[0] * (len(text) + 2) for text in texts]}
+
+
+class FakeDictaBERT:
+    """
+    DictaBERT-nikud מדומה
+
+    margins: המילים שבהן Nakdimon לא יסכים מקבלות מרווח ביטחון נמוך
+    (low_margin), וכל השאר high_margin - כדי שגם שער הביטחון יימדד.
+    """
+
+    def __init__(self, batch_ms=2.0, token_ms=0.01, disagreement_rate=0.1,
+                 low_margin=0.4, high_margin=0.99):
+        self.batch_ms = batch_ms
+        self.token_ms = token_ms
+        self.disagreement_rate = disagreement_rate
+        self.low_margin = low_margin
+        self.high_margin = high_margin
+        self.calls = 0
+
+    def _simulate(self, sentences):
+        self.calls += 1
+        padded = max((len(sentence) + 2 for sentence in sentences), default=0) * len(sentences)
+        _sleep_ms(self.batch_ms + self.token_ms * padded)
+
+    def predict(self, sentences, tokenizer=None):
+        self._simulate(sentences)
+        return [fake_vocalize(sentence) for sentence in sentences]
+
+    def predict_with_margins(self, sentences, tokenizer=None):
+        self._simulate(sentences)
+        results = []
+        for sentence in sentences:
+            plain = remove_nikud(sentence)
+            margins = []
+            for word in plain.split(' '):
+                uncertain = _fraction(word, 'nakdimon') < self.disagreement_rate
+                margin = self.low_margin if uncertain else self.high_margin
+                margins.extend([margin] * len(word))
+                margins.append(1.0)
+            results.append((fake_vocalize(plain), margins[:len(plain)]))
+        return results
+
+
+class FakeNakdimon:
+    """Nakdimon מדומה: מסכים עם DictaBERT חוץ מ-disagreement_rate מהמילים"""
+
+    def __init__(self, call_ms=1.0, char_ms=0.005, disagreement_rate=0.1):
+        self.call_ms = call_ms
+        self.char_ms = char_ms
+        self.disagreement_rate = disagreement_rate
+        self.calls = 0
+
+    def _line(self, line):
+        words = []
+        for word in remove_nikud(line).split(' '):
+            if _fraction(word, 'nakdimon') < self.disagreement_rate:
+                words.append(_vocalize_word(word, salt='nakdimon'))
+            else:
+                words.append(_vocalize_word(word))
+        return ' '.join(words)
+
+    def nakdan(self, text):
+        self.calls += 1
+        _sleep_ms(self.call_ms + self.char_ms * len(text))
+        return '\n'.join(self._line(line) for line in text.split('\n'))
+
+
+class FakeMorph:
+    """DictaBERT-morph מדומה: pos לכל מילה, או None ל-unclear_rate מהמילים"""
+
+    def __init__(self, batch_ms=2.0, token_ms=0.01, unclear_rate=0.2):
+        self.batch_ms = batch_ms
+        self.token_ms = token_ms
+        self.unclear_rate = unclear_rate
+        self.calls = 0
+
+    def predict(self, sentences, tokenizer=None):
+        self.calls += 1
+        padded = max((len(sentence) + 2 for sentence in sentences), default=0) * len(sentences)
+        _sleep_ms(self.batch_ms + self.token_ms * padded)
+        results = []
+        for sentence in sentences:
+            tokens = []
+            for word in sentence.split():
+                unclear = _fraction(word, 'morph') < self.unclear_rate
+                pos = None if unclear else _POS[zlib.crc32(word.encode('utf-8')) % len(_POS)]
+                tokens.append({'token': word, 'pos': pos, 'prefixes': [], 'suffix': False})
+            results.append({'text': sentence, 'tokens': tokens})
+        return results
+
+
+def install_fake_engines(pipeline, latency_scale=1.0, disagreement_rate=0.1, unclear_rate=0.2):
+    """
+    מחליף את שלושת המנועים של הפייפליין במנועים מדומים
+
+    latency_scale מכפיל את כל זמני ההשהיה (0 = בלי השהיה בכלל).
+    מחזיר מילון של המנועים, כדי שאפשר יהיה לספור קריאות.
+    """
+    engines = {
+        'dictabert_nikud': FakeDictaBERT(
+            batch_ms=2.0 * latency_scale, token_ms=0.01 * latency_scale,
+            disagreement_rate=disagreement_rate
+        ),
+        'nakdimon': FakeNakdimon(
+            call_ms=1.0 * latency_scale, char_ms=0.005 * latency_scale,
+            disagreement_rate=disagreement_rate
+        ),
+        'morph_model': FakeMorph(
+            batch_ms=2.0 * latency_scale, token_ms=0.01 * latency_scale,
+            unclear_rate=unclear_rate
+        ),
+    }
+    pipeline.dictabert_nikud = {'tokenizer': FakeTokenizer(), 'model': engines['dictabert_nikud']}
+    pipeline.nakdimon = engines['nakdimon']
+    pipeline.morph_model = {'tokenizer': FakeTokenizer(), 'model': engines['morph_model']}
+    return engines
@@ -0,0 +1,177 @@
+"""
+ניקוד אינטראקטיבי לעורך - תוצאה מיידית בכל הקשה ועדכון מדויק אחר כך
+
+    session = InteractiveNikud(pipeline, on_update=ui.apply)
+    result = session.edit(text, cursor)    # DictaBERT בלבד, על החלון סביב הסמן
+    ui.apply(result)
+    # אחרי refine_delay_ms בלי הקשות חדשות: Nakdimon + מורפולוגיה על אותו
+    # חלון, והתוצאה נשלחת ל-on_update עם final=True
+
+1. רק window_words מילים מכל צד של הסמן עוברות במודל, ולא המשפט או הפסקה.
+2. כל edit() מקדם מונה דורות. עדכון שהגיע ממנו דור חדש יותר נזרק -
+   הטיימר של העידון הקודם מבוטל, ועידון שכבר רץ לא שולח את התוצאה שלו.
+   ההמתנה של refine_delay היא בטיימר ולא ב-thread של העידון, כך
+   שהקשות רצופות לא תופסות אותו בשינה על חלונות ישנים.
+3. התוצאה המיידית היא DictaBERT בלבד, בלי הדפסות ובלי Nakdimon. חלון
+   שכבר נוקד (חזרה אחורה, undo) מוחזר מהמטמון בלי להריץ את המודל.
+
+ראשי תיבות לא מורחבים במצב הזה, כדי שמיקומי התווים בחלון יישארו כמו
+בטקסט של העורך. כדי לעמוד ביעד של 50ms p95 על CPU עדיף backend='onnx'
+או cpu_fast=True.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nikud_cache import LRUCache
+
+DEFAULT_WINDOW_WORDS = 6
+DEFAULT_REFINE_DELAY_MS = 150
+DEFAULT_WINDOW_CACHE_SIZE = 2048
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def cursor_window(text, cursor, window_words=DEFAULT_WINDOW_WORDS):
+    """
+    טווח התווים של window_words מילים מכל צד של המילה שבסמן
+
+    Returns:
+        (start, end) - או (cursor, cursor) אם אין מילים בטקסט
+    """
+    spans = [match.span() for match in _WORD_RE.finditer(text)]
+    if not spans:
+        return cursor, cursor
+    current = next(
+        (index for index, (_, end) in enumerate(spans) if cursor <= end),
+        len(spans) - 1
+    )
+    first = max(0, current - window_words)
+    last = min(len(spans), current + window_words + 1)
+    return spans[first][0], spans[last - 1][1]
+
+
+class InteractiveNikud:
+    """
+    מושב ניקוד אינטראקטיבי מעל HebrewNikudPipeline
+
+    Args:
+        pipeline: HebrewNikudPipeline עם מודלים (נטענים בקריאה הראשונה)
+        on_update: callback(result) לעדכון המעודן; None = בלי עידון
+        window_words: מספר המילים מכל צד של הסמן
+        refine_delay_ms: כמה לחכות בלי הקשות לפני הרצת Nakdimon
+    """
+
+    def __init__(self, pipeline, on_update=None, window_words=DEFAULT_WINDOW_WORDS,
+                 refine_delay_ms=DEFAULT_REFINE_DELAY_MS,
+                 cache_size=DEFAULT_WINDOW_CACHE_SIZE):
+        self.pipeline = pipeline
+        self.on_update = on_update
+        self.window_words = window_words
+        self.refine_delay = refine_delay_ms / 1000
+        self.generation = 0
+        self._windows = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nikud-refine')
+        self._timer = None
+        self._pending = None
+
+    def _next_generation(self):
+        with self._lock:
+            self.generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+            return self.generation
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def edit(self, text, cursor):
+        """
+        מנקד את החלון סביב הסמן אחרי עריכה
+
+        Returns:
+            {'generation', 'start', 'end', 'text', 'final': False}, או None
+            אם עריכה חדשה יותר הגיעה בזמן החישוב (התוצאה כבר לא רלוונטית)
+        """
+        generation = self._next_generation()
+        start, end = cursor_window(text, cursor, self.window_words)
+        window = text[start:end]
+
+        begin = time.perf_counter()
+        vocalized = self._windows.get(window) if window.strip() else window
+        if vocalized is None:
+            vocalized = self.pipeline.nikud_many_with_dictabert([window], batch_size=1)[0]
+            if vocalized is not None:
+                self._windows.put(window, vocalized)
+        self.pipeline.stats.record('interactive', time.perf_counter() - begin)
+
+        if not self.is_current(generation):
+            self.pipeline.stats.count('interactive.stale')
+            return None
+
+        result = {
+            'generation': generation,
+            'start': start,
+            'end': end,
+            'text': vocalized,
+            'final': False,
+        }
+        if self.on_update is not None and vocalized is not None and window.strip():
+            with self._lock:
+                if self.is_current(generation):
+                    # debounce: הקשה נוספת לפני refine_delay מבטלת את הטיימר
+                    self._timer = threading.Timer(
+                        self.refine_delay, self._schedule_refine,
+                        (generation, start, end, window, vocalized)
+                    )
+                    self._timer.daemon = True
+                    self._timer.start()
+        return result
+
+    def _schedule_refine(self, generation, *window_args):
+        """נקרא מהטיימר: שולח את העידון ל-executor אם לא הגיעה הקשה חדשה"""
+        with self._lock:
+            if not self.is_current(generation):
+                return
+            self._timer = None
+            self._pending = self._executor.submit(self._refine, generation, *window_args)
+
+    def _refine(self, generation, start, end, window, dictabert_result):
+        """Nakdimon + הכרעה (ומורפולוגיה לפי הצורך) על החלון, אם עדיין רלוונטי"""
+        if not self.is_current(generation):
+            return
+        with self.pipeline.stats.stage('refine'):
+            nakdimon_result = self.pipeline.nikud_with_nakdimon(window)
+            decision = self.pipeline.decide_nikud(window, dictabert_result, nakdimon_result)
+        if not self.is_current(generation):
+            self.pipeline.stats.count('interactive.stale')
+            return
+        self.on_update({
+            'generation': generation,
+            'start': start,
+            'end': end,
+            'text': decision['text'],
+            'decision': decision,
+            'final': True,
+        })
+
+    def latency(self):
+        """אחוזוני הזמן של התוצאה המיידית (מ-PipelineStats, במילישניות)"""
+        return self.pipeline.stats.summary().get('interactive', {})
+
+    def close(self):
+        self._next_generation()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+לקסיקון ניקוד לביטויים שכיחים - מסלול מהיר שעוקף את המודלים
+
+בטקסטים ליטורגיים ותורניים רוב הטוקנים מגיעים מאוצר מילים קטן וחוזר.
+הלקסיקון נבנה אופליין מהכרעות של HebrewNikudPipeline, ונשמרים בו רק
+מילים וביטויים (עד max_phrase_words מילים, וגם משפטים שלמים) שבהם
+שני המנועים הסכימו (source == 'Both (identical)'), שהופיעו לפחות
+min_count פעמים ותמיד נוקדו באותו אופן.
+
+    python nikud_lexicon.py build corpus.txt -o lexicon.json
+    python nikud_lexicon.py build corpus.jsonl --jsonl -o lexicon.json
+
+בזמן ריצה (HebrewNikudPipeline(lexicon=...) או load_lexicon()) טקסט
+שמכוסה כולו - כמשפט שלם או כרצף של ביטויים מהלקסיקון - לא עובר ב-
+DictaBERT וב-Nakdimon. טקסט שמכוסה רק בחלקו עובר במודלים כרגיל, כי
+הרצת המנועים על קטעים בלי ההקשר שלהם פוגעת בדיוק. טקסט שנמצא בטבלת
+המשפטים (נראה בקורפוס כמשפט שלם) מקבל ביטחון very_high; רצף של
+ביטויים מקבל רק high, כי ההסכמה נמדדה על כל ביטוי בהקשר אחר.
+
+החלק של הטוקנים שנוקדו מהלקסיקון נספר ב-stats (lexicon.tokens מתוך
+tokens.total).
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import re
+import sys
+
+from nikud_cache import file_identity
+from nikud_text import remove_nikud
+
+DEFAULT_MAX_PHRASE_WORDS = 4
+DEFAULT_MIN_COUNT = 3
+# תקרת המפתחות שהבנייה מחזיקה בזיכרון (לכל טבלה)
+DEFAULT_MAX_KEYS = 2_000_000
+# ההכרעות שנכנסות ללקסיקון - רק כששני המנועים הסכימו
+AGREED_SOURCE = 'Both (identical)'
+# משפט שלם מהלקסיקון / רצף של ביטויים מהלקסיקון
+LEXICON_CONFIDENCE = 'very_high'
+PHRASE_CONFIDENCE = 'high'
+
+_WORD_RE = re.compile(r'\S+')
+
+
+class Lexicon:
+    """
+    מיפוי של רצף מילים בלי ניקוד -> אותו רצף מנוקד
+
+    משפטים שלמים וביטויים נשמרים בטבלאות נפרדות: רק התאמה בטבלת
+    המשפטים נחשבת התאמה של משפט שלם. ביטוי שנראה רק בתוך משפט ארוך
+    יותר לא הופך ל"משפט שלם" גם כשהוא מופיע לבדו.
+
+    Args:
+        entries: מילון 'מילה מילה' (בלי ניקוד) -> 'מילה מילה' (מנוקד)
+        max_phrase_words: אורך הביטוי הארוך ביותר ב-entries
+        identity: מזהה לטביעת האצבע של המטמון (קובץ או hash של התוכן)
+        sentences: משפטים שלמים, באותו פורמט כמו entries
+    """
+
+    def __init__(self, entries, max_phrase_words=DEFAULT_MAX_PHRASE_WORDS, identity=None,
+                 sentences=None):
+        self.entries = entries
+        self.sentences = sentences or {}
+        self.max_phrase_words = max_phrase_words
+        if identity is None:
+            payload = json.dumps([entries, self.sentences], sort_keys=True, ensure_ascii=False)
+            identity = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+        self.identity = identity
+
+    def __len__(self):
+        return len(self.entries) + len(self.sentences)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['entries'], data['max_phrase_words'], identity=file_identity(path),
+                   sentences=data.get('sentences'))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'max_phrase_words': self.max_phrase_words, 'entries': self.entries,
+                 'sentences': self.sentences},
+                f, ensure_ascii=False
+            )
+
+    def vocalize(self, text):
+        """
+        מנקד טקסט מהלקסיקון אם הוא מכוסה כולו
+
+        קודם כל משפט שלם (מטבלת המשפטים), ואחר כך חלוקה חמדנית לביטויים
+        (הארוך ביותר קודם). הרווחים המקוריים נשמרים.
+
+        Returns:
+            (טקסט מנוקד, מספר מילים, האם נמצא כמשפט שלם) או None אם
+            הטקסט לא מכוסה
+        """
+        matches = list(_WORD_RE.finditer(text))
+        if not matches:
+            return None
+        words = [remove_nikud(match.group()) for match in matches]
+
+        whole = self.sentences.get(' '.join(words))
+        if whole is not None:
+            vocalized = whole.split(' ')
+        else:
+            vocalized = []
+            position = 0
+            while position < len(words):
+                longest = min(self.max_phrase_words, len(words) - position)
+                for length in range(longest, 0, -1):
+                    phrase = self.entries.get(' '.join(words[position:position + length]))
+                    if phrase is not None:
+                        vocalized.extend(phrase.split(' '))
+                        position += length
+                        break
+                else:
+                    return None
+
+        pieces = []
+        previous_end = 0
+        for match, word in zip(matches, vocalized):
+            pieces.append(text[previous_end:match.start()])
+            pieces.append(word)
+            previous_end = match.end()
+        pieces.append(text[previous_end:])
+        return ''.join(pieces), len(words), whole is not None
+
+
+def lexicon_decision(text, whole=True):
+    """
+    הכרעה לטקסט שנוקד כולו מהלקסיקון
+
+    whole=False (רצף של ביטויים) מקבל ביטחון נמוך יותר: כל ביטוי הוכרע
+    בהקשר אחר, ואף מנוע לא ראה את הצירוף שלהם.
+    """
+    if whole:
+        return {
+            'text': text,
+            'source': 'Lexicon',
+            'confidence': LEXICON_CONFIDENCE,
+            'notes': 'נוקד מהלקסיקון (הסכמה קודמת של שני המודלים)'
+        }
+    return {
+        'text': text,
+        'source': 'Lexicon',
+        'confidence': PHRASE_CONFIDENCE,
+        'notes': 'נוקד מביטויים בלקסיקון (כל ביטוי הוכרע בהקשר אחר)'
+    }
+
+
+class _Counts:
+    """
+    ספירת ניקודים לכל מפתח, בזיכרון מוגבל
+
+    לכל מפתח נשמר [ניקוד, מספר הופעות]; מפתח שנוקד פעם אחרת הופך ל-
+    None ולא ייכנס ללקסיקון לעולם. כשמספר המפתחות עובר את max_keys
+    נמחקים המפתחות שעוד לא הגיעו ל-min_count (הסימון של מפתחות סותרים
+    נשמר) - ביטוי נדיר שנמחק מתחיל לספור מחדש, כך שהגיזום יכול רק
+    להחסיר ביטויים מהלקסיקון, לא להכניס ניקוד שגוי.
+    """
+
+    def __init__(self, max_keys, min_count):
+        self.max_keys = max_keys
+        self.min_count = min_count
+        self.pruned = 0
+        self._counts = {}
+
+    def add(self, key, vocalized):
+        entry = self._counts.get(key, ())
+        if entry is None:
+            return
+        if not entry:
+            self._counts[key] = [vocalized, 1]
+            if len(self._counts) > self.max_keys:
+                self._prune()
+        elif entry[0] != vocalized:
+            self._counts[key] = None
+        else:
+            entry[1] += 1
+
+    def _prune(self):
+        rare = [
+            key for key, entry in self._counts.items()
+            if entry is not None and entry[1] < self.min_count
+        ]
+        for key in rare:
+            del self._counts[key]
+        self.pruned += len(rare)
+
+    def entries(self):
+        """רק מפתחות שהופיעו min_count פעמים ותמיד עם אותו ניקוד"""
+        return {
+            key: entry[0] for key, entry in self._counts.items()
+            if entry is not None and entry[1] >= self.min_count
+        }
+
+
+class LexiconBuilder:
+    """
+    אוסף הכרעות שבהן שני המנועים הסכימו ובונה מהן Lexicon
+
+    המפתח של כל ביטוי נגזר מהפלט המנוקד עצמו (remove_nikud), כך שהוא
+    תואם לטקסט שהמודלים קיבלו בפועל (אחרי הרחבת קיצורים). משפטים שלמים
+    נספרים בנפרד מהביטויים, וכל טבלה מוגבלת ל-max_keys מפתחות.
+    """
+
+    def __init__(self, max_phrase_words=DEFAULT_MAX_PHRASE_WORDS, min_count=DEFAULT_MIN_COUNT,
+                 max_keys=DEFAULT_MAX_KEYS):
+        self.max_phrase_words = max_phrase_words
+        self.min_count = min_count
+        self._phrases = _Counts(max_keys, min_count)
+        self._sentences = _Counts(max_keys, min_count)
+        self.decisions = 0
+        self.agreed = 0
+
+    @property
+    def pruned(self):
+        return self._phrases.pruned + self._sentences.pruned
+
+    def add(self, decision):
+        """
+        מוסיף הכרעה אחת; רק הסכמה של שני המנועים נכנסת ללקסיקון
+
+        הכרעות very_high אחרות (למשל מהלקסיקון עצמו) לא נספרות, כדי
+        שהלקסיקון לא יזין את עצמו.
+        """
+        self.decisions += 1
+        if decision.get('source') != AGREED_SOURCE or not decision.get('text'):
+            return
+        self.agreed += 1
+        vocalized = decision['text'].split()
+        plain = [remove_nikud(word) for word in vocalized]
+
+        self._sentences.add(' '.join(plain), ' '.join(vocalized))
+        for length in range(1, min(self.max_phrase_words, len(plain)) + 1):
+            for start in range(len(plain) - length + 1):
+                self._phrases.add(
+                    ' '.join(plain[start:start + length]),
+                    ' '.join(vocalized[start:start + length])
+                )
+
+    def build(self):
+        return Lexicon(
+            self._phrases.entries(), self.max_phrase_words,
+            sentences=self._sentences.entries()
+        )
+
+
+def _jsonl_decisions(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _pipeline_decisions(lines, args):
+    from complete_nikud_pipeline import HebrewNikudPipeline
+
+    with contextlib.redirect_stdout(sys.stderr), HebrewNikudPipeline(
+        workers=args.workers, backend=args.backend
+    ) as pipeline:
+        for _, _, decision in pipeline.process_stream(lines, args.batch_size):
+            yield decision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="לקסיקון ניקוד לביטויים שכיחים")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="בניית לקסיקון מקורפוס")
+    build.add_argument('input', help="קובץ טקסט (או JSONL של nikud_corpus.py עם --jsonl)")
+    build.add_argument('-o', '--output', required=True)
+    build.add_argument('--jsonl', action='store_true', help="הקלט הוא הכרעות מוכנות")
+    build.add_argument('--max-phrase-words', type=int, default=DEFAULT_MAX_PHRASE_WORDS)
+    build.add_argument('--min-count', type=int, default=DEFAULT_MIN_COUNT)
+    build.add_argument('--max-keys', type=int, default=DEFAULT_MAX_KEYS,
+                       help="תקרת ביטויים בזיכרון בזמן הבנייה (נדירים נגזמים)")
+    build.add_argument('--batch-size', type=int, default=32)
+    build.add_argument('--workers', type=int, default=2)
+    build.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    args = parser.parse_args()
+
+    builder = LexiconBuilder(args.max_phrase_words, args.min_count, args.max_keys)
+    with open(args.input, encoding='utf-8') as f:
+        decisions = _jsonl_decisions(f) if args.jsonl else _pipeline_decisions(f, args)
+        for decision in decisions:
+            builder.add(decision)
+
+    lexicon = builder.build()
+    lexicon.save(args.output)
+    print(f"✅ {len(lexicon):,} ביטויים מתוך {builder.agreed:,}/{builder.decisions:,} "
+          f"הכרעות בהסכמה -> {args.output}")
+    if builder.pruned:
+        print(f"✂️  {builder.pruned:,} ביטויים נדירים נגזמו (--max-keys)")
+
+
+if __name__ == "__main__":
+    main()
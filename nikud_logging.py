@@ -0,0 +1,115 @@
+"""
+לוגים מובנים לפייפליין הניקוד - שורת JSON לכל אירוע, דרך logging
+
+הספרייה שקטה כברירת מחדל: ל-logger בשם 'nikud' מחובר NullHandler,
+ושום הודעה לא מגיעה למסוף עד שקוראים ל-configure_logging() (ה-CLI-ים
+עושים את זה לפי --log-level). שגיאות נספרות גם ב-PipelineStats תחת
+errors.*, כך שהקוד הקורא יכול לבדוק pipeline.errors() גם בלי לוגים.
+
+    from nikud_logging import configure_logging
+    configure_logging('INFO')       # JSON lines ל-stderr
+
+    {"time": "2026-10-18T09:12:03.114+00:00", "level": "ERROR",
+     "logger": "nikud.pipeline", "event": "predict_failed",
+     "stage": "dictabert", "batch": 32, "error": "...", "suppressed": 17}
+
+RateLimitFilter מגביל כל אירוע ל-burst הודעות בכל interval שניות.
+הודעות שנבלעו נספרות ומדווחות בשדה suppressed של ההודעה הבאה שעוברת.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT_LOGGER = 'nikud'
+
+DEFAULT_RATE_LIMIT_BURST = 5
+DEFAULT_RATE_LIMIT_INTERVAL = 60.0
+
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+
+def get_logger(name):
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+def log_event(logger, level, event, **fields):
+    """
+    רושם אירוע: event הוא שם קבוע (גם המפתח להגבלת הקצב), ו-fields
+    נכנסים כשדות ב-JSON
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """שורת JSON אחת לכל רשומה"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc)
+                            .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            data['suppressed'] = suppressed
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    מעביר עד burst רשומות לכל אירוע (logger + event + רמה) בכל חלון
+    של interval שניות
+    """
+
+    def __init__(self, burst=DEFAULT_RATE_LIMIT_BURST, interval=DEFAULT_RATE_LIMIT_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.msg, record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, suppressed]
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            record.suppressed, window[2] = window[2], 0
+        return True
+
+
+def configure_logging(level='WARNING', stream=None, burst=DEFAULT_RATE_LIMIT_BURST,
+                      interval=DEFAULT_RATE_LIMIT_INTERVAL):
+    """
+    מחבר ל-logger של הפייפליין handler של JSON lines (ברירת מחדל: stderr)
+
+    קריאה חוזרת מחליפה את ה-handler הקודם, כך שאין הודעות כפולות.
+    """
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        if getattr(handler, '_nikud_json', False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler._nikud_json = True
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RateLimitFilter(burst, interval))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return handler
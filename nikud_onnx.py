@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+backend של ONNX Runtime למודלי DictaBERT-nikud ו-DictaBERT-morph
+
+ייצוא (פעם אחת, דורש torch + transformers):
+    python nikud_onnx.py export --output ./onnx_models
+
+יוצר לכל מודל תיקייה עם:
+    model.onnx      - הגרף, עם צירי batch ו-sequence דינמיים
+    labels.json     - שמות הפלטים ותוויות הפענוח (מה-config וה-remote code)
+    tokenizer.json  - ה-tokenizer (נטען עם ספריית tokenizers, בלי transformers)
+
+בזמן ריצה נדרשים רק onnxruntime, tokenizers ו-numpy:
+    HebrewNikudPipeline(backend='onnx', onnx_dir='./onnx_models')
+
+הטוקניזציה והפענוח (ניקוד לכל אות, תוויות מורפולוגיה) ממומשים מחדש
+ב-nikud_decoding, כך ש-torch לא נטען כלל בזמן שירות.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from nikud_decoding import (
+    collect_labels,
+    decode_morph,
+    decode_nikud,
+    flatten_logits,
+    letter_margins,
+)
+from nikud_text import remove_nikud
+
+ONNX_OPSET = 17
+
+
+# ---------------------------------------------------------------------------
+# ייצוא
+# ---------------------------------------------------------------------------
+
+def export_model(model_path, output_dir, kind):
+    """
+    מייצא מודל DictaBERT ל-ONNX
+
+    Args:
+        model_path: תיקייה מקומית או שם ב-HuggingFace Hub
+        output_dir: תיקיית היעד
+        kind: 'nikud' או 'morph'
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path, trust_remote_code=True)
+    model.eval()
+
+    sample = tokenizer(["שלום עליכם", "ברוך הוא"], padding=True, return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids')
+                   if name in sample]
+
+    with torch.no_grad():
+        output_names = [name for name, _ in
+                        flatten_logits(model(**sample, return_dict=True).logits)]
+
+    class _LogitsOnly(torch.nn.Module):
+        """מחזיר tuple של tensors במקום ModelOutput, כדי שהייצוא יעבוד"""
+
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            outputs = self.inner(**dict(zip(input_names, inputs)), return_dict=True)
+            return tuple(tensor for _, tensor in flatten_logits(outputs.logits))
+
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names + output_names}
+    torch.onnx.export(
+        _LogitsOnly(model),
+        tuple(sample[name] for name in input_names),
+        str(output_dir / 'model.onnx'),
+        input_names=input_names,
+        output_names=output_names,
+        dynamic_axes=dynamic_axes,
+        opset_version=ONNX_OPSET,
+    )
+
+    labels = collect_labels(model, kind, output_names)
+    labels['inputs'] = input_names
+    labels['model_max_length'] = min(int(tokenizer.model_max_length), 100_000)
+    with open(output_dir / 'labels.json', 'w', encoding='utf-8') as f:
+        json.dump(labels, f, ensure_ascii=False, indent=2)
+    tokenizer.save_pretrained(str(output_dir))
+    return output_dir
+
+
+# ---------------------------------------------------------------------------
+# זמן ריצה
+# ---------------------------------------------------------------------------
+
+class OnnxTokenizer:
+    """
+    tokenizer מבוסס ספריית tokenizers (בלי transformers)
+
+    נקרא כמו tokenizer של HuggingFace לצורך מדידת אורכים (nikud_batching),
+    ו-encode() מחזיר מערכים מרופדים + offsets + מיפוי טוקן-למילה.
+
+    עם cache (nikud_encoding.EncodingCache) מדידת האורכים וה-forward
+    משתמשות באותו קידוד, וכל טקסט עובר טוקניזציה פעם אחת.
+    """
+
+    def __init__(self, model_dir, model_max_length, cache=None):
+        from tokenizers import Tokenizer
+        self._tokenizer = Tokenizer.from_file(str(Path(model_dir) / 'tokenizer.json'))
+        self.model_max_length = model_max_length
+        self.source = str(Path(model_dir).resolve())
+        self.cache = cache
+
+    def encode_batch(self, texts):
+        """Encoding של ספריית tokenizers לכל טקסט (דרך המטמון אם יש)"""
+        if self.cache is None:
+            return self._tokenizer.encode_batch(list(texts))
+        return self.cache.encode_many(self, texts, self._tokenizer.encode_batch)
+
+    def __call__(self, texts):
+        return {'input_ids': [encoding.ids for encoding in self.encode_batch(texts)]}
+
+    def encode(self, texts, input_names):
+        import numpy as np
+
+        encodings = self.encode_batch(texts)
+        length = min(max(len(e.ids) for e in encodings), self.model_max_length)
+        batch = {name: np.zeros((len(encodings), length), dtype=np.int64) for name in input_names}
+        for row, encoding in enumerate(encodings):
+            ids = encoding.ids[:length]
+            batch['input_ids'][row, :len(ids)] = ids
+            if 'attention_mask' in batch:
+                batch['attention_mask'][row, :len(ids)] = 1
+            if 'token_type_ids' in batch:
+                batch['token_type_ids'][row, :len(ids)] = encoding.type_ids[:length]
+        offsets = [encoding.offsets[:length] for encoding in encodings]
+        word_ids = [encoding.word_ids[:length] for encoding in encodings]
+        return batch, offsets, word_ids
+
+
+class _OnnxModel:
+    """בסיס: session של ONNX Runtime + labels.json"""
+
+    def __init__(self, model_dir, threads=None):
+        import onnxruntime
+
+        model_dir = Path(model_dir)
+        with open(model_dir / 'labels.json', encoding='utf-8') as f:
+            self.labels = json.load(f)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / 'model.onnx'), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.output_names = self.labels['outputs']
+        self.tokenizer = OnnxTokenizer(model_dir, self.labels.get('model_max_length', 512))
+
+    def run(self, texts):
+        """מריץ את הגרף; מחזיר (מילון פלטים, offsets, word_ids)"""
+        batch, offsets, word_ids = self.tokenizer.encode(texts, self.input_names)
+        outputs = self.session.run(self.output_names, batch)
+        return dict(zip(self.output_names, outputs)), offsets, word_ids
+
+
+class OnnxNikudModel(_OnnxModel):
+    """DictaBERT-nikud ב-ONNX Runtime, עם predict() באותה חתימה כמו ה-remote code"""
+
+    def predict(self, sentences, tokenizer=None, mark_matres_lectionis=None):
+        sentences = [remove_nikud(sentence) for sentence in sentences]
+        outputs, offsets, _ = self.run(sentences)
+        nikud_ids = outputs['nikud_logits'].argmax(axis=-1)
+        shin_ids = outputs['shin_logits'].argmax(axis=-1)
+        return [
+            decode_nikud(sentence, offsets[row], nikud_ids[row], shin_ids[row],
+                         self.labels, mark_matres_lectionis)
+            for row, sentence in enumerate(sentences)
+        ]
+
+    def predict_with_margins(self, sentences, tokenizer=None):
+        """כמו predict(), ולכל משפט גם מרווח ביטחון לכל תו (ראה nikud_confidence)"""
+        sentences = [remove_nikud(sentence) for sentence in sentences]
+        outputs, offsets, _ = self.run(sentences)
+        nikud_logits = outputs['nikud_logits']
+        shin_logits = outputs['shin_logits']
+        nikud_ids = nikud_logits.argmax(axis=-1)
+        shin_ids = shin_logits.argmax(axis=-1)
+        return [
+            (
+                decode_nikud(sentence, offsets[row], nikud_ids[row], shin_ids[row], self.labels),
+                letter_margins(sentence, offsets[row], nikud_logits[row], shin_logits[row]),
+            )
+            for row, sentence in enumerate(sentences)
+        ]
+
+
+class OnnxMorphModel(_OnnxModel):
+    """DictaBERT-morph ב-ONNX Runtime, עם predict() באותה חתימה כמו ה-remote code"""
+
+    def predict(self, sentences, tokenizer=None):
+        outputs, offsets, word_ids = self.run(sentences)
+        return [
+            decode_morph(
+                sentence, word_ids[row], offsets[row],
+                {name: values[row] for name, values in outputs.items()},
+                self.labels
+            )
+            for row, sentence in enumerate(sentences)
+        ]
+
+
+def load_onnx_model(model_dir, kind, threads=None):
+    """טוען מודל מיוצא (תיקייה מתוך onnx_dir) בפורמט של הפייפליין: {'tokenizer', 'model'}"""
+    model_class = OnnxNikudModel if kind == 'nikud' else OnnxMorphModel
+    model = model_class(model_dir, threads)
+    return {'tokenizer': model.tokenizer, 'model': model}
+
+
+def main():
+    from complete_nikud_pipeline import (
+        DEFAULT_ONNX_DIR,
+        DICTABERT_MORPH_HUB,
+        DICTABERT_MORPH_PATH,
+        DICTABERT_NIKUD_HUB,
+        DICTABERT_NIKUD_PATH,
+        ONNX_MODEL_DIRS,
+        _resolve_model_path,
+    )
+
+    parser = argparse.ArgumentParser(description="ייצוא מודלי DictaBERT ל-ONNX")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help="ייצוא nikud ו-morph")
+    export.add_argument('--nikud', default=_resolve_model_path(DICTABERT_NIKUD_PATH, DICTABERT_NIKUD_HUB))
+    export.add_argument('--morph', default=_resolve_model_path(DICTABERT_MORPH_PATH, DICTABERT_MORPH_HUB))
+    export.add_argument('--output', default=DEFAULT_ONNX_DIR)
+    export.add_argument('--only', choices=['nikud', 'morph'], help="ייצוא מודל אחד בלבד")
+    args = parser.parse_args()
+
+    sources = {
+        'nikud': (args.nikud, ONNX_MODEL_DIRS['dictabert_nikud']),
+        'morph': (args.morph, ONNX_MODEL_DIRS['morph_model']),
+    }
+    for kind, (source, dir_name) in sources.items():
+        if args.only and kind != args.only:
+            continue
+        print(f"📦 מייצא {source} ...")
+        target = export_model(source, Path(args.output) / dir_name, kind)
+        print(f"   ✅ {target / 'model.onnx'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+מאגר תהליכים לניקוד קורפוס על כל הליבות
+
+כל תהליך עובד מחזיק HebrewNikudPipeline משלו עם מודלים שנטענו פעם
+אחת, ומקבל נתחים (chunks) של משפטים. מספר ה-threads הפנימיים של torch
+מוגבל בכל עובד (threads_per_worker), כדי ש-N עובדים לא יריצו כל אחד
+threads כמספר הליבות ויחנקו זה את זה.
+
+במצב fork (ברירת מחדל בלינוקס) מודלי ה-torch נטענים פעם אחת בתהליך
+הראשי לפני יצירת העובדים, והמשקולות משותפות ביניהם ב-copy-on-write -
+הזיכרון של הטנזורים לא מועתק כל עוד אף אחד לא כותב אליו. התהליך הראשי
+רק טוען ולא מריץ חישוב לפני ה-fork, כדי לא לשכפל thread pool של OpenMP.
+Nakdimon (TensorFlow) לא שורד fork בבטחה, ולכן כל עובד טוען אותו לעצמו.
+"""
+
+import multiprocessing
+import os
+import sys
+from collections import Counter, deque
+
+from complete_nikud_pipeline import DEFAULT_BATCH_SIZE, HebrewNikudPipeline
+
+# מספר המשפטים שנשלחים לעובד בבת אחת
+DEFAULT_CHUNK_SIZE = 256
+
+# משתני סביבה שקובעים את מספר ה-threads של ספריות החישוב
+_THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'TF_NUM_INTRAOP_THREADS',
+)
+
+# המודלים שנטענים בתהליך הראשי לפני fork (torch בלבד - לא TensorFlow)
+_PRELOAD_MODELS = ('dictabert_nikud', 'morph_model')
+
+# הפייפליין של התהליך הנוכחי (בעובד), או זה שנטען מראש לפני fork
+_worker_pipeline = None
+_worker_batch_size = DEFAULT_BATCH_SIZE
+# מוני השגיאות של העובד שכבר דווחו לתהליך הראשי
+_worker_reported_errors = Counter()
+
+
+def _limit_threads(threads):
+    """מגביל את ה-threads של torch/BLAS/TF בתהליך הנוכחי"""
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if 'torch' in sys.modules:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _init_worker(threads, batch_size, pipeline_kwargs, cache_path):
+    global _worker_pipeline, _worker_batch_size, _worker_reported_errors
+    # התוצאות חוזרות דרך המאגר - stdout של העובדים לא צריך לערבב פלט
+    sys.stdout = sys.stderr
+    _limit_threads(threads)
+    _worker_batch_size = batch_size
+    if _worker_pipeline is None:
+        # spawn, או fork בלי טעינה מראש - כל עובד טוען לעצמו
+        _worker_pipeline = HebrewNikudPipeline(**pipeline_kwargs)
+    # שגיאות שהועתקו מהתהליך הראשי ב-fork נספרות במאגר עצמו - העובד
+    # מדווח רק על מה שנוסף אצלו
+    _worker_reported_errors = Counter(_worker_pipeline.errors())
+    # אחרי fork נשארו לטעון רק המודלים שלא נטענו בתהליך הראשי (Nakdimon)
+    _worker_pipeline.load_models()
+    if cache_path:
+        # sqlite ב-WAL מאפשר לכמה תהליכים לשתף את אותו קובץ מטמון
+        _worker_pipeline.enable_cache(cache_path)
+
+
+def _process_chunk(texts):
+    """
+    Returns:
+        (הכרעות, השגיאות שנוספו בעובד מאז הנתח הקודם)
+    """
+    decisions = _worker_pipeline.process_many(texts, _worker_batch_size)
+    errors = Counter(_worker_pipeline.errors())
+    new_errors = errors - _worker_reported_errors
+    _worker_reported_errors.update(new_errors)
+    return decisions, dict(new_errors)
+
+
+class PipelinePool:
+    """
+    מאגר תהליכים שמריץ HebrewNikudPipeline במקביל ומחזיר הכרעות לפי הסדר
+
+    Args:
+        num_workers: מספר תהליכים (ברירת מחדל: מספר הליבות / threads_per_worker)
+        threads_per_worker: threads של torch בכל תהליך
+        chunk_size: משפטים לכל משימה שנשלחת לעובד
+        batch_size: גודל האצווה בתוך העובד (process_many)
+        start_method: 'fork' או 'spawn' (ברירת מחדל: fork אם זמין)
+        preload: לטעון את מודלי ה-torch בתהליך הראשי לפני fork (שיתוף משקולות)
+        cache_path: קובץ sqlite משותף למטמון הכרעות
+        pipeline_kwargs: פרמטרים ל-HebrewNikudPipeline בכל עובד
+    """
+
+    def __init__(self, num_workers=None, threads_per_worker=1,
+                 chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 start_method=None, preload=True, cache_path=None,
+                 pipeline_kwargs=None):
+        global _worker_pipeline
+
+        cpu_count = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.num_workers = num_workers or max(1, cpu_count // threads_per_worker)
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._errors = Counter()
+        pipeline_kwargs = dict(pipeline_kwargs or {})
+
+        if start_method is None:
+            available = multiprocessing.get_all_start_methods()
+            start_method = 'fork' if 'fork' in available else 'spawn'
+        self.start_method = start_method
+
+        self._preloaded = None
+        if start_method == 'fork' and preload:
+            _limit_threads(threads_per_worker)
+            self._preloaded = HebrewNikudPipeline(**pipeline_kwargs)
+            self._preloaded.load_models(*_PRELOAD_MODELS)
+            _worker_pipeline = self._preloaded
+
+        context = multiprocessing.get_context(start_method)
+        self._pool = context.Pool(
+            self.num_workers,
+            initializer=_init_worker,
+            initargs=(threads_per_worker, batch_size, pipeline_kwargs, cache_path)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """מחכה לסיום העובדים וסוגר את המאגר"""
+        global _worker_pipeline
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._preloaded is not None:
+            self._errors.update(self._preloaded.errors())
+            self._preloaded.close()
+            self._preloaded = None
+        _worker_pipeline = None
+
+    def errors(self):
+        """
+        מוני השגיאות של כל העובדים יחד (כמו HebrewNikudPipeline.errors),
+        כולל כישלונות טעינה בתהליך הראשי
+        """
+        errors = Counter(self._errors)
+        if self._preloaded is not None:
+            errors.update(self._preloaded.errors())
+        return dict(errors)
+
+    @property
+    def error_count(self):
+        return sum(self.errors().values())
+
+    def _collect(self, result):
+        """ההכרעות של נתח שהסתיים; מוני השגיאות שלו נצברים במאגר"""
+        decisions, errors = result.get()
+        self._errors.update(errors)
+        return decisions
+
+    def _ordered_results(self, tagged_chunks):
+        """
+        שולח נתחים (tag, texts) לעובדים ומחזיר (tag, הכרעות) לפי הסדר
+
+        לכל היותר 2 נתחים לכל עובד בטיפול בו-זמנית, כך שגם קלט ענק
+        לא נקרא כולו לזיכרון (בניגוד ל-Pool.imap שצורך את כל הקלט).
+        """
+        in_flight = deque()
+        max_in_flight = self.num_workers * 2
+        for tag, texts in tagged_chunks:
+            in_flight.append((tag, self._pool.apply_async(_process_chunk, (texts,))))
+            if len(in_flight) >= max_in_flight:
+                tag, result = in_flight.popleft()
+                yield tag, self._collect(result)
+        while in_flight:
+            tag, result = in_flight.popleft()
+            yield tag, self._collect(result)
+
+    def process_many(self, texts, batch_size=None):
+        """
+        מעבד רשימת טקסטים בכל העובדים; הכרעה לכל טקסט לפי הסדר
+
+        batch_size נקבע בבנאי ונשמר כאן רק לתאימות עם HebrewNikudPipeline.
+        """
+        texts = list(texts)
+        chunks = (
+            (None, texts[start:start + self.chunk_size])
+            for start in range(0, len(texts), self.chunk_size)
+        )
+        decisions = []
+        for _, chunk_decisions in self._ordered_results(chunks):
+            decisions.extend(chunk_decisions)
+        return decisions
+
+    def process_stream(self, lines, batch_size=None):
+        """
+        כמו HebrewNikudPipeline.process_stream, אבל על כל העובדים
+
+        Yields:
+            (מספר שורה מ-1, טקסט השורה, הכרעה) לפי סדר הקלט
+        """
+        def chunks():
+            numbers, texts = [], []
+            for line_number, line in enumerate(lines, start=1):
+                text = line.rstrip('\r\n')
+                if not text.strip():
+                    continue
+                numbers.append(line_number)
+                texts.append(text)
+                if len(texts) >= self.chunk_size:
+                    yield (numbers, texts), texts
+                    numbers, texts = [], []
+            if texts:
+                yield (numbers, texts), texts
+
+        for (numbers, texts), decisions in self._ordered_results(chunks()):
+            yield from zip(numbers, texts, decisions)
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+רשומות הכרעה קומפקטיות ופורמט עמודות לקורפוסים של מיליוני משפטים
+
+DecisionRecord מחזיק הכרעה ב-__slots__ במקום מילון: source ו-confidence
+כ-IntEnum, ההערות עוברות sys.intern (רוב ההערות חוזרות על עצמן), ו-
+requires_review ושאר סימוני הכן/לא נשמרים בשדה flags אחד. המילים שבמחלוקת
+נשמרות כ-tuples. to_dict() מחזיר את המילון הרגיל של decide_nikud().
+
+פורמט העמודות הוא תיקייה:
+    meta.json                           מספר השורות, טבלאות הקודים וההערות
+    line.u64 source.u8 confidence.u8    עמודות ברוחב קבוע (little endian)
+    flags.u8 note.u32 disputed.u16 min_margin.f32
+    input/text/alternative/details      עמודות מחרוזות: .bin (UTF-8) ו-.off
+                                        (היסט הסיום של כל שורה, u64)
+
+details הוא JSON של המילים שבמחלוקת ושאר השדות, ונקרא רק לשורה שמבקשים.
+הכתיבה היא בספריה הסטנדרטית בלבד (array); הקריאה (ColumnarDecisions)
+ממפה את העמודות לזיכרון עם numpy, כך שסינון לפי מקור, ביטחון או
+requires_review לא טוען את הקובץ כולו.
+
+    python nikud_corpus.py library.txt -o library.cols --format columnar
+    python nikud_records.py convert library.jsonl library.cols
+    python nikud_records.py filter library.cols --review --limit 20
+"""
+
+import argparse
+import contextlib
+import enum
+import json
+import os
+import sys
+import uuid
+from array import array
+
+FORMAT_VERSION = 1
+
+
+class Source(enum.IntEnum):
+    """מקור ההכרעה (הקודים נשמרים בקבצים - רק להוסיף בסוף)"""
+    DICTABERT = 0
+    BOTH_IDENTICAL = 1
+    NO_MORPH = 2
+    WITH_MORPH = 3
+    UNCERTAIN = 4
+    CONFIDENT = 5
+    LEXICON = 6
+
+    @property
+    def label(self):
+        return _SOURCE_LABELS[self]
+
+    @classmethod
+    def from_label(cls, label):
+        try:
+            return _SOURCES_BY_LABEL[label]
+        except KeyError:
+            raise ValueError(f"מקור הכרעה לא מוכר: {label!r}") from None
+
+
+_SOURCE_LABELS = {
+    Source.DICTABERT: 'DictaBERT',
+    Source.BOTH_IDENTICAL: 'Both (identical)',
+    Source.NO_MORPH: 'DictaBERT (no morph)',
+    Source.WITH_MORPH: 'DictaBERT (with morph)',
+    Source.UNCERTAIN: 'DictaBERT (uncertain)',
+    Source.CONFIDENT: 'DictaBERT (confident)',
+    Source.LEXICON: 'Lexicon',
+}
+_SOURCES_BY_LABEL = {label: source for source, label in _SOURCE_LABELS.items()}
+
+
+class Confidence(enum.IntEnum):
+    """רמת ביטחון; הסדר מאפשר סינון כמו confidence >= HIGH"""
+    MEDIUM = 1
+    HIGH = 2
+    VERY_HIGH = 3
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+    @classmethod
+    def from_label(cls, label):
+        try:
+            return cls[label.upper()]
+        except KeyError:
+            raise ValueError(f"רמת ביטחון לא מוכרת: {label!r}") from None
+
+
+class Flags(enum.IntFlag):
+    REQUIRES_REVIEW = 1
+    HAS_ALTERNATIVE = 2
+    FAILED = 4              # text is None
+    ABBREVIATIONS = 8
+    DISPUTED = 16
+
+
+# שדות שנשמרים בעמודות משלהם; כל השאר עוברים ל-extra
+_CORE_FIELDS = frozenset((
+    'text', 'source', 'confidence', 'notes', 'alternative', 'disputed_words', 'requires_review',
+))
+
+
+def intern_note(note):
+    return sys.intern(note) if note is not None else None
+
+
+def _pack_word(word):
+    return (
+        word['index'], word['dictabert'], word['nakdimon'],
+        intern_note(word.get('pos')), Confidence.from_label(word['confidence']),
+        word['requires_review'],
+    )
+
+
+def _unpack_word(packed):
+    index, dictabert, nakdimon, pos, confidence, requires_review = packed
+    return {
+        'index': index,
+        'dictabert': dictabert,
+        'nakdimon': nakdimon,
+        'pos': pos,
+        'confidence': confidence.label,
+        'requires_review': requires_review,
+    }
+
+
+class DecisionRecord:
+    """הכרעה אחת, קומפקטית (ראה תיעוד המודול)"""
+
+    __slots__ = ('text', 'source', 'confidence', 'notes', 'flags', 'alternative', 'disputed', 'extra')
+
+    def __init__(self, text, source, confidence, notes, flags=Flags(0), alternative=None,
+                 disputed=(), extra=None):
+        self.text = text
+        self.source = source
+        self.confidence = confidence
+        self.notes = intern_note(notes)
+        self.flags = flags
+        self.alternative = alternative
+        self.disputed = disputed
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, decision):
+        flags = Flags(0)
+        if decision.get('requires_review'):
+            flags |= Flags.REQUIRES_REVIEW
+        if 'alternative' in decision:
+            flags |= Flags.HAS_ALTERNATIVE
+        if decision['text'] is None:
+            flags |= Flags.FAILED
+        if decision.get('abbreviations'):
+            flags |= Flags.ABBREVIATIONS
+        if 'disputed_words' in decision:
+            flags |= Flags.DISPUTED
+        extra = {key: value for key, value in decision.items() if key not in _CORE_FIELDS}
+        return cls(
+            decision['text'],
+            Source.from_label(decision['source']),
+            Confidence.from_label(decision['confidence']),
+            decision.get('notes'),
+            flags,
+            decision.get('alternative'),
+            tuple(_pack_word(word) for word in decision.get('disputed_words', ())),
+            extra or None,
+        )
+
+    @property
+    def requires_review(self):
+        return bool(self.flags & Flags.REQUIRES_REVIEW)
+
+    def to_dict(self):
+        """המילון של decide_nikud() (requires_review מופיע רק כשהוא True)"""
+        decision = {
+            'text': self.text,
+            'source': self.source.label,
+            'confidence': self.confidence.label,
+            'notes': self.notes,
+        }
+        if self.flags & Flags.HAS_ALTERNATIVE:
+            decision['alternative'] = self.alternative
+        if self.flags & Flags.DISPUTED:
+            decision['disputed_words'] = [_unpack_word(word) for word in self.disputed]
+        if self.flags & Flags.REQUIRES_REVIEW:
+            decision['requires_review'] = True
+        if self.extra:
+            decision.update(self.extra)
+        return decision
+
+    def __repr__(self):
+        return (f"DecisionRecord({self.source.label!r}, {self.confidence.label!r}, "
+                f"flags={self.flags!r}, text={self.text!r})")
+
+
+# עמודות ברוחב קבוע: שם -> (typecode של array, dtype של numpy)
+_FIXED_COLUMNS = {
+    'line': ('Q', '<u8'),
+    'source': ('B', 'u1'),
+    'confidence': ('B', 'u1'),
+    'flags': ('B', 'u1'),
+    'note': ('I', '<u4'),
+    'disputed': ('H', '<u2'),
+    'min_margin': ('f', '<f4'),
+}
+_STRING_COLUMNS = ('input', 'text', 'alternative', 'details')
+
+
+def _atomic_json(path, data):
+    # שם זמני ייחודי, כדי ששני כותבים לא ידרסו זה את הקובץ הזמני של זה
+    temp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+        raise
+
+
+class ColumnarWriter:
+    """
+    כותב רשומות קורפוס ({'line', 'input', **decision}) לתיקיית עמודות
+
+    השורות נאספות בזיכרון ונכתבות בכל flush(); meta.json (ובו מספר
+    השורות) נכתב אחרון ובאופן אטומי, כך שקורא רואה רק אצוות שלמות.
+    """
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError("ColumnarWriter תומך רק במכונות little endian")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.rows = 0
+        self.notes = {}
+        self._files = {}
+        self._offsets = dict.fromkeys(_STRING_COLUMNS, 0)
+        for name in _FIXED_COLUMNS:
+            self._files[name] = open(self._column_path(name), 'wb')
+        for name in _STRING_COLUMNS:
+            self._files[f'{name}.bin'] = open(os.path.join(path, f'{name}.bin'), 'wb')
+            self._files[f'{name}.off'] = open(os.path.join(path, f'{name}.off'), 'wb')
+        self._reset()
+        self._write_meta()
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.{_FIXED_COLUMNS[name][1].lstrip('<')}")
+
+    def _reset(self):
+        self._fixed = {name: array(typecode) for name, (typecode, _) in _FIXED_COLUMNS.items()}
+        self._strings = {name: [] for name in _STRING_COLUMNS}
+
+    def _note_code(self, note):
+        code = self.notes.get(note)
+        if code is None:
+            code = self.notes[note] = len(self.notes)
+        return code
+
+    def write(self, decision, line=0, text_input=None):
+        record = decision if isinstance(decision, DecisionRecord) else DecisionRecord.from_dict(decision)
+        extra = record.extra or {}
+        fixed = self._fixed
+        fixed['line'].append(line or 0)
+        fixed['source'].append(record.source)
+        fixed['confidence'].append(record.confidence)
+        fixed['flags'].append(record.flags)
+        fixed['note'].append(self._note_code(record.notes))
+        fixed['disputed'].append(len(record.disputed))
+        fixed['min_margin'].append(extra.get('min_margin', float('nan')))
+
+        details = {key: value for key, value in extra.items() if key != 'min_margin'}
+        if record.disputed:
+            details['disputed_words'] = [_unpack_word(word) for word in record.disputed]
+        strings = self._strings
+        strings['input'].append(text_input or '')
+        strings['text'].append(record.text or '')
+        strings['alternative'].append(record.alternative or '')
+        strings['details'].append(json.dumps(details, ensure_ascii=False) if details else '')
+
+    def write_records(self, records):
+        """כותב רשומות קורפוס ומבצע flush; מחזיר כמה נכתבו"""
+        count = 0
+        for record in records:
+            decision = {key: value for key, value in record.items() if key not in ('line', 'input')}
+            self.write(decision, record.get('line'), record.get('input'))
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self):
+        pending = len(self._fixed['line'])
+        if not pending:
+            return
+        for name, values in self._fixed.items():
+            values.tofile(self._files[name])
+        for name, values in self._strings.items():
+            ends = array('Q')
+            offset = self._offsets[name]
+            blob = self._files[f'{name}.bin']
+            for value in values:
+                encoded = value.encode('utf-8')
+                blob.write(encoded)
+                offset += len(encoded)
+                ends.append(offset)
+            self._offsets[name] = offset
+            ends.tofile(self._files[f'{name}.off'])
+        for f in self._files.values():
+            f.flush()
+        self.rows += pending
+        self._reset()
+        self._write_meta()
+
+    def _write_meta(self):
+        _atomic_json(os.path.join(self.path, 'meta.json'), {
+            'version': FORMAT_VERSION,
+            'rows': self.rows,
+            'sources': {source.name: source.label for source in Source},
+            'confidence': {confidence.name: confidence.label for confidence in Confidence},
+            'flags': {flag.name: flag.value for flag in Flags},
+            'notes': list(self.notes),
+        })
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ColumnarDecisions:
+    """
+    קריאה של תיקיית עמודות בלי לטעון אותה (numpy.memmap)
+
+        decisions = ColumnarDecisions('library.cols')
+        rows = decisions.select(requires_review=True, source=Source.UNCERTAIN)
+        for row in rows[:20]:
+            print(decisions.record(row))
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"גרסת פורמט לא נתמכת: {self.meta['version']}")
+        self.rows = self.meta['rows']
+        self.notes = self.meta['notes']
+        self.columns = {}
+        for name, (_, dtype) in _FIXED_COLUMNS.items():
+            self.columns[name] = self._map(f"{name}.{dtype.lstrip('<')}", dtype, np)
+        self._ends = {name: self._map(f'{name}.off', '<u8', np) for name in _STRING_COLUMNS}
+        self._blobs = {}
+        for name in _STRING_COLUMNS:
+            size = int(self._ends[name][-1]) if self.rows else 0
+            self._blobs[name] = self._map(f'{name}.bin', 'u1', np, size)
+
+    def _map(self, filename, dtype, np, count=None):
+        count = self.rows if count is None else count
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode='r', shape=(count,))
+
+    def __len__(self):
+        return self.rows
+
+    def select(self, source=None, confidence=None, min_confidence=None, requires_review=None,
+               failed=None):
+        """
+        אינדקסי השורות שעומדות בכל התנאים
+
+        source יכול להיות Source או רשימה של Source.
+        """
+        import numpy as np
+
+        mask = np.ones(self.rows, dtype=bool)
+        if source is not None:
+            sources = [source] if isinstance(source, Source) else list(source)
+            mask &= np.isin(self.columns['source'], [int(s) for s in sources])
+        if confidence is not None:
+            mask &= self.columns['confidence'] == int(confidence)
+        if min_confidence is not None:
+            mask &= self.columns['confidence'] >= int(min_confidence)
+        flags = self.columns['flags']
+        for flag, wanted in ((Flags.REQUIRES_REVIEW, requires_review), (Flags.FAILED, failed)):
+            if wanted is not None:
+                mask &= ((flags & int(flag)) != 0) == wanted
+        return np.flatnonzero(mask)
+
+    def string(self, column, row):
+        ends = self._ends[column]
+        start = int(ends[row - 1]) if row else 0
+        return bytes(self._blobs[column][start:int(ends[row])]).decode('utf-8')
+
+    def record(self, row):
+        """רשומת הקורפוס המלאה של שורה ({'line', 'input', **decision})"""
+        flags = Flags(int(self.columns['flags'][row]))
+        decision = {
+            'text': None if flags & Flags.FAILED else self.string('text', row),
+            'source': Source(int(self.columns['source'][row])).label,
+            'confidence': Confidence(int(self.columns['confidence'][row])).label,
+            'notes': self.notes[int(self.columns['note'][row])],
+        }
+        if flags & Flags.HAS_ALTERNATIVE:
+            decision['alternative'] = self.string('alternative', row)
+        details = self.string('details', row)
+        if details:
+            decision.update(json.loads(details))
+        if flags & Flags.REQUIRES_REVIEW:
+            decision['requires_review'] = True
+        margin = float(self.columns['min_margin'][row])
+        if margin == margin:
+            decision['min_margin'] = round(margin, 4)
+        return {'line': int(self.columns['line'][row]), 'input': self.string('input', row), **decision}
+
+    def counts(self):
+        """מספר השורות לכל מקור, לכל רמת ביטחון, ולבדיקה ידנית"""
+        import numpy as np
+
+        source_counts = np.bincount(self.columns['source'], minlength=len(Source))
+        confidence_counts = np.bincount(self.columns['confidence'], minlength=len(Confidence) + 1)
+        return {
+            'rows': self.rows,
+            'sources': {s.label: int(source_counts[s]) for s in Source},
+            'confidence': {c.label: int(confidence_counts[c]) for c in Confidence},
+            'requires_review': int(np.count_nonzero(self.columns['flags'] & int(Flags.REQUIRES_REVIEW))),
+        }
+
+
+def convert_jsonl(jsonl_path, output_path):
+    """ממיר פלט JSONL של nikud_corpus.py לתיקיית עמודות"""
+    with open(jsonl_path, encoding='utf-8') as f, ColumnarWriter(output_path) as writer:
+        batch = []
+        for line in f:
+            batch.append(json.loads(line))
+            if len(batch) >= 10_000:
+                writer.write_records(batch)
+                batch = []
+        writer.write_records(batch)
+        return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="הכרעות ניקוד בפורמט עמודות")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="JSONL -> תיקיית עמודות")
+    convert.add_argument('jsonl')
+    convert.add_argument('output')
+
+    select = subparsers.add_parser('filter', help="סינון הכרעות (JSONL ל-stdout)")
+    select.add_argument('path')
+    select.add_argument('--source', choices=[s.name.lower() for s in Source], nargs='+')
+    select.add_argument('--min-confidence', choices=[c.label for c in Confidence])
+    select.add_argument('--review', action='store_true', help="רק הכרעות שדורשות בדיקה")
+    select.add_argument('--limit', type=int, default=0)
+    select.add_argument('--counts', action='store_true', help="רק סיכום")
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        rows = convert_jsonl(args.jsonl, args.output)
+        print(f"💾 {rows:,} הכרעות נכתבו ל-{args.output}")
+        return
+
+    decisions = ColumnarDecisions(args.path)
+    if args.counts:
+        print(json.dumps(decisions.counts(), ensure_ascii=False, indent=2))
+        return
+    rows = decisions.select(
+        source=[Source[name.upper()] for name in args.source] if args.source else None,
+        min_confidence=Confidence.from_label(args.min_confidence) if args.min_confidence else None,
+        requires_review=True if args.review else None,
+    )
+    if args.limit:
+        rows = rows[:args.limit]
+    sys.stdout.reconfigure(encoding='utf-8')
+    for row in rows:
+        print(json.dumps(decisions.record(int(row)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
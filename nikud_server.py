@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+שרת HTTP מקומי לניקוד - המודלים נטענים פעם אחת ומשרתים כמה לקוחות
+
+    python nikud_server.py --port 8765
+
+בקשות שמגיעות במקביל (למשל מכמה עובדי OCR) נאספות לתור ומתאחדות
+למיקרו-אצוות: אצווה נשלחת ל-process_many כשיש בה max_batch טקסטים
+או כשעברו max_wait_ms מהטקסט הראשון בה - המוקדם מביניהם.
+
+נקודות קצה:
+    POST /nikud   {"text": "..."} או {"texts": ["...", ...]}
+                  -> {"decision": {...}} או {"decisions": [...]}
+    GET  /health  -> מצב השרת, גודל התור, אילו מודלים נטענו ומוני שגיאות
+    GET  /stats   -> סיכום זמנים לכל שלב (PipelineStats.summary)
+
+כשהתור מלא השרת מחזיר 429 עם Retry-After, ובקשה עם יותר טקסטים
+מגודל התור כולו - 413. SIGINT/SIGTERM מפסיקים לקבל חיבורים חדשים,
+מסיימים את מה שכבר בתור ורק אז סוגרים את הפייפליין; מה שלא הספיק
+להסתיים עד drain_timeout מקבל 503.
+
+השרת מאזין ל-127.0.0.1 בלבד ורץ במצב offline (HF_HUB_OFFLINE) -
+המודלים חייבים להיות בדיסק (downloaded_models או onnx_models).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nikud_logging import configure_logging, get_logger, log_event
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 10
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+_log = get_logger('server')
+
+# מגבלות קלט
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_LINES = 100
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class QueueFull(Exception):
+    """אין מקום בתור לבקשה (-> 429)"""
+
+
+class BatchTooLarge(Exception):
+    """בקשה עם יותר טקסטים ממה שהתור יכול להכיל אי פעם (-> 413)"""
+
+
+class ShuttingDown(Exception):
+    """השרת נכבה לפני שהטקסט עובד (-> 503)"""
+
+
+class MicroBatcher:
+    """
+    תור בקשות שמתאחדות לאצוות ורצות בזו אחר זו ב-thread נפרד
+
+    Args:
+        pipeline: HebrewNikudPipeline (או כל אובייקט עם process_many)
+        max_batch: מספר הטקסטים המקסימלי באצווה
+        max_wait_ms: כמה לחכות לטקסטים נוספים אחרי הראשון
+        max_queue: מספר הטקסטים המקסימלי שממתינים בתור
+    """
+
+    def __init__(self, pipeline, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, max_queue=DEFAULT_MAX_QUEUE):
+        self.pipeline = pipeline
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.batches = 0
+        self.processed = 0
+        self._queue = asyncio.Queue()
+        # פייפליין אחד - אצווה אחת בכל רגע
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='nikud-batch')
+        self._task = None
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, texts):
+        """מכניס טקסטים לתור ומחכה להכרעות שלהם (באותו סדר)"""
+        if len(texts) > self.max_queue:
+            # לא ייכנס גם לתור ריק - ניסיון חוזר לא יעזור
+            raise BatchTooLarge()
+        if self.pending + len(texts) > self.max_queue:
+            raise QueueFull()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _collect(self, batch):
+        """ממלא את batch: הפריט הראשון, ואחריו עד max_batch או max_wait"""
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # האצווה נבנית במקום, כך שגם ביטול באמצע האיסוף רואה את מה שכבר נשלף
+            batch = []
+            try:
+                await self._collect(batch)
+                texts = [text for text, _ in batch]
+                try:
+                    decisions = await loop.run_in_executor(
+                        self._executor, self.pipeline.process_many, texts, len(texts)
+                    )
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for (_, future), decision in zip(batch, decisions):
+                        if not future.done():
+                            future.set_result(decision)
+                self.batches += 1
+                self.processed += len(batch)
+            finally:
+                # אצווה שנקטעה (ביטול בזמן איסוף או עיבוד) - אף בקשה לא נשארת תלויה
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ShuttingDown())
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self, timeout):
+        """
+        מחכה שכל מה שבתור יעובד (עד timeout שניות) ועוצר
+
+        טקסטים שלא עובדו עד ה-timeout (בתור או באצווה שנקטעה) נכשלים
+        ב-ShuttingDown, כך שאף בקשה לא נשארת תלויה.
+        """
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), timeout)
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(ShuttingDown())
+            self._queue.task_done()
+        # אצווה שכבר רצה ב-thread מסתיימת שם; מחכים לה בלי לחסום את הלולאה
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+async def _read_request(reader):
+    """
+    קורא בקשת HTTP/1.1 אחת
+
+    Returns:
+        (method, path, headers, body), או None אם החיבור נסגר
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, 'שורת בקשה לא תקינה')
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, 'יותר מדי כותרות')
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400, 'Content-Length לא תקין')
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f'גוף הבקשה גדול מ-{MAX_BODY_BYTES} בתים')
+    body = await reader.readexactly(length) if length else b''
+    return method, path.split('?', 1)[0], headers, body
+
+
+def _response(status, payload, headers=None, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    lines = [
+        f'HTTP/1.1 {status} {_REASONS.get(status, "")}',
+        'Content-Type: application/json; charset=utf-8',
+        f'Content-Length: {len(body)}',
+        f'Connection: {"keep-alive" if keep_alive else "close"}',
+    ]
+    lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+class NikudServer:
+    """שרת asyncio: ניתוב, תור מיקרו-אצוות, backpressure וכיבוי מסודר"""
+
+    def __init__(self, pipeline, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 max_queue=DEFAULT_MAX_QUEUE, drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+        self.pipeline = pipeline
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.batcher_options = (max_batch, max_wait_ms, max_queue)
+        self.batcher = None
+        self.draining = False
+        self.rejected = 0
+        self.started = time.time()
+        self._server = None
+        self._stopped = None
+        # חיבורי keep-alive שממתינים לבקשה הבאה - נסגרים בכיבוי
+        self._idle = set()
+
+    async def _nikud(self, body):
+        try:
+            payload = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(400, 'גוף הבקשה אינו JSON תקין')
+        if isinstance(payload, dict) and isinstance(payload.get('text'), str):
+            texts, single = [payload['text']], True
+        elif isinstance(payload, dict) and isinstance(payload.get('texts'), list) \
+                and all(isinstance(text, str) for text in payload['texts']):
+            texts, single = payload['texts'], False
+        else:
+            raise HttpError(400, 'נדרש "text" (מחרוזת) או "texts" (רשימת מחרוזות)')
+
+        try:
+            decisions = await self.batcher.submit(texts)
+        except BatchTooLarge:
+            self.rejected += 1
+            raise HttpError(413, f'יותר מ-{self.batcher.max_queue} טקסטים בבקשה אחת')
+        except QueueFull:
+            self.rejected += 1
+            raise HttpError(429, 'התור מלא, נסה שוב', {'Retry-After': '1'})
+        except ShuttingDown:
+            raise HttpError(503, 'השרת נכבה לפני שהבקשה עובדה')
+        if single:
+            return {'decision': decisions[0]}
+        return {'decisions': decisions}
+
+    def _health(self):
+        return {
+            'status': 'draining' if self.draining else 'ok',
+            'queue': self.batcher.pending,
+            'max_queue': self.batcher.max_queue,
+            'batches': self.batcher.batches,
+            'processed': self.batcher.processed,
+            'rejected': self.rejected,
+            'uptime_s': round(time.time() - self.started, 1),
+            'models': self.pipeline.loaded_models(),
+            'errors': self.pipeline.errors(),
+        }
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            if method != 'GET':
+                raise HttpError(405, 'GET בלבד')
+            return (503 if self.draining else 200), self._health()
+        if path == '/stats':
+            if method != 'GET':
+                raise HttpError(405, 'GET בלבד')
+            return 200, self.pipeline.stats.summary()
+        if path == '/nikud':
+            if method != 'POST':
+                raise HttpError(405, 'POST בלבד')
+            if self.draining:
+                raise HttpError(503, 'השרת בכיבוי')
+            return 200, await self._nikud(body)
+        raise HttpError(404, f'אין נתיב {path}')
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while not self.draining:
+                headers = {}
+                extra_headers = None
+                try:
+                    self._idle.add(writer)
+                    try:
+                        request = await _read_request(reader)
+                    finally:
+                        self._idle.discard(writer)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    status, payload = await self._dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload, extra_headers = e.status, {'error': str(e)}, e.headers
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    log_event(_log, logging.ERROR, 'request_failed', error=str(e))
+                    status, payload = 500, {'error': str(e)}
+                keep_alive = (
+                    not self.draining
+                    and headers.get('connection', '').lower() != 'close'
+                    and status not in (400, 413)
+                )
+                writer.write(_response(status, payload, extra_headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def serve(self):
+        """מריץ את השרת עד SIGINT/SIGTERM או stop()"""
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self.stop)
+
+        self.batcher = MicroBatcher(self.pipeline, *self.batcher_options)
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🚀 מאזין ב-http://{self.host}:{self.port}", file=sys.stderr)
+
+        await self._stopped.wait()
+
+        # כיבוי מסודר: בלי חיבורים חדשים, מסיימים את התור, סוגרים
+        print("🛑 מכבה - מסיים את הבקשות שבתור...", file=sys.stderr)
+        self.draining = True
+        self._server.close()
+        self._close_idle()
+        await self.batcher.drain(self.drain_timeout)
+        await self._server.wait_closed()
+        self.pipeline.close()
+        print("✅ השרת נסגר", file=sys.stderr)
+
+    def _close_idle(self):
+        """
+        סוגר חיבורי keep-alive שלא באמצע בקשה - אחרת wait_closed
+        (מ-Python 3.12) מחכה להם לנצח. חיבור באמצע בקשה נסגר לבד אחרי
+        התשובה, כי בזמן כיבוי התשובה נשלחת עם Connection: close.
+        """
+        for writer in list(self._idle):
+            writer.close()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="שרת ניקוד מקומי עם מיקרו-אצוות")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="מעבר לזה בתור - 429")
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default='torch')
+    parser.add_argument('--onnx-dir')
+    parser.add_argument('--cpu-fast', action='store_true')
+    parser.add_argument('--skip-margin', type=float)
+    parser.add_argument('--lexicon')
+    parser.add_argument('--cache', metavar='DB', help="קובץ sqlite למטמון הכרעות")
+    parser.add_argument('--log-level', default='WARNING', help="לוגים כ-JSON lines ל-stderr")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    # offline בלבד - בלי ניסיון גישה ל-HuggingFace Hub
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    from complete_nikud_pipeline import HebrewNikudPipeline
+
+    pipeline_kwargs = {
+        'workers': args.workers,
+        'backend': args.backend,
+        'cpu_fast': args.cpu_fast,
+        'skip_margin': args.skip_margin,
+        'lexicon': args.lexicon,
+    }
+    if args.onnx_dir:
+        pipeline_kwargs['onnx_dir'] = args.onnx_dir
+    with contextlib.redirect_stdout(sys.stderr):
+        pipeline = HebrewNikudPipeline(**pipeline_kwargs)
+        if args.cache:
+            pipeline.enable_cache(args.cache)
+        pipeline.load_models()
+
+    server = NikudServer(
+        pipeline, DEFAULT_HOST, args.port, args.max_batch, args.max_wait_ms,
+        args.max_queue, args.drain_timeout
+    )
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+ניקוד קורפוס על כמה מחשבים עם מערכת קבצים משותפת - בלי מתאם
+
+    # על כל מחשב (כמה פעמים שרוצים, גם באמצע הריצה):
+    python nikud_shards.py work library.txt --workdir /shared/library
+    python nikud_shards.py status library.txt --workdir /shared/library
+    python nikud_shards.py merge library.txt --workdir /shared/library -o library.jsonl
+
+הקורפוס מחולק לרסיסים של shard_lines שורות (טווחי בתים שמתחילים ונגמרים
+בגבול שורה). כל עובד עובר על הרסיסים ותופס רסיס פנוי עם קובץ lease
+שנוצר ב-O_CREAT|O_EXCL - רק עובד אחד מצליח. בזמן העבודה thread מעדכן את
+mtime של ה-lease כל heartbeat שניות. lease שלא עודכן ttl שניות שייך
+לעובד מת: עובד אחר משנה את שמו (rename אטומי - רק אחד מצליח) ותופס את
+הרסיס מחדש. עובד שגילה שה-lease שלו נלקח מפסיק את הרסיס ומוחק את הפלט
+החלקי שלו.
+
+הפלט של רסיס נכתב לקובץ זמני ועובר os.replace לשמו הסופי רק כשהוא
+שלם, כך שקובץ פלט קיים = רסיס שהושלם. שם הקובץ הזמני כולל את מזהה
+העובד, וגונב מוחק רק את הקבצים הזמניים של הבעלים הקודם - לא של עובד
+שעוד רץ על אותו רסיס. השעונים של המחשבים צריכים להיות
+מסונכרנים בפחות מ-ttl.
+
+לבדיקה על מחשב אחד: כמה תהליכי work מקומיים במקביל עם --fake-engines
+(ראה nikud_fake_engines.py), והריגה של אחד מהם באמצע.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from nikud_corpus import add_pipeline_arguments, decision_record, make_runner, write_jsonl
+from nikud_logging import configure_logging
+
+DEFAULT_SHARD_LINES = 10_000
+DEFAULT_LEASE_TTL = 60.0
+DEFAULT_HEARTBEAT = 10.0
+DEFAULT_POLL = 5.0
+
+
+class LeaseLost(Exception):
+    """ה-lease על הרסיס נלקח על ידי עובד אחר"""
+
+
+def _input_identity(path):
+    """גודל ותאריך שינוי - בלי הנתיב, שיכול להיות שונה בין המחשבים"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def _owner_tag(owner):
+    """מזהה עובד בצורה שמתאימה לשם קובץ"""
+    return owner.replace(':', '_')
+
+
+def _read_owner(path):
+    """מזהה הבעלים שכתוב בקובץ lease, או None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['owner']
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _atomic_write(path, data):
+    """כותב קובץ דרך קובץ זמני באותה תיקייה ו-os.replace"""
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+class ShardPlan:
+    """
+    חלוקת הקורפוס לרסיסים ותיקיית העבודה המשותפת
+
+    workdir/plan.json        - החלוקה (כל העובדים מחשבים אותה זהה)
+    workdir/leases/NNNNN     - ה-lease של רסיס בעבודה
+    workdir/out/NNNNN.jsonl  - הפלט של רסיס שהושלם
+    """
+
+    def __init__(self, workdir, input_path, shards):
+        self.workdir = workdir
+        self.input_path = input_path
+        self.shards = shards
+        self.lease_dir = os.path.join(workdir, 'leases')
+        self.output_dir = os.path.join(workdir, 'out')
+
+    @staticmethod
+    def split(input_path, shard_lines=DEFAULT_SHARD_LINES):
+        """[{'index', 'start', 'end', 'first_line', 'lines'}] לפי גבולות שורה"""
+        shards = []
+        start = offset = 0
+        first_line = line_number = 1
+        with open(input_path, 'rb') as f:
+            for raw in f:
+                offset += len(raw)
+                line_number += 1
+                if line_number - first_line == shard_lines:
+                    shards.append({'index': len(shards), 'start': start, 'end': offset,
+                                   'first_line': first_line, 'lines': shard_lines})
+                    start, first_line = offset, line_number
+        if offset > start:
+            shards.append({'index': len(shards), 'start': start, 'end': offset,
+                           'first_line': first_line, 'lines': line_number - first_line})
+        return shards
+
+    @classmethod
+    def open(cls, workdir, input_path, shard_lines=DEFAULT_SHARD_LINES):
+        """קורא את החלוקה מ-workdir, או יוצר אותה (העובד הראשון)"""
+        path = os.path.join(workdir, 'plan.json')
+        identity = _input_identity(input_path)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                plan = json.load(f)
+            if plan['input'] != identity or plan['shard_lines'] != shard_lines:
+                raise ValueError(f"תיקיית העבודה {workdir} שייכת לקלט או לחלוקה אחרים")
+        else:
+            plan = {'input': identity, 'shard_lines': shard_lines,
+                    'shards': cls.split(input_path, shard_lines)}
+            os.makedirs(os.path.join(workdir, 'leases'), exist_ok=True)
+            os.makedirs(os.path.join(workdir, 'out'), exist_ok=True)
+            # עובדים שמחשבים במקביל כותבים חלוקה זהה, וה-replace האחרון מנצח
+            _atomic_write(path, json.dumps(plan))
+        return cls(workdir, input_path, plan['shards'])
+
+    def lease_path(self, shard):
+        return os.path.join(self.lease_dir, f"{shard['index']:05d}")
+
+    def output_path(self, shard):
+        return os.path.join(self.output_dir, f"{shard['index']:05d}.jsonl")
+
+    def is_done(self, shard):
+        return os.path.exists(self.output_path(shard))
+
+    def lines(self, shard):
+        """השורות של רסיס (טקסט, עם סוף השורה)"""
+        with open(self.input_path, 'rb') as f:
+            f.seek(shard['start'])
+            remaining = shard['end'] - shard['start']
+            while remaining > 0:
+                raw = f.readline()
+                if not raw:
+                    break
+                remaining -= len(raw)
+                yield raw.decode('utf-8')
+
+    def status(self, ttl=DEFAULT_LEASE_TTL):
+        counts = {'shards': len(self.shards), 'done': 0, 'leased': 0, 'expired': 0, 'pending': 0}
+        now = time.time()
+        for shard in self.shards:
+            if self.is_done(shard):
+                counts['done'] += 1
+                continue
+            try:
+                age = now - os.stat(self.lease_path(shard)).st_mtime
+            except FileNotFoundError:
+                counts['pending'] += 1
+                continue
+            counts['expired' if age > ttl else 'leased'] += 1
+        return counts
+
+
+class Lease:
+    """
+    lease על רסיס: קובץ שנוצר ב-O_EXCL ומכיל את מזהה הבעלים
+
+    Args:
+        path: קובץ ה-lease
+        owner: מזהה העובד (מחשב:תהליך:אקראי)
+        ttl: אחרי כמה שניות בלי heartbeat ה-lease נחשב נטוש
+    """
+
+    def __init__(self, path, owner, ttl=DEFAULT_LEASE_TTL):
+        self.path = path
+        self.owner = owner
+        self.ttl = ttl
+        self.stolen = False
+        # הבעלים של lease שנגנב (None אם לא נגנב או שהקובץ לא נקרא)
+        self.previous_owner = None
+
+    def _create(self):
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'owner': self.owner, 'acquired': time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _expired(self, path):
+        try:
+            return time.time() - os.stat(path).st_mtime > self.ttl
+        except FileNotFoundError:
+            return False
+
+    def acquire(self):
+        """
+        תופס את ה-lease, או גונב אותו אם פג תוקפו
+
+        Returns:
+            True אם ה-lease שלנו
+        """
+        if self._create():
+            return True
+        if not self._expired(self.path):
+            return False
+
+        stale = f"{self.path}.{_owner_tag(self.owner)}.stale"
+        try:
+            os.rename(self.path, stale)
+        except FileNotFoundError:
+            return False    # עובד אחר גנב קודם
+        if not self._expired(stale):
+            # בין הבדיקה ל-rename עובד אחר כבר גנב ויצר lease חדש - מחזירים
+            # אותו (link לא דורס, כך שלא נפגע ב-lease שנוצר בינתיים)
+            with contextlib.suppress(FileExistsError):
+                os.link(stale, self.path)
+            os.remove(stale)
+            return False
+        self.previous_owner = _read_owner(stale)
+        os.remove(stale)
+        self.stolen = True
+        return self._create()
+
+    def held(self):
+        return _read_owner(self.path) == self.owner
+
+    def heartbeat(self):
+        """מעדכן את mtime; מחזיר False אם ה-lease כבר לא שלנו"""
+        if not self.held():
+            return False
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self.path)
+            return True
+        return False
+
+    def release(self):
+        if self.held():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+
+
+class _Heartbeat(threading.Thread):
+    """מעדכן lease ברקע, ומסמן lost אם גילה שה-lease נלקח"""
+
+    def __init__(self, lease, interval):
+        super().__init__(daemon=True, name='nikud-lease-heartbeat')
+        self.lease = lease
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if not self.lease.heartbeat():
+                self.lost.set()
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class ShardWorker:
+    """
+    עובד: תופס רסיסים פנויים או נטושים ומנקד אותם עד שכולם הושלמו
+
+    Args:
+        pipeline: HebrewNikudPipeline או PipelinePool
+        plan: ShardPlan
+        batch_size: גודל האצווה ל-process_stream
+        ttl, heartbeat: תוקף ה-lease ותדירות העדכון שלו (heartbeat < ttl)
+        poll: כמה לחכות כשכל הרסיסים הנותרים תפוסים
+    """
+
+    def __init__(self, pipeline, plan, batch_size, ttl=DEFAULT_LEASE_TTL,
+                 heartbeat=DEFAULT_HEARTBEAT, poll=DEFAULT_POLL, log=sys.stderr):
+        self.pipeline = pipeline
+        self.plan = plan
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.poll = poll
+        self.log = log
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.counters = {'shards': 0, 'lines': 0, 'stolen': 0, 'lost': 0}
+
+    def run(self):
+        """עובד עד שכל הרסיסים הושלמו (על ידינו או על ידי אחרים)"""
+        while True:
+            pending = [shard for shard in self.plan.shards if not self.plan.is_done(shard)]
+            if not pending:
+                return self.counters
+            # סדר אקראי, כדי שעובדים שמתחילים יחד לא יתחרו על אותו רסיס
+            random.shuffle(pending)
+            if not any(self._try_shard(shard) for shard in pending):
+                time.sleep(self.poll)
+
+    def _try_shard(self, shard):
+        lease = Lease(self.plan.lease_path(shard), self.owner, self.ttl)
+        if not lease.acquire():
+            return False
+        if lease.stolen:
+            self.counters['stolen'] += 1
+            print(f"🔓 רסיס {shard['index']} נלקח מעובד שלא הגיב", file=self.log)
+            # פלט חלקי שהבעלים הקודם השאיר. רק שלו - אם הוא עוד חי (למשל
+            # נתקע ולא עדכן heartbeat) הוא יגלה שה-lease נלקח וימחק בעצמו
+            if lease.previous_owner is not None:
+                prefix = f"{self.plan.output_path(shard)}.{_owner_tag(lease.previous_owner)}"
+                for temp in glob.glob(f"{glob.escape(prefix)}.*.tmp"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(temp)
+        # ייתכן שהרסיס הושלם בין הבדיקה לתפיסה
+        if self.plan.is_done(shard):
+            lease.release()
+            return False
+
+        beat = _Heartbeat(lease, self.heartbeat)
+        beat.start()
+        try:
+            self._process(shard, beat.lost)
+        except LeaseLost:
+            self.counters['lost'] += 1
+            print(f"⚠️  ה-lease על רסיס {shard['index']} נלקח - מוותר", file=self.log)
+            return False
+        finally:
+            beat.stop()
+            lease.release()
+        self.counters['shards'] += 1
+        self.counters['lines'] += shard['lines']
+        print(f"✅ רסיס {shard['index']} ({shard['lines']:,} שורות)", file=self.log)
+        return True
+
+    def _process(self, shard, lost):
+        final = self.plan.output_path(shard)
+        temp = f"{final}.{_owner_tag(self.owner)}.{uuid.uuid4().hex}.tmp"
+        offset = shard['first_line'] - 1
+        try:
+            with open(temp, 'w', encoding='utf-8') as output:
+                pending = []
+                for line_number, text, decision in self.pipeline.process_stream(
+                        self.plan.lines(shard), self.batch_size):
+                    pending.append(decision_record(line_number + offset, text, decision))
+                    if len(pending) >= self.batch_size:
+                        if lost.is_set():
+                            raise LeaseLost(shard['index'])
+                        write_jsonl(pending, output)
+                        pending = []
+                write_jsonl(pending, output)
+                output.flush()
+                os.fsync(output.fileno())
+            if lost.is_set():
+                raise LeaseLost(shard['index'])
+            try:
+                os.replace(temp, final)
+            except FileNotFoundError:
+                # הקובץ הזמני נמחק מתחתינו - מישהו אחר לקח את הרסיס
+                raise LeaseLost(shard['index']) from None
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp)
+
+
+def merge(plan, output_path):
+    """מחבר את פלטי הרסיסים לפי הסדר לקובץ אחד (גם הוא ב-os.replace)"""
+    missing = [shard['index'] for shard in plan.shards if not plan.is_done(shard)]
+    if missing:
+        raise ValueError(f"{len(missing)} רסיסים עוד לא הושלמו (למשל {missing[0]})")
+    temp = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp, 'wb') as output:
+        for shard in plan.shards:
+            with open(plan.output_path(shard), 'rb') as f:
+                shutil.copyfileobj(f, output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp, output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ניקוד קורפוס מחולק לרסיסים על כמה מחשבים")
+    parser.add_argument('command', choices=['work', 'status', 'merge'])
+    parser.add_argument('input', help="קובץ הקורפוס (בנתיב המשותף)")
+    parser.add_argument('--workdir', required=True, help="תיקיית העבודה המשותפת")
+    parser.add_argument('-o', '--output', help="קובץ JSONL מאוחד (merge)")
+    parser.add_argument('--shard-lines', type=int, default=DEFAULT_SHARD_LINES)
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL)
+    parser.add_argument('--heartbeat', type=float, default=DEFAULT_HEARTBEAT)
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL)
+    parser.add_argument('--fake-engines', action='store_true',
+                        help="מנועים מדומים במקום המודלים (לבדיקות)")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+    if args.command == 'work':
+        # status ו-merge לא מחזיקים lease ולא מריצים פייפליין
+        if args.heartbeat >= args.lease_ttl:
+            parser.error("--heartbeat חייב להיות קצר מ---lease-ttl")
+        if args.fake_engines and args.processes:
+            parser.error("--fake-engines עובד רק בתהליך אחד (בלי --processes)")
+
+    try:
+        plan = ShardPlan.open(args.workdir, args.input, args.shard_lines)
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.command == 'status':
+        print(json.dumps(plan.status(args.lease_ttl), ensure_ascii=False))
+        return
+    if args.command == 'merge':
+        if not args.output:
+            parser.error("merge דורש -o")
+        try:
+            merge(plan, args.output)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"💾 {len(plan.shards)} רסיסים אוחדו ל-{args.output}")
+        return
+
+    start = time.time()
+    with contextlib.redirect_stdout(sys.stderr), make_runner(args) as pipeline:
+        if args.fake_engines:
+            from nikud_fake_engines import install_fake_engines
+            install_fake_engines(pipeline)
+        worker = ShardWorker(pipeline, plan, args.batch_size, args.lease_ttl,
+                             args.heartbeat, args.poll)
+        counters = worker.run()
+    print(f"🏁 {worker.owner}: {counters} תוך {time.time() - start:.1f} שניות", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+מדידת זמנים ופרופיילינג לפייפליין הניקוד
+
+PipelineStats אוסף לכל שלב (tokenization, dictabert, nakdimon, morph,
+decision, cache) זמן ריצה, גודל אצווה, מספר טוקנים ופגיעות/החטאות
+מטמון, ומסכם אותם בהיסטוגרמות עם אחוזונים p50/p95/p99.
+אפשר לרשום callback שיקבל כל מדידה (add_listener).
+
+פרופיילינג מופעל במשתנה סביבה:
+    NIKUD_PROFILE=cprofile   -> קובץ .prof (לצפייה עם snakeviz / pstats)
+    NIKUD_PROFILE=torch      -> trace של torch.profiler (chrome://tracing)
+    NIKUD_PROFILE_OUT=path   -> קובץ הפלט (ברירת מחדל לפי הסוג)
+"""
+
+import cProfile
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+# מדידה בודדת שנשלחת ל-listeners
+StageEvent = namedtuple(
+    'StageEvent',
+    ['stage', 'seconds', 'batch_size', 'tokens', 'cache_hits', 'cache_misses']
+)
+
+# דלי היסטוגרמה: גבולות גיאומטריים מ-1 מיקרו-שנייה, ~5% רזולוציה
+_BUCKET_BASE = 1e-6
+_BUCKET_GROWTH = 1.05
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+
+
+class LatencyHistogram:
+    """היסטוגרמה לוגריתמית בזיכרון קבוע - אחוזונים בדיוק של ~5%"""
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = 0 if seconds <= _BUCKET_BASE else int(math.log(seconds / _BUCKET_BASE) / _LOG_GROWTH) + 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """האחוזון q (0-100) בשניות"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                upper = _BUCKET_BASE * _BUCKET_GROWTH ** index
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+
+class _StageStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.items = 0
+        self.tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class PipelineStats:
+    """אוסף מדידות לכל שלב בפייפליין (בטוח ל-threads)"""
+
+    def __init__(self):
+        self._stages = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def add_listener(self, callback):
+        """callback(StageEvent) ייקרא אחרי כל מדידה"""
+        self._listeners.append(callback)
+
+    def record(self, stage, seconds, batch_size=1, tokens=0, cache_hits=0, cache_misses=0):
+        """רושם מדידה אחת של שלב (קריאה אחת, אולי על אצווה)"""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats()
+            stats.latency.add(seconds)
+            stats.items += batch_size
+            stats.tokens += tokens
+            stats.cache_hits += cache_hits
+            stats.cache_misses += cache_misses
+        if self._listeners:
+            event = StageEvent(stage, seconds, batch_size, tokens, cache_hits, cache_misses)
+            for callback in self._listeners:
+                callback(event)
+
+    @contextmanager
+    def stage(self, stage, batch_size=1, tokens=0):
+        """מודד את זמן הבלוק ורושם אותו כשלב"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, batch_size, tokens)
+
+    def count(self, name, amount=1):
+        """מונה כללי (שגיאות, מילים מהלקסיקון וכו')"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def lexicon_fraction(self):
+        """החלק של הטוקנים שנוקדו מהלקסיקון בלי להריץ את המודלים"""
+        total = self.counters['tokens.total']
+        return self.counters['lexicon.tokens'] / total if total else 0.0
+
+    def summary(self):
+        """מילון שלב -> סיכום (זמנים במילישניות)"""
+        with self._lock:
+            result = {}
+            for stage, stats in self._stages.items():
+                latency = stats.latency
+                result[stage] = {
+                    'calls': latency.count,
+                    'items': stats.items,
+                    'tokens': stats.tokens,
+                    'total_s': round(latency.total, 4),
+                    'mean_batch': round(stats.items / latency.count, 2) if latency.count else 0,
+                    'p50_ms': round(latency.percentile(50) * 1000, 3),
+                    'p95_ms': round(latency.percentile(95) * 1000, 3),
+                    'p99_ms': round(latency.percentile(99) * 1000, 3),
+                    'max_ms': round(latency.max * 1000, 3),
+                    'cache_hits': stats.cache_hits,
+                    'cache_misses': stats.cache_misses,
+                }
+            return result
+
+    def dump(self, file=None):
+        """מדפיס טבלת סיכום לכל השלבים"""
+        file = file or sys.stdout
+        print(f"{'stage':<14}{'calls':>8}{'items':>10}{'tokens':>11}{'total s':>10}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hits':>8}{'misses':>8}", file=file)
+        for stage, row in self.summary().items():
+            print(f"{stage:<14}{row['calls']:>8}{row['items']:>10}{row['tokens']:>11}"
+                  f"{row['total_s']:>10.3f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                  f"{row['p99_ms']:>10.2f}{row['cache_hits']:>8}{row['cache_misses']:>8}", file=file)
+        for name, value in sorted(self.counters.items()):
+            print(f"{name}: {value}", file=file)
+        if self.counters['tokens.total']:
+            print(f"lexicon fraction: {self.lexicon_fraction():.2%}", file=file)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.counters.clear()
+
+
+class _NoProfiler:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
+
+
+class _CProfileCapture:
+    """cProfile שנדלק רק בתוך קריאות לפייפליין ומצטבר ביניהן"""
+
+    def __init__(self, path):
+        self.path = path
+        self._profile = cProfile.Profile()
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            if self._depth == 0:
+                self._profile.enable()
+            self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                self._profile.disable()
+        return False
+
+    def close(self):
+        self._profile.dump_stats(self.path)
+        print(f"📊 פרופיל cProfile נשמר: {self.path}", file=sys.stderr)
+
+
+class _TorchProfileCapture:
+    """torch.profiler שרץ מהקריאה הראשונה ועד close()"""
+
+    def __init__(self, path):
+        self.path = path
+        self._profiler = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            if self._profiler is None:
+                import torch
+                self._profiler = torch.profiler.profile(
+                    activities=[torch.profiler.ProfilerActivity.CPU],
+                    record_shapes=True
+                )
+                self._profiler.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        if self._profiler is None:
+            return
+        self._profiler.__exit__(None, None, None)
+        self._profiler.export_chrome_trace(self.path)
+        print(f"📊 trace של torch נשמר: {self.path}", file=sys.stderr)
+        self._profiler = None
+
+
+def profiler_from_env():
+    """יוצר פרופיילר לפי NIKUD_PROFILE (או פרופיילר ריק)"""
+    mode = os.environ.get('NIKUD_PROFILE', '').strip().lower()
+    if mode == 'cprofile':
+        return _CProfileCapture(os.environ.get('NIKUD_PROFILE_OUT', 'nikud_profile.prof'))
+    if mode == 'torch':
+        return _TorchProfileCapture(os.environ.get('NIKUD_PROFILE_OUT', 'nikud_trace.json'))
+    return _NoProfiler()
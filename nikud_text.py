@@ -0,0 +1,241 @@
+"""
+כלי טקסט משותפים לפייפליין הניקוד
+נרמול קלט, הסרת ניקוד, זיהוי אותיות עבריות ויישור מילים בין פלטים
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+# סימני ניקוד וטעמים (U+0591-U+05C7), בלי מקף, פסק, סוף פסוק ונון הפוכה
+_NIKUD_RE = re.compile('[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def remove_nikud(text):
+    """מסיר ניקוד וטעמים ומשאיר אותיות ופיסוק"""
+    return _NIKUD_RE.sub('', text)
+
+
+def is_hebrew_letter(char):
+    """האם התו הוא אות עברית (א-ת, כולל סופיות)"""
+    return 'א' <= char <= 'ת'
+
+
+def normalize_text(text):
+    """
+    מנרמל שורת קלט: NFC, רווח יחיד בין מילים, בלי רווחים בקצוות
+
+    הנרמול לא משנה אותיות או פיסוק, ולכן הפלט המנוקד של הטקסט המנורמל
+    זהה לפלט של המקור פרט לרווחים.
+    """
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def disputed_words(primary, secondary):
+    """
+    מיישר את המילים של שני פלטים מנוקדים ומחזיר את המילים שבמחלוקת
+
+    היישור נעשה לפי האותיות בלבד (בלי ניקוד), כך שמילה שנוקדה אחרת
+    מתיישרת מול אותה מילה בפלט השני. מילים שלא התיישרו כלל נחשבות
+    במחלוקת גם הן.
+
+    Returns:
+        רשימת (אינדקס מילה ב-primary, מילה ב-primary, מילה ב-secondary או None)
+    """
+    words_a = primary.split()
+    words_b = secondary.split()
+    base_a = [remove_nikud(word) for word in words_a]
+    base_b = [remove_nikud(word) for word in words_b]
+
+    if base_a == base_b:
+        return [
+            (i, a, b) for i, (a, b) in enumerate(zip(words_a, words_b)) if a != b
+        ]
+
+    disputes = []
+    matcher = SequenceMatcher(None, base_a, base_b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            for offset in range(i2 - i1):
+                a, b = words_a[i1 + offset], words_b[j1 + offset]
+                if a != b:
+                    disputes.append((i1 + offset, a, b))
+        else:
+            disputes.extend((i, words_a[i], None) for i in range(i1, i2))
+    return disputes
+
+
+def context_spans(indices, num_words, context):
+    """
+    מחזיר טווחי מילים [start, end) סביב האינדקסים, עם context מילים מכל צד
+
+    טווחים חופפים או צמודים מאוחדים לטווח אחד.
+    """
+    spans = []
+    for index in sorted(indices):
+        start = max(0, index - context)
+        end = min(num_words, index + context + 1)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+# סימני סוף משפט: נקודה, סימן שאלה/קריאה, נקודתיים וסוף פסוק (׃)
+_SENTENCE_END = frozenset('.?!:׃')
+_TRAILING_QUOTES = '"\'״׳)]'
+_WORD_RE = re.compile(r'\S+')
+
+
+def _ends_sentence(word):
+    return word.rstrip(_TRAILING_QUOTES)[-1:] in _SENTENCE_END
+
+
+def sentence_spans(text):
+    """
+    טווחי התווים של המשפטים בטקסט (מתחילת המילה הראשונה עד סוף האחרונה)
+
+    משפט מסתיים במילה שסופה . ? ! : או ׃ (גם לפני מרכאות או סוגריים).
+    """
+    spans = []
+    start = None
+    matches = list(_WORD_RE.finditer(text))
+    for index, match in enumerate(matches):
+        if start is None:
+            start = match.start()
+        if _ends_sentence(match.group()) or index == len(matches) - 1:
+            spans.append((start, match.end()))
+            start = None
+    return spans
+
+
+def plan_windows(text, max_chars, overlap_words):
+    """
+    מחלק טקסט ארוך לחלונות שכל אחד מהם קצר מ-max_chars תווים
+
+    קודם מחלקים לפי סוף משפט (. ? ! : ׃) ואורזים משפטים שלמים לחלונות
+    בלי חפיפה. משפט שארוך בעצמו מ-max_chars מחולק לחלונות חופפים של
+    מילים, עם overlap_words מילות הקשר מכל צד, וכל חלון "מחזיק" רק את
+    המילים שבאמצע שלו - כך שכל מילה מנוקדת עם הקשר משני הצדדים.
+
+    Returns:
+        (spans, windows) - spans הם טווחי התווים של כל מילה בטקסט, ו-windows
+        רשימת (start, end, keep_start, keep_end) באינדקסי מילים
+    """
+    spans = [match.span() for match in _WORD_RE.finditer(text)]
+
+    def chars(start, end):
+        return spans[end - 1][1] - spans[start][0]
+
+    sentences = []
+    start = 0
+    for index, (word_start, word_end) in enumerate(spans):
+        if _ends_sentence(text[word_start:word_end]) or index == len(spans) - 1:
+            sentences.append((start, index + 1))
+            start = index + 1
+
+    windows = []
+    for sent_start, sent_end in sentences:
+        if chars(sent_start, sent_end) > max_chars:
+            windows.extend(_overlapping_windows(sent_start, sent_end, chars, max_chars, overlap_words))
+            continue
+        # אריזת משפטים שלמים: הרחב את החלון הקודם אם יש מקום
+        if windows:
+            prev_start, prev_end, prev_keep_start, prev_keep_end = windows[-1]
+            if (prev_keep_start, prev_keep_end) == (prev_start, prev_end) \
+                    and prev_end == sent_start and chars(prev_start, sent_end) <= max_chars:
+                windows[-1] = (prev_start, sent_end, prev_start, sent_end)
+                continue
+        windows.append((sent_start, sent_end, sent_start, sent_end))
+    return spans, windows
+
+
+def _overlapping_windows(first, last, chars, max_chars, overlap_words):
+    """חלונות חופפים על המילים [first, last) של משפט ארוך"""
+    windows = []
+    position = first
+    while position < last:
+        start = max(first, position - overlap_words)
+        # ההקשר משמאל מתקצר אם המילים בו ארוכות מכדי להיכנס לחלון
+        while start < position and chars(start, position + 1) > max_chars:
+            start += 1
+        end = position + 1
+        while end < last and chars(start, end + 1) <= max_chars:
+            end += 1
+        keep_end = end if end == last else max(position + 1, end - overlap_words)
+        windows.append((start, end, position, keep_end))
+        position = keep_end
+    return windows
+
+
+def window_texts(text, spans, windows):
+    """הטקסט של כל חלון (מהמילה הראשונה עד האחרונה, עם הרווחים המקוריים)"""
+    return [text[spans[start][0]:spans[end - 1][1]] for start, end, _, _ in windows]
+
+
+def stitch_windows(text, spans, windows, outputs):
+    """
+    מרכיב את הפלט המנוקד של החלונות בחזרה לטקסט אחד
+
+    מכל חלון נלקחות רק המילים שהוא "מחזיק", והרווחים והתווים שבין
+    המילים נלקחים מהטקסט המקורי. מחזיר None אם חלון נכשל או שמספר
+    המילים בפלט שלו לא תואם לקלט.
+    """
+    words = [None] * len(spans)
+    for (start, end, keep_start, keep_end), output in zip(windows, outputs):
+        if output is None:
+            return None
+        output_words = output.split()
+        if len(output_words) != end - start:
+            return None
+        words[keep_start:keep_end] = output_words[keep_start - start:keep_end - start]
+
+    pieces = []
+    previous_end = 0
+    for (word_start, word_end), word in zip(spans, words):
+        pieces.append(text[previous_end:word_start])
+        pieces.append(word)
+        previous_end = word_end
+    pieces.append(text[previous_end:])
+    return ''.join(pieces)
+
+
+def letter_marks(text):
+    """מפרק טקסט מנוקד לרשימת (אות, סימני הניקוד שאחריה)"""
+    letters = []
+    for char in text:
+        if _NIKUD_RE.match(char) and letters:
+            letter, marks = letters[-1]
+            letters[-1] = (letter, marks + char)
+        elif not char.isspace():
+            letters.append((char, ''))
+    return letters
+
+
+def vocalization_agreement(outputs, references):
+    """
+    משווה שתי רשימות של טקסטים מנוקדים
+
+    Returns:
+        מילון עם שיעור ההתאמה ברמת מילה וברמת אות (על אותיות עבריות),
+        ומספר המשפטים הזהים לחלוטין
+    """
+    words_equal = words_total = letters_equal = letters_total = sentences_equal = 0
+    for output, reference in zip(outputs, references):
+        output, reference = output or '', reference or ''
+        sentences_equal += output == reference
+        output_words, reference_words = output.split(), reference.split()
+        words_total += len(reference_words)
+        words_equal += sum(a == b for a, b in zip(output_words, reference_words))
+        reference_letters = [lm for lm in letter_marks(reference) if is_hebrew_letter(lm[0])]
+        output_letters = [lm for lm in letter_marks(output) if is_hebrew_letter(lm[0])]
+        letters_total += len(reference_letters)
+        letters_equal += sum(a == b for a, b in zip(output_letters, reference_letters))
+    return {
+        'sentences': len(references),
+        'sentence_agreement': sentences_equal / len(references) if references else 0.0,
+        'word_agreement': words_equal / words_total if words_total else 0.0,
+        'letter_agreement': letters_equal / letters_total if letters_total else 0.0,
+    }
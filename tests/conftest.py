@@ -0,0 +1,31 @@
+"""
+fixtures משותפים: פייפליין עם המנועים המדומים של nikud_fake_engines,
+בלי השהיות ובלי מודלים אמיתיים
+"""
+
+import pytest
+
+from complete_nikud_pipeline import HebrewNikudPipeline
+from nikud_fake_engines import install_fake_engines
+
+
+@pytest.fixture
+def make_pipeline():
+    """
+    מחזיר פונקציה שבונה פייפליין עם מנועים מדומים; כל הפייפליינים
+    נסגרים בסוף הבדיקה
+    """
+    pipelines = []
+
+    def factory(disagreement_rate=0.1, unclear_rate=0.2, **kwargs):
+        pipeline = HebrewNikudPipeline(**kwargs)
+        pipeline.engines = install_fake_engines(
+            pipeline, latency_scale=0,
+            disagreement_rate=disagreement_rate, unclear_rate=unclear_rate
+        )
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield factory
+    for pipeline in pipelines:
+        pipeline.close()
@@ -0,0 +1,106 @@
+import os
+import threading
+
+import pytest
+
+from complete_nikud_pipeline import HebrewNikudPipeline
+from nikud_abbreviations import AbbreviationIndex, compile_index, load_index
+
+ABBREVIATIONS = {'ב"ה': 'ברוך השם', 'רש"י': 'רבי שלמה יצחקי', "וכו'": 'וכולי'}
+
+
+@pytest.fixture
+def index():
+    return AbbreviationIndex.from_dict(ABBREVIATIONS)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('ב"ה שלום', 'ברוך השם שלום'),
+    ('ב״ה שלום', 'ברוך השם שלום'),
+    ('(ב"ה) שלום', '(ברוך השם) שלום'),
+    ('"רש״י" אמר', '"רבי שלמה יצחקי" אמר'),
+    ('ובב״ה.', 'ובברוך השם.'),
+    ("וכו׳ וכו'", 'וכולי וכולי'),
+    ('בלי קיצורים', 'בלי קיצורים'),
+])
+def test_expand(index, text, expected):
+    assert index.expand(text)[0] == expected
+
+
+def test_mapping_interface(index):
+    assert len(index) == 3
+    assert index['ב"ה'] == 'ברוך השם'
+    assert 'ב"ב' not in index
+    assert index.get('ב"ב', 'x') == 'x'
+
+
+def _write_source(path, abbreviations):
+    path.write_text(f"ABBREVIATIONS = {abbreviations!r}\n", encoding='utf-8')
+
+
+def test_concurrent_compiles_leave_a_valid_index(tmp_path):
+    source = tmp_path / 'abbreviations.py'
+    target = tmp_path / 'abbreviations.idx'
+    _write_source(source, ABBREVIATIONS)
+    errors = []
+
+    def compile_once():
+        try:
+            for _ in range(20):
+                compile_index(source, target)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=compile_once) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+    index = AbbreviationIndex.open(target)
+    assert index['ב"ה'] == 'ברוך השם'
+    index.close()
+
+
+def test_load_index_recompiles_a_stale_index(tmp_path):
+    source = tmp_path / 'abbreviations.py'
+    target = tmp_path / 'abbreviations.idx'
+    _write_source(source, {'ב"ה': 'ברוך השם'})
+    load_index(source, target).close()
+
+    _write_source(source, {'ב"ה': 'בעזרת השם'})
+    os.utime(source, (os.path.getmtime(target) + 10,) * 2)
+    index = load_index(source, target)
+    assert index['ב"ה'] == 'בעזרת השם'
+    index.close()
+
+
+def test_missing_source_and_index(tmp_path):
+    assert load_index(tmp_path / 'missing.py') is None
+
+
+def test_pipeline_expansion_is_opt_in(make_pipeline, index):
+    pipeline = make_pipeline(disagreement_rate=0)
+    pipeline.abbreviations_dict = index
+    assert pipeline.process_many(['ב"ה'])[0].get('abbreviations') is None
+
+    expanding = make_pipeline(disagreement_rate=0, expand_abbreviations=True)
+    expanding.abbreviations_dict = index
+    decision = expanding.process_many(['ב"ה'])[0]
+    assert decision['abbreviations'] == [['ב"ה', 'ברוך השם']]
+
+
+@pytest.mark.parametrize('expand', [False, True])
+def test_load_models_skips_the_dict_unless_expanding(monkeypatch, expand):
+    loaded = []
+    for name in ('dictabert_nikud', 'nakdimon', 'morph_model', 'abbreviations'):
+        monkeypatch.setattr(HebrewNikudPipeline, f'_load_{name}',
+                            lambda self, name=name: loaded.append(name))
+    with HebrewNikudPipeline(expand_abbreviations=expand) as pipeline:
+        pipeline.load_models()
+        assert ('abbreviations' in loaded) == expand
+        assert pipeline.loaded_models()['abbreviations_dict'] == expand
+        pipeline.load_models('abbreviations_dict')
+        assert 'abbreviations' in loaded
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from nikud_batching import plan_batches, token_lengths
+from nikud_fake_engines import FakeDictaBERT, FakeTokenizer, fake_vocalize
+
+
+@pytest.mark.parametrize('max_tokens, max_batch_size', [(64, None), (200, 4), (10_000, 3)])
+def test_plan_covers_every_item_within_budget(max_tokens, max_batch_size):
+    rng = random.Random(max_tokens)
+    lengths = [rng.randint(3, 120) for _ in range(100)]
+    batches = plan_batches(lengths, max_tokens, max_batch_size)
+    assert sorted(index for batch in batches for index in batch) == list(range(len(lengths)))
+    for batch in batches:
+        padded = max(lengths[i] for i in batch) * len(batch)
+        assert padded <= max_tokens or len(batch) == 1
+        assert max_batch_size is None or len(batch) <= max_batch_size
+    # ממוין לפי אורך: אצווה לא מתחילה לפני סוף הקודמת
+    for previous, batch in zip(batches, batches[1:]):
+        assert max(lengths[i] for i in previous) <= min(lengths[i] for i in batch)
+
+
+def test_an_item_over_budget_gets_its_own_batch():
+    assert plan_batches([5, 500, 6], max_tokens=100) == [[0, 2], [1]]
+    assert plan_batches([], max_tokens=100) == []
+
+
+def test_token_lengths_fall_back_to_characters():
+    class _Broken:
+        def __call__(self, texts):
+            raise RuntimeError("no tokenizer")
+
+    assert token_lengths(FakeTokenizer(), ["אב", "גדה"]) == [4, 5]
+    assert token_lengths(_Broken(), ["אב", "גדה"]) == [4, 5]
+
+
+class _RecordingDictaBERT(FakeDictaBERT):
+    def __init__(self):
+        super().__init__(0, 0, 0)
+        self.batches = []
+
+    def predict(self, sentences, tokenizer=None):
+        self.batches.append(list(sentences))
+        return super().predict(sentences, tokenizer)
+
+
+def test_pipeline_batches_by_padded_tokens(make_pipeline):
+    pipeline = make_pipeline(max_batch_tokens=120)
+    model = _RecordingDictaBERT()
+    pipeline.dictabert_nikud = {'tokenizer': FakeTokenizer(), 'model': model}
+    rng = random.Random(1)
+    texts = [' '.join(['שלום'] * rng.randint(1, 12)) for _ in range(30)]
+
+    assert pipeline.nikud_many_with_dictabert(texts, batch_size=8) == [
+        fake_vocalize(text) for text in texts
+    ]
+    for batch in model.batches:
+        assert len(batch) <= 8
+        assert max(len(text) + 2 for text in batch) * len(batch) <= 120 or len(batch) == 1
+    assert sum(len(batch) for batch in model.batches) == len(texts)
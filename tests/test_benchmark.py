@@ -0,0 +1,49 @@
+import os
+import time
+
+import pytest
+
+import benchmark_nikud_pipeline as benchmark
+from benchmark_nikud_pipeline import BenchmarkFailed, build_corpus, run_isolated
+
+_CORPUS = {'size': 40, 'seed': 1, 'repeat_rate': 0.2}
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(benchmark, '_POLL_SECONDS', 0.05)
+
+
+def test_build_corpus_cycles_a_file(tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text("שורה ראשונה\n\nשורה שנייה\n", encoding='utf-8')
+    assert build_corpus(5, str(path)) == ["שורה ראשונה", "שורה שנייה"] * 2 + ["שורה ראשונה"]
+    assert build_corpus(30, seed=3) == build_corpus(30, seed=3)
+
+
+def test_run_isolated_returns_the_child_result():
+    result = run_isolated(_CORPUS, 8, 1, False, latency_scale=0)
+    assert result['sentences'] == 40
+    assert result['batch_size'] == 8
+    assert result['sentences_per_sec'] > 0
+
+
+def test_run_isolated_reports_a_child_exception(tmp_path):
+    with pytest.raises(BenchmarkFailed, match='FileNotFoundError'):
+        run_isolated({'size': 10, 'corpus_path': str(tmp_path / 'missing.txt')},
+                     8, 1, False, latency_scale=0)
+
+
+def test_run_isolated_reports_a_crashed_child(monkeypatch):
+    # כמו OOM killer: התהליך מת בלי להספיק לכתוב תוצאה
+    monkeypatch.setattr(benchmark, 'run_configuration', lambda *a, **k: os._exit(9))
+    with pytest.raises(BenchmarkFailed, match='exitcode 9'):
+        run_isolated(_CORPUS, 8, 1, False)
+
+
+def test_run_isolated_stops_a_stuck_child(monkeypatch):
+    monkeypatch.setattr(benchmark, 'run_configuration', lambda *a, **k: time.sleep(60))
+    start = time.monotonic()
+    with pytest.raises(BenchmarkFailed, match='0.3'):
+        run_isolated(_CORPUS, 8, 1, False, timeout=0.3)
+    assert time.monotonic() - start < 5
@@ -0,0 +1,61 @@
+from complete_nikud_pipeline import is_degraded
+from nikud_fake_engines import fake_vocalize
+
+
+class _FlakyNakdimon:
+    """Nakdimon שנכשל בקריאות הראשונות ואחר כך עובד"""
+
+    def __init__(self, engine, failures):
+        self.engine = engine
+        self.failures = failures
+
+    def nakdan(self, text):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("transient failure")
+        return self.engine.nakdan(text)
+
+
+def test_cache_hits_skip_the_engines(make_pipeline, tmp_path):
+    pipeline = make_pipeline(disagreement_rate=0)
+    pipeline.enable_cache(str(tmp_path / 'cache.db'))
+    texts = ["שלום עולם", "ברוך הבא"]
+    first = pipeline.process_many(texts)
+    calls = pipeline.engines['dictabert_nikud'].calls
+    assert pipeline.process_many(texts) == first
+    assert pipeline.engines['dictabert_nikud'].calls == calls
+
+
+def test_cache_is_shared_through_the_db(make_pipeline, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = make_pipeline(disagreement_rate=0)
+    writer.enable_cache(path)
+    writer.process_many(["שלום עולם"])
+    writer.cache.close()
+
+    reader = make_pipeline(disagreement_rate=0)
+    reader.enable_cache(path)
+    assert reader.process_many(["שלום עולם"])[0]['text'] == fake_vocalize("שלום עולם")
+    assert reader.engines['dictabert_nikud'].calls == 0
+
+
+def test_fingerprint_covers_decision_parameters(make_pipeline):
+    base = make_pipeline().model_fingerprint()
+    assert make_pipeline(morph_context=1).model_fingerprint() != base
+    assert make_pipeline(window_overlap=2).model_fingerprint() != base
+    assert make_pipeline(speculative_morph=True).model_fingerprint() != base
+
+
+def test_degraded_decisions_are_not_cached(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0)
+    pipeline.nakdimon = _FlakyNakdimon(pipeline.engines['nakdimon'], failures=1)
+    pipeline.enable_cache()
+
+    degraded = pipeline.process_many(["שלום עולם"])[0]
+    assert is_degraded(degraded)
+    assert pipeline.stats.counters['cache.degraded'] == 1
+
+    recovered = pipeline.process_many(["שלום עולם"])[0]
+    assert recovered['source'] == 'Both (identical)'
+    assert not is_degraded(recovered)
+    assert pipeline.process_many(["שלום עולם"])[0] == recovered
@@ -0,0 +1,133 @@
+import io
+import json
+
+import pytest
+
+from nikud_checkpoint import CorpusJournal, TrackedInput, journal_path, read_journal
+from nikud_corpus import run_corpus
+
+LINES = [f"שורה מספר {i} בספר" if i % 7 else "" for i in range(1, 41)]
+
+
+class _Crashing:
+    """process_stream שנקטע אחרי after תוצאות - כמו תהליך שנהרג"""
+
+    def __init__(self, pipeline, after):
+        self.pipeline = pipeline
+        self.after = after
+
+    def process_stream(self, lines, batch_size):
+        for count, result in enumerate(self.pipeline.process_stream(lines, batch_size)):
+            if count == self.after:
+                raise KeyboardInterrupt
+            yield result
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text('\n'.join(LINES) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def _run(pipeline, corpus, output_path, resume=False):
+    journal, output = CorpusJournal.open(corpus, output_path, resume=resume, interval=0)
+    if journal is None:
+        return None
+    try:
+        return run_corpus(pipeline, journal.source, output, batch_size=4,
+                          log=io.StringIO(), journal=journal)
+    finally:
+        output.close()
+        journal.close()
+
+
+def _reference(make_pipeline, corpus):
+    expected = io.StringIO()
+    with open(corpus, encoding='utf-8') as lines:
+        run_corpus(make_pipeline(), lines, expected, batch_size=4, log=io.StringIO())
+    return expected.getvalue()
+
+
+def test_tracked_input_offsets(corpus):
+    source = TrackedInput(corpus)
+    lines = list(source)
+    offset = source.offset_after(2)
+    assert offset == len(lines[0].encode()) + len(lines[1].encode())
+    # שורות שכבר נשכחו לא מחזירות היסט
+    assert source.offset_after(1) is None
+    source.close()
+
+    resumed = TrackedInput(corpus, offset, first_line=3)
+    assert list(resumed) == lines[2:]
+    assert resumed.offset_after(3) == offset + len(lines[2].encode())
+    resumed.close()
+
+
+@pytest.mark.parametrize('crash_after', [0, 3, 9, 17])
+def test_resume_after_a_crash_matches_a_clean_run(make_pipeline, tmp_path, corpus, crash_after):
+    output_path = str(tmp_path / 'out.jsonl')
+    with pytest.raises(KeyboardInterrupt):
+        _run(_Crashing(make_pipeline(), crash_after), corpus, output_path)
+    # כתיבה שהתחילה אחרי נקודת השמירה האחרונה ולא הסתיימה
+    with open(output_path, 'a', encoding='utf-8') as f:
+        f.write('{"line": 99, "text": "קטוע')
+
+    _run(make_pipeline(), corpus, output_path, resume=True)
+    with open(output_path, encoding='utf-8') as f:
+        assert f.read() == _reference(make_pipeline, corpus)
+    header, state = read_journal(journal_path(output_path))
+    assert state['done'] and state['records'] == sum(1 for line in LINES if line)
+
+
+def test_resuming_a_finished_run_does_nothing(make_pipeline, tmp_path, corpus):
+    output_path = str(tmp_path / 'out.jsonl')
+    _run(make_pipeline(), corpus, output_path)
+    pipeline = make_pipeline()
+    assert _run(pipeline, corpus, output_path, resume=True) is None
+    assert pipeline.engines['dictabert_nikud'].calls == 0
+
+
+def test_a_torn_journal_line_is_ignored(make_pipeline, tmp_path, corpus):
+    output_path = str(tmp_path / 'out.jsonl')
+    with pytest.raises(KeyboardInterrupt):
+        _run(_Crashing(make_pipeline(), 10), corpus, output_path)
+    path = journal_path(output_path)
+    _, before = read_journal(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"batch": 9')
+    assert read_journal(path)[1] == before
+
+    _run(make_pipeline(), corpus, output_path, resume=True)
+    with open(output_path, encoding='utf-8') as f:
+        assert f.read() == _reference(make_pipeline, corpus)
+
+
+def test_resume_refuses_a_changed_input(make_pipeline, tmp_path, corpus):
+    output_path = str(tmp_path / 'out.jsonl')
+    with pytest.raises(KeyboardInterrupt):
+        _run(_Crashing(make_pipeline(), 10), corpus, output_path)
+    with open(corpus, 'a', encoding='utf-8') as f:
+        f.write("שורה חדשה\n")
+    with pytest.raises(ValueError):
+        CorpusJournal.open(corpus, output_path, resume=True)
+
+
+def test_resume_refuses_a_truncated_output(make_pipeline, tmp_path, corpus):
+    output_path = str(tmp_path / 'out.jsonl')
+    with pytest.raises(KeyboardInterrupt):
+        _run(_Crashing(make_pipeline(), 10), corpus, output_path)
+    with open(output_path, 'w', encoding='utf-8'):
+        pass
+    with pytest.raises(ValueError):
+        CorpusJournal.open(corpus, output_path, resume=True)
+
+
+def test_records_keep_their_input_line_numbers(make_pipeline, tmp_path, corpus):
+    output_path = str(tmp_path / 'out.jsonl')
+    with pytest.raises(KeyboardInterrupt):
+        _run(_Crashing(make_pipeline(), 10), corpus, output_path)
+    _run(make_pipeline(), corpus, output_path, resume=True)
+    with open(output_path, encoding='utf-8') as f:
+        numbers = [json.loads(line)['line'] for line in f]
+    assert numbers == [number for number, line in enumerate(LINES, start=1) if line]
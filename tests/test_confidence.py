@@ -0,0 +1,84 @@
+from nikud_confidence import calibration_report, decoding_mismatches, low_margin_words, min_margin
+from nikud_fake_engines import FakeTokenizer, fake_vocalize
+from nikud_text import remove_nikud
+
+TEXTS = [
+    "ברוך אתה ה אלהינו מלך העולם",
+    "שמע ישראל ה אלהינו ה אחד",
+    "אמר רבי יהודה תנו רבנן",
+    "מאי טעמא דכתיב",
+    "והיו הדברים האלה אשר אנכי מצוך היום על לבבך",
+    "שלום",
+]
+
+
+def _split(decisions):
+    confident = [i for i, d in enumerate(decisions) if d['source'] == 'DictaBERT (confident)']
+    return confident, [i for i in range(len(decisions)) if i not in confident]
+
+
+def test_margin_helpers():
+    assert min_margin([]) == 1.0
+    assert min_margin([0.9, 0.3, 1.0]) == 0.3
+    # "אב גד הו": המילה השנייה (תווים 3-4) מתחת לסף
+    margins = [1.0, 1.0, 1.0, 0.2, 1.0, 1.0, 1.0, 1.0]
+    assert low_margin_words("אַב גד הו", margins, 0.5) == [1]
+
+
+def test_confident_sentences_skip_nakdimon(make_pipeline):
+    ungated = make_pipeline().process_many(TEXTS)
+    pipeline = make_pipeline(skip_margin=0.9)
+    decisions = pipeline.process_many(TEXTS)
+    confident, escalated = _split(decisions)
+    assert confident and escalated
+
+    for i in confident:
+        assert decisions[i]['text'] == fake_vocalize(TEXTS[i])
+        assert decisions[i]['min_margin'] >= 0.9
+        # הדילוג נכון רק כשהמנועים ממילא הסכימו
+        assert ungated[i]['source'] == 'Both (identical)'
+    for i in escalated:
+        assert decisions[i].pop('low_margin_words')
+        assert decisions[i] == ungated[i]
+
+    counters = pipeline.stats.counters
+    assert (counters['gate.skipped'], counters['gate.escalated']) == (len(confident), len(escalated))
+    # Nakdimon רץ רק על המשפטים שהוסלמו, DictaBERT פעם אחת לכל אצווה
+    assert pipeline.engines['nakdimon'].calls == 1
+    assert pipeline.engines['dictabert_nikud'].calls == 1
+
+
+def test_a_threshold_above_every_margin_escalates_everything(make_pipeline):
+    ungated = make_pipeline().process_many(TEXTS)
+    decisions = make_pipeline(skip_margin=1.01).process_many(TEXTS)
+    for text, decision, expected in zip(TEXTS, decisions, ungated):
+        assert decision.pop('low_margin_words') == list(range(len(text.split())))
+        assert decision == expected
+
+
+def test_windowed_texts_always_escalate(make_pipeline):
+    pipeline = make_pipeline(skip_margin=0.0)
+    model = pipeline.engines['dictabert_nikud']
+    pipeline.dictabert_nikud = {'tokenizer': FakeTokenizer(model_max_length=20), 'model': model}
+    decisions = pipeline.process_many([TEXTS[4], TEXTS[5]])
+    assert decisions[0]['source'] != 'DictaBERT (confident)'
+    assert 'low_margin_words' not in decisions[0]
+    assert decisions[1]['source'] == 'DictaBERT (confident)'
+
+
+def test_calibration_report(make_pipeline):
+    pipeline = make_pipeline()
+    gold = [fake_vocalize(text) for text in TEXTS]
+    rows = calibration_report(pipeline, gold, thresholds=(0.3, 0.9, 1.01))
+    assert [row['threshold'] for row in rows] == [0.3, 0.9, 1.01]
+    assert rows[0]['skip_rate'] == 1.0
+    assert 0 < rows[1]['skip_rate'] < 1
+    assert rows[2]['skip_rate'] == 0.0
+    assert rows[1]['skipped_engine_agreement'] == 1.0
+    assert rows[1]['skipped_word_accuracy'] == 1.0
+    assert rows[0]['gated_word_accuracy'] == 1.0
+
+
+def test_decoding_matches_predict(make_pipeline):
+    pipeline = make_pipeline()
+    assert decoding_mismatches(pipeline, [remove_nikud(text) for text in TEXTS], 4) == []
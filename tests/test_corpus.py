@@ -0,0 +1,47 @@
+import io
+import json
+
+from nikud_corpus import run_corpus
+from nikud_fake_engines import fake_vocalize
+
+
+class _Output(io.StringIO):
+    """פלט שסופר כמה פעמים נעשה flush"""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+def test_records_keep_line_numbers_and_order(make_pipeline):
+    lines = ["שמע ישראל", "", "ברוך אתה", "   ", "מאי טעמא", "שלום"]
+    output = _Output()
+    assert run_corpus(make_pipeline(disagreement_rate=0), lines, output,
+                      batch_size=2, log=io.StringIO()) == 4
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [(record['line'], record['input']) for record in records] == [
+        (1, "שמע ישראל"), (3, "ברוך אתה"), (5, "מאי טעמא"), (6, "שלום"),
+    ]
+    assert [record['text'] for record in records] == [fake_vocalize(r['input']) for r in records]
+
+
+def test_output_is_written_while_input_streams(make_pipeline):
+    output = _Output()
+    seen = []
+
+    def lines():
+        for i in range(6):
+            # כשמגיעים לשורה 5, שתי האצוות הראשונות כבר בפלט
+            if i == 4:
+                seen.append(len(output.getvalue().splitlines()))
+            yield f"שורה מספר {i}"
+
+    run_corpus(make_pipeline(), lines(), output, batch_size=2, log=io.StringIO())
+    assert seen and seen[0] >= 2
+    assert output.flushes >= 3
+    assert len(output.getvalue().splitlines()) == 6
@@ -0,0 +1,64 @@
+import io
+import json
+
+from nikud_corpus import Deduplicator, run_corpus
+from nikud_text import normalize_text
+
+UNIQUE = [
+    "ברוך אתה ה אלהינו מלך העולם",
+    "שמע ישראל ה אלהינו ה אחד",
+    "אמר רבי יהודה תנו רבנן",
+    "מאי טעמא דכתיב",
+]
+# חזרות, גם ברווחים שונים ובשורות רחוקות זו מזו
+LINES = UNIQUE + [
+    "", UNIQUE[0], "  שמע   ישראל ה אלהינו ה אחד ", UNIQUE[3], UNIQUE[0], "", UNIQUE[2],
+]
+
+
+def _run(pipeline, dedupe=None, lines=LINES):
+    output = io.StringIO()
+    run_corpus(pipeline, lines, output, batch_size=3, log=io.StringIO(), dedupe=dedupe)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def _expected(make_pipeline):
+    """ריצה מלאה על הנוסח המנורמל - מה שהמודלים רואים עם dedupe - עם הקלט המקורי"""
+    records = _run(make_pipeline(), lines=[normalize_text(line) for line in LINES])
+    originals = [line for line in LINES if line.strip()]
+    return [dict(record, input=text) for record, text in zip(records, originals)]
+
+
+def test_dedupe_matches_a_full_run(make_pipeline):
+    expected = _expected(make_pipeline)
+    dedupe = Deduplicator(block_size=100)
+    pipeline = make_pipeline()
+    records = _run(pipeline, dedupe)
+    assert records == expected
+    assert dedupe.stats() == {'lines': 9, 'model_inputs': 4, 'dedupe_ratio': round(5 / 9, 4),
+                              'index_entries': 4}
+    assert pipeline.engines['dictabert_nikud'].calls == 2
+
+
+def test_repeats_across_blocks_come_from_the_index(make_pipeline):
+    dedupe = Deduplicator(block_size=2)
+    assert _run(make_pipeline(), dedupe) == _expected(make_pipeline)
+    assert dedupe.inferred == len(UNIQUE)
+
+
+def test_evicted_entries_are_recomputed(make_pipeline):
+    dedupe = Deduplicator(block_size=2, memory_bytes=1)
+    assert _run(make_pipeline(), dedupe) == _expected(make_pipeline)
+    assert dedupe.inferred > len(UNIQUE)
+    assert len(dedupe.index) == 0
+
+
+def test_failed_decisions_are_not_indexed(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.dictabert_nikud = None
+    pipeline.nakdimon = None
+    dedupe = Deduplicator(block_size=2)
+    records = _run(pipeline, dedupe)
+    assert all(record['text'] is None for record in records)
+    assert len(dedupe.index) == 0
+    assert dedupe.inferred > len(UNIQUE)
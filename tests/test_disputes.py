@@ -0,0 +1,70 @@
+from nikud_fake_engines import FakeMorph
+from nikud_text import context_spans, disputed_words
+
+SENTENCE = "והיו הדברים האלה אשר אנכי מצוך היום על לבבך ושננתם לבניך ודברת בם בשבתך בביתך"
+
+
+class _RecordingMorph(FakeMorph):
+    def __init__(self, unclear_rate=0.2):
+        super().__init__(0, 0, unclear_rate)
+        self.inputs = []
+
+    def predict(self, sentences, tokenizer=None):
+        self.inputs.extend(sentences)
+        return super().predict(sentences, tokenizer)
+
+
+def test_disputed_words_aligns_by_letters():
+    assert disputed_words("שָׁלוֹם עוֹלָם", "שָׁלוֹם עָלַם") == [(1, "עוֹלָם", "עָלַם")]
+    assert disputed_words("שָׁלוֹם עוֹלָם", "שָׁלוֹם עוֹלָם") == []
+    # מילה שחסרה בפלט השני נחשבת במחלוקת
+    assert disputed_words("אָב גַּד הֵא", "אָב הֵא") == [(1, "גַּד", None)]
+
+
+def test_context_spans_merge():
+    assert context_spans([1, 7], 10, 1) == [(0, 3), (6, 9)]
+    assert context_spans([2, 4], 10, 1) == [(1, 6)]
+    assert context_spans([0, 9], 10, 2) == [(0, 3), (7, 10)]
+
+
+def _disputed_pipeline(make_pipeline, **kwargs):
+    pipeline = make_pipeline(disagreement_rate=0.2, **kwargs)
+    morph = _RecordingMorph()
+    pipeline.morph_model = {'tokenizer': pipeline.morph_model['tokenizer'], 'model': morph}
+    return pipeline, morph
+
+
+def test_morphology_runs_only_around_disputed_words(make_pipeline):
+    pipeline, morph = _disputed_pipeline(make_pipeline, morph_context=1)
+    decision = pipeline.process(SENTENCE)
+    disputed = [word['index'] for word in decision['disputed_words']]
+    assert disputed
+
+    words = SENTENCE.split()
+    spans = context_spans(disputed, len(words), 1)
+    assert morph.inputs == [' '.join(words[start:end]) for start, end in spans]
+    assert sum(len(text.split()) for text in morph.inputs) < len(words)
+
+    for word in decision['disputed_words']:
+        assert word['dictabert'] != word['nakdimon']
+        assert word['requires_review'] == (word['pos'] is None)
+    assert decision.get('requires_review', False) == any(
+        word['requires_review'] for word in decision['disputed_words']
+    )
+
+
+def test_span_and_whole_sentence_morphology_agree(make_pipeline):
+    spans, _ = _disputed_pipeline(make_pipeline)
+    whole, morph = _disputed_pipeline(make_pipeline, workers=3, speculative_morph=True)
+    texts = [SENTENCE, "שמע ישראל ה אלהינו ה אחד", "ברוך אתה ה אלהינו מלך העולם"]
+    assert whole.process_many(texts) == spans.process_many(texts)
+    assert SENTENCE in morph.inputs
+
+
+def test_without_morphology_disputes_need_review(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0.2)
+    pipeline.morph_model = None
+    decision = pipeline.process(SENTENCE)
+    assert decision['source'] == 'DictaBERT (no morph)'
+    assert decision['requires_review']
+    assert decision['disputed_words']
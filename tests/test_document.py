@@ -0,0 +1,148 @@
+import re
+
+import pytest
+
+from nikud_document import NikudDocument, slice_decision
+from nikud_fake_engines import fake_vocalize
+
+PARAGRAPHS = [
+    "ברוך אתה ה אלהינו מלך העולם. אשר קדשנו במצותיו. וצונו על נטילת ידים.",
+    "שמע ישראל ה אלהינו ה אחד. ואהבת את ה אלהיך בכל לבבך.",
+    "אמר רבי יהודה תנו רבנן מאי טעמא דכתיב.",
+]
+DOCUMENT = '\n'.join(PARAGRAPHS)
+
+
+class _Recording:
+    """פייפליין שזוכר אילו טקסטים נשלחו למודלים"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.inputs = []
+
+    def process_many(self, texts, batch_size):
+        self.inputs.extend(texts)
+        return self.pipeline.process_many(texts, batch_size)
+
+
+def _vocalize_words(text):
+    return re.sub(r'\S+', lambda match: fake_vocalize(match.group()), text)
+
+
+@pytest.fixture
+def recording(make_pipeline):
+    return _Recording(make_pipeline(disagreement_rate=0))
+
+
+def test_first_update_vocalizes_everything(recording):
+    document = NikudDocument(recording)
+    summary = document.update(DOCUMENT)
+    assert summary['sentences'] == summary['sentences_rerun'] == 6
+    assert document.vocalized() == _vocalize_words(DOCUMENT)
+    # משפטים רצופים בפסקה רצים כחלון אחד
+    assert recording.inputs == PARAGRAPHS
+
+
+def test_editing_a_sentence_reruns_only_it_with_context(recording):
+    document = NikudDocument(recording, context_sentences=1)
+    document.update(DOCUMENT)
+    recording.inputs.clear()
+
+    edited = DOCUMENT.replace("אשר קדשנו במצותיו.", "אשר בחר בנו מכל העמים.")
+    summary = document.update(edited)
+    assert summary['paragraphs_changed'] == 1
+    assert (summary['sentences_rerun'], summary['sentences_reused']) == (1, 5)
+    assert recording.inputs == [
+        "ברוך אתה ה אלהינו מלך העולם. אשר בחר בנו מכל העמים. וצונו על נטילת ידים."
+    ]
+    assert document.vocalized() == _vocalize_words(edited)
+
+
+def test_inserted_paragraph_leaves_the_others_alone(recording):
+    document = NikudDocument(recording)
+    document.update(DOCUMENT)
+    recording.inputs.clear()
+
+    inserted = '\n'.join([PARAGRAPHS[0], "פסקה חדשה לגמרי.", "", PARAGRAPHS[1], PARAGRAPHS[2]])
+    summary = document.update(inserted)
+    assert (summary['paragraphs_changed'], summary['sentences_rerun']) == (2, 1)
+    assert recording.inputs == ["פסקה חדשה לגמרי."]
+    assert document.vocalized() == _vocalize_words(inserted)
+
+
+def test_whitespace_only_edits_reuse_decisions(recording):
+    document = NikudDocument(recording)
+    document.update(DOCUMENT)
+    recording.inputs.clear()
+    edited = DOCUMENT.replace("אשר קדשנו במצותיו.", "אשר  קדשנו   במצותיו.")
+    assert document.update(edited)['sentences_rerun'] == 0
+    assert recording.inputs == []
+    assert document.vocalized().split() == _vocalize_words(DOCUMENT).split()
+
+
+def test_save_and_load(recording, tmp_path):
+    document = NikudDocument(recording, context_sentences=0)
+    document.update(DOCUMENT)
+    path = tmp_path / 'doc.nikud.json'
+    document.save(str(path))
+
+    loaded = NikudDocument.load(str(path), recording)
+    assert loaded.context_sentences == 0
+    assert loaded.vocalized() == document.vocalized()
+    assert list(loaded.sentences()) == list(document.sentences())
+    recording.inputs.clear()
+    loaded.update(DOCUMENT + "\nעוד פסקה.")
+    assert recording.inputs == ["עוד פסקה."]
+
+
+def test_failed_sentences_are_retried(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0)
+    engine = pipeline.dictabert_nikud
+    pipeline.dictabert_nikud = None
+    pipeline.nakdimon = None
+    document = NikudDocument(pipeline)
+    document.update(DOCUMENT)
+    assert document.vocalized() == DOCUMENT
+
+    pipeline.dictabert_nikud = engine
+    assert document.update(DOCUMENT)['sentences_rerun'] == 0
+    # update בלי שינוי לא נוגע בפסקאות; עריכה בפסקה מריצה שוב גם את מה שנכשל בה
+    edited = DOCUMENT.replace("שמע ישראל", "שמע  ישראל")
+    assert document.update(edited)['sentences_rerun'] == 2
+
+
+def _word(index, review):
+    return {'index': index, 'dictabert': 'x', 'nakdimon': 'y', 'pos': None,
+            'confidence': 'medium' if review else 'high', 'requires_review': review}
+
+
+def test_slice_decision_rebuilds_the_sentence_decision():
+    # הכרעה על החלון "אא בב. גג דד הה."
+    decision = {
+        'text': "אַא בַב. גַג דַד הַה.",
+        'source': 'DictaBERT (uncertain)',
+        'confidence': 'medium',
+        'notes': '1 מילים לא ברורות',
+        'alternative': "אָא בָב. גָג דָד הָה.",
+        'disputed_words': [_word(1, False), _word(3, True)],
+        'requires_review': True,
+        'min_margin': 0.5,
+    }
+    first = slice_decision(decision, "אא בב.", 0, 2, 5)
+    assert first['source'] == 'DictaBERT (with morph)'
+    assert first['text'] == "אַא בַב."
+    assert [word['index'] for word in first['disputed_words']] == [1]
+
+    second = slice_decision(decision, "גג  דד הה.", 2, 3, 5)
+    assert second['source'] == 'DictaBERT (uncertain)'
+    assert second['text'] == "גַג  דַד הַה."
+    assert second['alternative'] == "גָג  דָד הָה."
+    assert [word['index'] for word in second['disputed_words']] == [1]
+    assert second['requires_review']
+    assert 'min_margin' not in second
+
+    agreed = slice_decision(
+        dict(decision, disputed_words=[_word(3, True)]), "אא בב.", 0, 2, 5
+    )
+    assert agreed['source'] == 'Both (identical)' and 'alternative' not in agreed
+    assert slice_decision(dict(decision, text="אַא"), "אא בב.", 0, 2, 5) is None
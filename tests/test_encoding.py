@@ -0,0 +1,69 @@
+from nikud_batching import token_lengths
+from nikud_cache import MemoryBudgetLRU
+from nikud_encoding import EncodingCache, tokenizer_fingerprint
+from nikud_fake_engines import FakeMorph, FakeTokenizer
+
+
+class _CountingTokenizer(FakeTokenizer):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return super().__call__(texts)
+
+
+class _RecordingMorph(FakeMorph):
+    def __init__(self):
+        super().__init__(0, 0, 0.2)
+        self.inputs = []
+
+    def predict(self, sentences, tokenizer=None):
+        self.inputs.extend(sentences)
+        return super().predict(sentences, tokenizer)
+
+
+def test_lru_evicts_by_bytes():
+    lru = MemoryBudgetLRU(10, lambda key, value: len(value))
+    lru.put('a', 'xxxx')
+    lru.put('b', 'xxxx')
+    assert lru.get('a') == 'xxxx'
+    lru.put('c', 'xxxx')
+    # b הכי פחות בשימוש
+    assert (lru.get('b'), lru.get('a'), lru.get('c')) == (None, 'xxxx', 'xxxx')
+    lru.put('huge', 'x' * 11)
+    assert lru.get('huge') is None and lru.nbytes == 8
+    assert lru.stats()['entries'] == 2
+
+
+def test_each_text_is_encoded_once_per_tokenizer():
+    cache = EncodingCache()
+    tokenizer = _CountingTokenizer()
+    texts = ["שלום", "עולם", "שלום"]
+    first = token_lengths(tokenizer, texts, cache)
+    assert token_lengths(tokenizer, texts, cache) == first == [6, 6, 6]
+    assert tokenizer.texts == ["שלום", "עולם"]
+
+    other = _CountingTokenizer()
+    other.name_or_path = 'another/model'
+    token_lengths(other, texts, cache)
+    assert other.texts == ["שלום", "עולם"]
+    assert tokenizer_fingerprint(other) != tokenizer_fingerprint(tokenizer)
+
+
+def test_pipeline_reuses_encodings_and_morphology(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0.3)
+    tokenizer = _CountingTokenizer()
+    pipeline.dictabert_nikud = dict(pipeline.dictabert_nikud, tokenizer=tokenizer)
+    morph = _RecordingMorph()
+    pipeline.morph_model = {'tokenizer': FakeTokenizer(), 'model': morph}
+    texts = ["והיו הדברים האלה אשר אנכי מצוך היום", "שמע ישראל ה אלהינו ה אחד"]
+
+    first = pipeline.process_many(texts)
+    analyzed = list(morph.inputs)
+    assert analyzed
+    assert pipeline.process_many(texts) == first
+    assert tokenizer.texts == texts
+    assert morph.inputs == analyzed
+    assert pipeline.stats.summary()['morph_cache']['cache_hits'] >= len(analyzed)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from nikud_fake_engines import fake_vocalize
+from nikud_interactive import InteractiveNikud, cursor_window
+
+_TEXT = "אחת שתיים שלוש ארבע חמש שש שבע שמונה תשע עשר"
+
+
+class _Updates:
+    def __init__(self):
+        self.results = []
+        self.arrived = threading.Event()
+
+    def __call__(self, result):
+        self.results.append(result)
+        self.arrived.set()
+
+
+def test_cursor_window():
+    start, end = cursor_window(_TEXT, _TEXT.index("חמש"), window_words=1)
+    assert _TEXT[start:end] == "ארבע חמש שש"
+    assert cursor_window("   ", 2) == (2, 2)
+
+
+def test_edit_returns_dictabert_and_refines_later(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0, unclear_rate=0)
+    updates = _Updates()
+    with InteractiveNikud(pipeline, on_update=updates, window_words=2,
+                          refine_delay_ms=20) as session:
+        result = session.edit(_TEXT, 0)
+        assert result['final'] is False
+        assert result['text'] == fake_vocalize(_TEXT[result['start']:result['end']])
+        assert updates.arrived.wait(5)
+    final = updates.results[0]
+    assert final['final'] is True
+    assert final['generation'] == result['generation']
+
+
+def test_burst_of_edits_refines_only_the_last(make_pipeline):
+    pipeline = make_pipeline()
+    updates = _Updates()
+    with InteractiveNikud(pipeline, on_update=updates, refine_delay_ms=100) as session:
+        for cursor in range(0, 20, 4):
+            last = session.edit(_TEXT, cursor)
+            time.sleep(0.01)
+        assert updates.arrived.wait(5)
+        time.sleep(0.2)
+    assert [result['generation'] for result in updates.results] == [last['generation']]
+    assert pipeline.engines['nakdimon'].calls == 1
+
+
+def test_waiting_refine_does_not_hold_the_worker(make_pipeline):
+    pipeline = make_pipeline()
+    updates = _Updates()
+    session = InteractiveNikud(pipeline, on_update=updates, refine_delay_ms=5000)
+    session.edit(_TEXT, 0)
+    session.edit(_TEXT, 10)
+    # ההמתנה היא בטיימר שבוטל - close לא מחכה ל-refine_delay
+    start = time.monotonic()
+    session.close()
+    assert time.monotonic() - start < 1
+    assert updates.results == []
+    assert pipeline.engines['nakdimon'].calls == 0
@@ -0,0 +1,88 @@
+from nikud_fake_engines import fake_vocalize
+from nikud_lexicon import Lexicon, LexiconBuilder, lexicon_decision
+
+
+def _agreed(plain):
+    return {'text': fake_vocalize(plain), 'source': 'Both (identical)', 'confidence': 'very_high'}
+
+
+def _build(sentences, **kwargs):
+    builder = LexiconBuilder(**{'max_phrase_words': 4, 'min_count': 1, **kwargs})
+    for sentence in sentences:
+        builder.add(_agreed(sentence))
+    return builder, builder.build()
+
+
+def test_phrase_only_keys_are_not_whole_sentences():
+    _, lexicon = _build(["שלום עליכם ברוך הבא", "אמר רבי יהודה שלום"])
+    for text in ("שלום עליכם", "שלום"):
+        vocalized, num_words, whole = lexicon.vocalize(text)
+        assert vocalized == fake_vocalize(text)
+        assert num_words == len(text.split())
+        assert not whole
+        assert lexicon_decision(vocalized, whole)['confidence'] == 'high'
+
+
+def test_whole_sentence_match_is_very_high():
+    _, lexicon = _build(["שלום עליכם ברוך הבא"])
+    vocalized, _, whole = lexicon.vocalize("שלום  עליכם ברוך הבא")
+    assert whole
+    assert vocalized == fake_vocalize("שלום  עליכם ברוך הבא")
+    assert lexicon_decision(vocalized, whole)['confidence'] == 'very_high'
+
+
+def test_uncovered_text_is_not_vocalized():
+    _, lexicon = _build(["שלום עליכם"])
+    assert lexicon.vocalize("שלום לכם") is None
+    assert lexicon.vocalize("   ") is None
+
+
+def test_only_agreement_enters_the_lexicon():
+    builder = LexiconBuilder(min_count=1)
+    builder.add({'text': fake_vocalize("שלום"), 'source': 'DictaBERT (with morph)',
+                 'confidence': 'high'})
+    builder.add({'text': fake_vocalize("עולם"), 'source': 'Lexicon', 'confidence': 'very_high'})
+    assert len(builder.build()) == 0
+    assert builder.decisions == 2 and builder.agreed == 0
+
+
+def test_conflicting_vocalizations_are_dropped():
+    builder = LexiconBuilder(min_count=1)
+    builder.add(_agreed("שלום"))
+    builder.add({'text': 'שָׁלוֹם', 'source': 'Both (identical)'})
+    builder.add(_agreed("שלום"))
+    assert builder.build().vocalize("שלום") is None
+
+
+def test_min_count():
+    builder, lexicon = _build(["שלום עולם", "שלום"], min_count=2)
+    assert lexicon.vocalize("שלום") is not None
+    assert lexicon.vocalize("עולם") is None
+
+
+def test_builder_memory_is_capped():
+    sentences = [f"מילה{i} אחרת{i}" for i in range(200)] + ["שלום"] * 5
+    builder, lexicon = _build(sentences, min_count=3, max_keys=50)
+    assert builder.pruned > 0
+    assert len(builder._phrases._counts) <= 50
+    assert lexicon.vocalize("שלום")[2]
+
+
+def test_save_and_load(tmp_path):
+    _, lexicon = _build(["שלום עליכם ברוך הבא"])
+    path = tmp_path / 'lexicon.json'
+    lexicon.save(path)
+    loaded = Lexicon.load(path)
+    assert loaded.entries == lexicon.entries
+    assert loaded.sentences == lexicon.sentences
+    assert loaded.vocalize("שלום עליכם ברוך הבא")[2]
+
+
+def test_pipeline_skips_engines_for_covered_texts(make_pipeline):
+    _, lexicon = _build(["שלום עליכם ברוך הבא"])
+    pipeline = make_pipeline(lexicon=lexicon)
+    decisions = pipeline.process_many(["שלום עליכם ברוך הבא", "שלום עליכם", "משהו חדש"])
+    assert [d['source'] for d in decisions[:2]] == ['Lexicon', 'Lexicon']
+    assert [d['confidence'] for d in decisions[:2]] == ['very_high', 'high']
+    assert decisions[2]['source'] != 'Lexicon'
+    assert pipeline.engines['nakdimon'].calls == 1
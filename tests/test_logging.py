@@ -0,0 +1,100 @@
+import io
+import json
+import logging
+
+import pytest
+
+from nikud_fake_engines import FakeDictaBERT
+from nikud_logging import ROOT_LOGGER, RateLimitFilter, configure_logging, get_logger, log_event
+
+
+class _BrokenDictaBERT(FakeDictaBERT):
+    def __init__(self):
+        super().__init__(0, 0, 0)
+
+    def predict(self, sentences, tokenizer=None):
+        raise RuntimeError("CUDA out of memory")
+
+
+@pytest.fixture
+def stream():
+    """מחבר handler של JSON ל-stream בזיכרון ומחזיר את ה-logger למצבו אחרי הבדיקה"""
+    logger = logging.getLogger(ROOT_LOGGER)
+    saved = (list(logger.handlers), logger.level, logger.propagate)
+    stream = io.StringIO()
+    yield stream
+    logger.handlers[:] = saved[0]
+    logger.setLevel(saved[1])
+    logger.propagate = saved[2]
+
+
+def _events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_log_event_writes_one_json_line(stream):
+    configure_logging('INFO', stream=stream)
+    log_event(get_logger('test'), logging.WARNING, 'something_odd', count=3, word="שלום")
+    log_event(get_logger('test'), logging.DEBUG, 'too_quiet')
+    [event] = _events(stream)
+    assert event['level'] == 'WARNING'
+    assert event['logger'] == 'nikud.test'
+    assert (event['event'], event['count'], event['word']) == ('something_odd', 3, "שלום")
+    assert 'suppressed' not in event
+
+
+def test_reconfiguring_replaces_the_handler(stream):
+    configure_logging('INFO', stream=io.StringIO())
+    configure_logging('INFO', stream=stream)
+    log_event(get_logger('test'), logging.INFO, 'once')
+    assert len(_events(stream)) == 1
+
+
+def test_rate_limit_reports_suppressed_messages(stream, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('nikud_logging.time.monotonic', lambda: now[0])
+    configure_logging('INFO', stream=stream, burst=2, interval=10)
+    logger = get_logger('test')
+    for _ in range(5):
+        log_event(logger, logging.ERROR, 'flood')
+    log_event(logger, logging.ERROR, 'other')
+    now[0] = 11.0
+    log_event(logger, logging.ERROR, 'flood')
+
+    events = _events(stream)
+    assert [event['event'] for event in events] == ['flood', 'flood', 'other', 'flood']
+    assert events[-1]['suppressed'] == 3
+
+
+def test_rate_limit_filter_counts_per_event():
+    limiter = RateLimitFilter(burst=1, interval=60)
+
+    def record(msg, level=logging.ERROR):
+        return logging.LogRecord('nikud.x', level, __file__, 1, msg, None, None)
+
+    assert limiter.filter(record('a'))
+    assert not limiter.filter(record('a'))
+    assert limiter.filter(record('b'))
+    assert limiter.filter(record('a', logging.WARNING))
+
+
+def test_pipeline_is_quiet_by_default(make_pipeline, capsys):
+    pipeline = make_pipeline(disagreement_rate=0.2)
+    pipeline.process_many(["שמע ישראל ה אלהינו ה אחד", "ברוך אתה ה"])
+    captured = capsys.readouterr()
+    assert captured.out == captured.err == ''
+
+
+def test_predict_failure_is_logged_and_counted(make_pipeline, stream, capsys):
+    configure_logging('ERROR', stream=stream)
+    pipeline = make_pipeline()
+    pipeline.dictabert_nikud = dict(pipeline.dictabert_nikud, model=_BrokenDictaBERT())
+    decisions = pipeline.process_many(["שמע ישראל", "ברוך אתה"])
+
+    # הכרעה כושלת, לא ניקוד של Nakdimon שמוצג כהכרעה של DictaBERT
+    assert all(decision['text'] is None for decision in decisions)
+    assert pipeline.errors() == {'dictabert': 1}
+    [event] = _events(stream)
+    assert (event['event'], event['stage'], event['batch']) == ('predict_failed', 'dictabert', 2)
+    assert 'CUDA out of memory' in event['error']
+    assert capsys.readouterr().out == ''
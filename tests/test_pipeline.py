@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from nikud_fake_engines import fake_vocalize
+
+TEXTS = [
+    "ברוך אתה ה אלהינו מלך העולם",
+    "שמע ישראל ה אלהינו ה אחד",
+    "אמר רבי יהודה תנו רבנן",
+    "מאי טעמא דכתיב",
+    "והיו הדברים האלה אשר אנכי מצוך היום על לבבך",
+]
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 64])
+def test_process_many_matches_process(make_pipeline, batch_size):
+    single = make_pipeline()
+    batched = make_pipeline()
+    expected = [single.process(text) for text in TEXTS]
+    assert batched.process_many(TEXTS, batch_size=batch_size) == expected
+
+
+def test_dictabert_runs_once_per_batch(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.process_many(TEXTS, batch_size=2)
+    assert pipeline.engines['dictabert_nikud'].calls == 3
+
+
+def test_agreement_needs_no_morphology(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0)
+    decisions = pipeline.process_many(TEXTS)
+    assert [d['text'] for d in decisions] == [fake_vocalize(text) for text in TEXTS]
+    assert {d['source'] for d in decisions} == {'Both (identical)'}
+    assert pipeline.engines['morph_model'].calls == 0
+
+
+def test_parallel_engines_give_the_same_decisions(make_pipeline):
+    sequential = make_pipeline(workers=1)
+    parallel = make_pipeline(workers=2)
+    assert parallel.process_many(TEXTS, 2) == sequential.process_many(TEXTS, 2)
+
+
+def test_process_stream_numbers_lines_and_skips_blanks(make_pipeline):
+    pipeline = make_pipeline()
+    lines = io.StringIO(f"{TEXTS[0]}\n\n   \n{TEXTS[1]}\r\n{TEXTS[2]}")
+    results = list(pipeline.process_stream(lines, batch_size=2))
+    assert [(number, text) for number, text, _ in results] == [
+        (1, TEXTS[0]), (4, TEXTS[1]), (5, TEXTS[2])
+    ]
+    assert [decision for _, _, decision in results] == pipeline.process_many(TEXTS[:3])
+
+
+def test_missing_engines_degrade_instead_of_failing(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.nakdimon = None
+    decision = pipeline.process(TEXTS[0])
+    assert decision['source'] == 'DictaBERT'
+    assert decision['text'] == fake_vocalize(TEXTS[0])
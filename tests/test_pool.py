@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+
+import pytest
+
+from complete_nikud_pipeline import HebrewNikudPipeline
+from nikud_fake_engines import FakeDictaBERT, FakeMorph, FakeNakdimon, FakeTokenizer, fake_vocalize
+from nikud_pool import PipelinePool
+
+pytestmark = pytest.mark.skipif(
+    'fork' not in multiprocessing.get_all_start_methods(),
+    reason="המנועים המדומים מוזרקים דרך fork"
+)
+
+TEXTS = ["שלום עולם", "רע מאוד", "ברוך הבא", "רע ומר", "יום טוב"]
+
+_loads = []
+
+
+class _FailingDictaBERT(FakeDictaBERT):
+    def predict(self, sentences, tokenizer=None):
+        if any('רע' in sentence for sentence in sentences):
+            raise RuntimeError("boom")
+        return super().predict(sentences, tokenizer)
+
+
+def _loader(name, value):
+    def load(self):
+        _loads.append((name, os.getpid()))
+        return value
+    return load
+
+
+def _failing_loader(name):
+    def load(self):
+        self._load_failed(name, RuntimeError("missing"))
+        return None
+    return load
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """מנועים מדומים דרך ה-loaders, כך שגם העובדים (אחרי fork) מקבלים אותם"""
+    _loads.clear()
+    dictabert = {'tokenizer': FakeTokenizer(), 'model': _FailingDictaBERT(0, 0, 0)}
+    monkeypatch.setattr(HebrewNikudPipeline, '_load_dictabert_nikud',
+                        _loader('dictabert_nikud', dictabert))
+    monkeypatch.setattr(HebrewNikudPipeline, '_load_nakdimon',
+                        _loader('nakdimon', FakeNakdimon(0, 0, 0)))
+    monkeypatch.setattr(HebrewNikudPipeline, '_load_morph_model', _failing_loader('morph_model'))
+    monkeypatch.setattr(HebrewNikudPipeline, '_load_abbreviations', _loader('abbreviations', None))
+
+
+def test_pool_matches_a_single_pipeline(fake_models):
+    with PipelinePool(num_workers=2, chunk_size=1, batch_size=1) as pool:
+        pooled = pool.process_many(TEXTS)
+    with HebrewNikudPipeline() as pipeline:
+        single = pipeline.process_many(TEXTS, batch_size=1)
+
+    assert pooled == single
+    assert pooled[0]['text'] == fake_vocalize(TEXTS[0])
+    # כישלון הטעינה בתהליך הראשי נספר פעם אחת, לא פעם לכל עובד
+    assert pool.errors() == pipeline.errors() == {'load.morph_model': 1, 'dictabert': 2}
+    assert pool.error_count == pipeline.error_count == 3
+
+
+def test_fork_preloads_only_torch_models(fake_models):
+    parent = os.getpid()
+    with PipelinePool(num_workers=2, chunk_size=2) as pool:
+        pool.process_many(TEXTS)
+    # נרשם רק בתהליך הראשי; טעינות בעובדים נשארות בזיכרון שלהם
+    assert ('dictabert_nikud', parent) in _loads
+    assert ('nakdimon', parent) not in _loads
+
+
+def test_process_stream_keeps_order_and_line_numbers(fake_models):
+    lines = ["שלום עולם\n", "\n", "ברוך הבא\n", "יום טוב"]
+    with PipelinePool(num_workers=2, chunk_size=1) as pool:
+        results = list(pool.process_stream(lines))
+    assert [(number, text) for number, text, _ in results] == [
+        (1, "שלום עולם"), (3, "ברוך הבא"), (4, "יום טוב")
+    ]
+    assert [decision['text'] for _, _, decision in results] == [
+        fake_vocalize(text) for _, text, _ in results
+    ]
@@ -0,0 +1,127 @@
+import io
+import json
+
+import pytest
+
+from nikud_corpus import run_corpus
+from nikud_records import (
+    ColumnarWriter, Confidence, DecisionRecord, Flags, Source, convert_jsonl,
+)
+
+LINES = [
+    "ברוך אתה ה אלהינו מלך העולם",
+    "שמע ישראל ה אלהינו ה אחד",
+    "",
+    "אמר רבי יהודה תנו רבנן",
+    "מאי טעמא דכתיב",
+    "והיו הדברים האלה אשר אנכי מצוך היום על לבבך",
+    "שלום",
+    "רבי שמעון בן יוחאי",
+]
+
+FAILED = {'text': None, 'source': 'DictaBERT', 'confidence': 'high', 'notes': 'Nakdimon לא זמין'}
+
+
+def _records(make_pipeline, **kwargs):
+    output = io.StringIO()
+    run_corpus(make_pipeline(**kwargs), LINES, output, batch_size=3, log=io.StringIO())
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+@pytest.fixture
+def records(make_pipeline):
+    """רשומות מכל הסוגים: הסכמה, מחלוקת עם מורפולוגיה, שער ביטחון, כישלון"""
+    records = _records(make_pipeline, disagreement_rate=0.3)
+    records += _records(make_pipeline, disagreement_rate=0.3, skip_margin=0.9)
+    records.append({'line': 99, 'input': "שבור", **FAILED})
+    return records
+
+
+def _decision(record):
+    return {key: value for key, value in record.items() if key not in ('line', 'input')}
+
+
+def test_decision_record_round_trip(records):
+    sources = set()
+    for record in records:
+        compact = DecisionRecord.from_dict(_decision(record))
+        assert compact.to_dict() == _decision(record)
+        sources.add(compact.source)
+    assert {Source.BOTH_IDENTICAL, Source.CONFIDENT, Source.DICTABERT} <= sources
+    assert sources & {Source.WITH_MORPH, Source.UNCERTAIN}
+
+
+def test_decision_record_flags():
+    record = DecisionRecord.from_dict(FAILED)
+    assert record.flags == Flags.FAILED
+    assert not record.requires_review
+    with pytest.raises(ValueError):
+        DecisionRecord.from_dict(dict(FAILED, source='GPT'))
+    with pytest.raises(ValueError):
+        DecisionRecord.from_dict(dict(FAILED, confidence='low'))
+
+
+def test_columnar_round_trip(tmp_path, records):
+    pytest.importorskip('numpy')
+    from nikud_records import ColumnarDecisions
+
+    path = str(tmp_path / 'cols')
+    with ColumnarWriter(path) as writer:
+        assert writer.write_records(records[:5]) == 5
+        # קורא באמצע הכתיבה רואה רק אצוות שהושלמו
+        writer.write(_decision(records[5]), records[5]['line'], records[5]['input'])
+        assert len(ColumnarDecisions(path)) == 5
+        writer.write_records(records[6:])
+
+    decisions = ColumnarDecisions(path)
+    assert len(decisions) == len(records)
+    assert [decisions.record(row) for row in range(len(records))] == records
+
+
+def test_columnar_select_and_counts(tmp_path, records):
+    pytest.importorskip('numpy')
+    from nikud_records import ColumnarDecisions
+
+    path = str(tmp_path / 'cols')
+    with ColumnarWriter(path) as writer:
+        writer.write_records(records)
+    decisions = ColumnarDecisions(path)
+
+    def rows(predicate):
+        return [row for row, record in enumerate(records) if predicate(record)]
+
+    assert list(decisions.select(requires_review=True)) == rows(lambda r: r.get('requires_review'))
+    assert list(decisions.select(failed=True)) == rows(lambda r: r['text'] is None)
+    assert list(decisions.select(source=Source.CONFIDENT)) == rows(
+        lambda r: r['source'] == 'DictaBERT (confident)'
+    )
+    assert list(decisions.select(source=[Source.WITH_MORPH, Source.UNCERTAIN],
+                                 min_confidence=Confidence.HIGH)) == rows(
+        lambda r: r['source'] in ('DictaBERT (with morph)', 'DictaBERT (uncertain)')
+        and r['confidence'] in ('high', 'very_high')
+    )
+
+    counts = decisions.counts()
+    assert counts['rows'] == len(records)
+    assert counts['sources']['Both (identical)'] == len(rows(lambda r: r['source'] == 'Both (identical)'))
+    assert counts['requires_review'] == len(rows(lambda r: r.get('requires_review')))
+
+
+def test_corpus_and_convert_write_the_same_columns(make_pipeline, tmp_path):
+    pytest.importorskip('numpy')
+    from nikud_records import ColumnarDecisions
+
+    jsonl = tmp_path / 'out.jsonl'
+    with open(jsonl, 'w', encoding='utf-8') as output:
+        run_corpus(make_pipeline(), LINES, output, batch_size=3, log=io.StringIO())
+    assert convert_jsonl(str(jsonl), str(tmp_path / 'converted')) == sum(1 for line in LINES if line)
+
+    with ColumnarWriter(str(tmp_path / 'direct')) as writer:
+        run_corpus(make_pipeline(), LINES, writer, batch_size=3, log=io.StringIO())
+
+    converted = ColumnarDecisions(str(tmp_path / 'converted'))
+    direct = ColumnarDecisions(str(tmp_path / 'direct'))
+    with open(jsonl, encoding='utf-8') as f:
+        expected = [json.loads(line) for line in f]
+    assert [converted.record(row) for row in range(len(converted))] == expected
+    assert [direct.record(row) for row in range(len(direct))] == expected
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from nikud_fake_engines import fake_vocalize
+from nikud_server import BatchTooLarge, MicroBatcher, NikudServer, QueueFull, ShuttingDown
+
+
+class _SlowPipeline:
+    """process_many שנתקע עד ש-release מסומן - כדי לתפוס אצווה באמצע"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.batches = []
+
+    def process_many(self, texts, batch_size=None):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.release.wait(5)
+        return [{'text': text} for text in texts]
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def test_concurrent_submits_share_batches(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0, unclear_rate=0)
+    texts = [f"שלום {i}" for i in range(12)]
+
+    async def scenario():
+        batcher = MicroBatcher(pipeline, max_batch=8, max_wait_ms=50)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit([text]) for text in texts))
+        await batcher.drain(1)
+        return batcher, results
+
+    batcher, results = _run(scenario())
+    assert [result[0]['text'] for result in results] == [fake_vocalize(t) for t in texts]
+    assert batcher.processed == len(texts)
+    assert batcher.batches < len(texts)
+
+
+def test_backpressure(make_pipeline):
+    pipeline = make_pipeline()
+
+    async def scenario():
+        batcher = MicroBatcher(pipeline, max_queue=3)
+        with pytest.raises(BatchTooLarge):
+            await batcher.submit(["א"] * 4)
+        # בלי start שום דבר לא נשלף מהתור
+        pending = asyncio.ensure_future(batcher.submit(["א", "ב"]))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await batcher.submit(["ג", "ד"])
+        await batcher.drain(0)
+        with pytest.raises(ShuttingDown):
+            await pending
+
+    _run(scenario())
+
+
+def test_drain_fails_a_batch_cut_during_collect(make_pipeline):
+    pipeline = make_pipeline()
+
+    async def scenario():
+        # max_wait ארוך: הטקסט כבר נשלף מהתור אבל האצווה עוד נאספת
+        batcher = MicroBatcher(pipeline, max_batch=8, max_wait_ms=60_000)
+        batcher.start()
+        pending = asyncio.ensure_future(batcher.submit(["שלום"]))
+        await asyncio.sleep(0.05)
+        assert batcher.pending == 0
+        await batcher.drain(0)
+        with pytest.raises(ShuttingDown):
+            await pending
+
+    _run(scenario())
+
+
+def test_drain_does_not_block_the_event_loop():
+    pipeline = _SlowPipeline()
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        batcher = MicroBatcher(pipeline, max_wait_ms=0)
+        batcher.start()
+        pending = asyncio.ensure_future(batcher.submit(["שלום"]))
+        await asyncio.get_running_loop().run_in_executor(None, pipeline.started.wait, 5)
+        tick_task = asyncio.ensure_future(ticker())
+        drain = asyncio.ensure_future(batcher.drain(0))
+        await asyncio.sleep(0.2)
+        assert not drain.done()
+        pipeline.release.set()
+        await drain
+        tick_task.cancel()
+        with pytest.raises(ShuttingDown):
+            await pending
+
+    _run(scenario())
+    # הלולאה המשיכה לתקתק בזמן שהאצווה האחרונה הסתיימה ב-thread
+    assert len(ticks) >= 5
+
+
+async def _request(reader, writer, body, keep_alive=True):
+    data = json.dumps(body).encode('utf-8')
+    connection = 'keep-alive' if keep_alive else 'close'
+    writer.write(
+        f'POST /nikud HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n'
+        f'Connection: {connection}\r\n\r\n'.encode('latin-1') + data
+    )
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = next(
+        int(line.split(b':')[1]) for line in head.split(b'\r\n')
+        if line.lower().startswith(b'content-length')
+    )
+    body = await reader.readexactly(length)
+    return int(head.split(b' ')[1]), json.loads(body)
+
+
+def test_server_round_trip_and_shutdown_closes_idle_connections(make_pipeline):
+    pipeline = make_pipeline(disagreement_rate=0, unclear_rate=0)
+    server = NikudServer(pipeline, port=0, max_wait_ms=1, drain_timeout=1)
+
+    async def scenario():
+        serving = asyncio.ensure_future(server.serve())
+        while server._server is None:
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        status, payload = await _request(reader, writer, {'texts': ["שלום", "עולם"]})
+        assert status == 200
+        assert [d['text'] for d in payload['decisions']] == [
+            fake_vocalize("שלום"), fake_vocalize("עולם")
+        ]
+
+        status, payload = await _request(reader, writer, {'text': 7})
+        assert status == 400
+
+        # החיבור נשאר פתוח (keep-alive) ולא שולח כלום - הכיבוי סוגר אותו
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        await _request(reader, writer, {'text': "שלום"})
+        server.stop()
+        assert await asyncio.wait_for(reader.read(), 2) == b''
+        await asyncio.wait_for(serving, 5)
+        writer.close()
+
+    _run(scenario())
+    assert server.batcher.processed == 3
@@ -0,0 +1,119 @@
+import glob
+import io
+import json
+import os
+import time
+
+import pytest
+
+from nikud_corpus import run_corpus
+from nikud_shards import Lease, ShardPlan, ShardWorker, merge
+
+LINES = [f"שורה מספר {i} בספר" for i in range(23)] + [""]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text('\n'.join(LINES) + '\n', encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def plan(tmp_path, corpus):
+    return ShardPlan.open(str(tmp_path / 'work'), corpus, shard_lines=5)
+
+
+def _worker(pipeline, plan, owner=None, **kwargs):
+    worker = ShardWorker(pipeline, plan, batch_size=4, poll=0.01, log=io.StringIO(), **kwargs)
+    if owner is not None:
+        worker.owner = owner
+    return worker
+
+
+def _expire(path):
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+
+
+def test_split_covers_every_line(plan):
+    assert [shard['lines'] for shard in plan.shards] == [5, 5, 5, 5, 4]
+    lines = [line for shard in plan.shards for line in plan.lines(shard)]
+    assert [line.rstrip('\n') for line in lines] == LINES
+
+
+def test_reopening_with_another_split_fails(corpus, plan):
+    with pytest.raises(ValueError):
+        ShardPlan.open(plan.workdir, corpus, shard_lines=7)
+
+
+def test_worker_output_matches_a_single_run(make_pipeline, tmp_path, corpus, plan):
+    pipeline = make_pipeline()
+    counters = _worker(pipeline, plan).run()
+    assert counters['shards'] == len(plan.shards)
+    assert plan.status()['done'] == len(plan.shards)
+
+    merged = tmp_path / 'merged.jsonl'
+    merge(plan, str(merged))
+    expected = io.StringIO()
+    with open(corpus, encoding='utf-8') as lines:
+        run_corpus(make_pipeline(), lines, expected, batch_size=4, log=io.StringIO())
+    assert merged.read_text(encoding='utf-8') == expected.getvalue()
+    assert not os.listdir(plan.lease_dir)
+
+
+def test_lease_is_exclusive_until_it_expires(plan):
+    path = plan.lease_path(plan.shards[0])
+    first = Lease(path, 'host:1:a', ttl=60)
+    second = Lease(path, 'host:2:b', ttl=60)
+    assert first.acquire()
+    assert not second.acquire()
+
+    _expire(path)
+    assert second.acquire()
+    assert second.stolen and second.previous_owner == 'host:1:a'
+    assert second.held() and not first.held()
+    assert not first.heartbeat()
+
+
+def test_steal_removes_only_the_dead_owners_temp_files(make_pipeline, plan):
+    shard = plan.shards[0]
+    final = plan.output_path(shard)
+    dead = Lease(plan.lease_path(shard), 'host:1:dead', ttl=1)
+    assert dead.acquire()
+    _expire(dead.path)
+    dead_temp = f"{final}.host_1_dead.0123.tmp"
+    live_temp = f"{final}.host_2_live.4567.tmp"
+    for temp in (dead_temp, live_temp):
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write('{}\n')
+
+    worker = _worker(make_pipeline(), plan, ttl=1, heartbeat=0.5)
+    assert worker._try_shard(shard)
+    assert worker.counters['stolen'] == 1
+    assert not os.path.exists(dead_temp)
+    assert os.path.exists(live_temp)
+    with open(final, encoding='utf-8') as f:
+        assert len([json.loads(line) for line in f]) == shard['lines']
+
+
+class _VanishingTemp:
+    """process_stream שבסופו הקובץ הזמני נמחק - כמו גונב שמחק אותו"""
+
+    def __init__(self, pipeline, plan, shard):
+        self.pipeline = pipeline
+        self.pattern = f"{glob.escape(plan.output_path(shard))}.*.tmp"
+
+    def process_stream(self, lines, batch_size):
+        yield from self.pipeline.process_stream(lines, batch_size)
+        for temp in glob.glob(self.pattern):
+            os.remove(temp)
+
+
+def test_missing_temp_file_counts_as_a_lost_lease(make_pipeline, plan):
+    shard = plan.shards[1]
+    worker = _worker(_VanishingTemp(make_pipeline(), plan, shard), plan)
+    assert not worker._try_shard(shard)
+    assert worker.counters == {'shards': 0, 'lines': 0, 'stolen': 0, 'lost': 1}
+    assert not plan.is_done(shard)
+    assert not os.path.exists(plan.lease_path(shard))
@@ -0,0 +1,75 @@
+import io
+import pstats
+
+import pytest
+
+from nikud_stats import LatencyHistogram, PipelineStats, profiler_from_env
+
+
+def test_histogram_percentiles_within_resolution():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.add(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.05)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.05)
+    assert histogram.percentile(100) == histogram.max == 0.1
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_record_summarizes_and_notifies_listeners():
+    stats = PipelineStats()
+    events = []
+    stats.add_listener(events.append)
+    stats.record('dictabert', 0.02, batch_size=8, tokens=256)
+    stats.record('dictabert', 0.04, batch_size=4, tokens=128)
+    stats.record('cache', 0.001, batch_size=10, cache_hits=7, cache_misses=3)
+
+    summary = stats.summary()
+    assert summary['dictabert']['calls'] == 2
+    assert (summary['dictabert']['items'], summary['dictabert']['tokens']) == (12, 384)
+    assert summary['dictabert']['mean_batch'] == 6
+    assert (summary['cache']['cache_hits'], summary['cache']['cache_misses']) == (7, 3)
+    assert [event.stage for event in events] == ['dictabert', 'dictabert', 'cache']
+    assert events[0].tokens == 256
+
+    stats.count('tokens.total', 10)
+    stats.count('lexicon.tokens', 4)
+    assert stats.lexicon_fraction() == 0.4
+    output = io.StringIO()
+    stats.dump(output)
+    assert 'dictabert' in output.getvalue() and 'lexicon fraction: 40.00%' in output.getvalue()
+
+    stats.reset()
+    assert stats.summary() == {} and stats.lexicon_fraction() == 0.0
+
+
+def test_pipeline_records_every_stage(make_pipeline, tmp_path):
+    pipeline = make_pipeline(disagreement_rate=0.3)
+    pipeline.enable_cache(str(tmp_path / 'cache.db'))
+    texts = ["שמע ישראל ה אלהינו ה אחד", "ברוך אתה ה אלהינו מלך העולם"]
+    pipeline.process_many(texts)
+    pipeline.process_many(texts)
+
+    summary = pipeline.stats.summary()
+    assert {'tokenization', 'dictabert', 'nakdimon', 'decision', 'cache'} <= set(summary)
+    assert summary['dictabert']['items'] == len(texts)
+    assert summary['cache']['cache_misses'] == len(texts)
+    assert summary['cache']['cache_hits'] == len(texts)
+
+
+def test_profiler_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv('NIKUD_PROFILE', raising=False)
+    with profiler_from_env() as profiler:
+        pass
+    profiler.close()
+
+    path = tmp_path / 'run.prof'
+    monkeypatch.setenv('NIKUD_PROFILE', 'cprofile')
+    monkeypatch.setenv('NIKUD_PROFILE_OUT', str(path))
+    profiler = profiler_from_env()
+    with profiler:
+        with profiler:
+            sorted(range(1000), key=lambda x: -x)
+    profiler.close()
+    assert pstats.Stats(str(path)).total_calls > 0
@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+from nikud_fake_engines import FakeDictaBERT, FakeTokenizer, fake_vocalize
+from nikud_text import plan_windows, stitch_windows, window_texts
+
+SENTENCES = [
+    "ברוך אתה ה אלהינו מלך העולם.",
+    "אשר קדשנו במצותיו וצונו על נטילת ידים.",
+    "שמע ישראל!",
+    "והיו הדברים האלה אשר אנכי מצוך היום על לבבך ושננתם לבניך ודברת בם בשבתך בביתך",
+]
+PARAGRAPH = "  ".join(SENTENCES[:2]) + "\n" + " ".join(SENTENCES[2:])
+
+
+def _vocalize_words(text):
+    """הניקוד המדומה של כל מילה, עם הרווחים המקוריים"""
+    return re.sub(r'\S+', lambda match: fake_vocalize(match.group()), text)
+
+
+@pytest.mark.parametrize('max_chars', [20, 45, 80, 1000])
+def test_windows_fit_and_keep_every_word_once(max_chars):
+    spans, windows = plan_windows(PARAGRAPH, max_chars, overlap_words=2)
+    kept = [index for _, _, keep_start, keep_end in windows
+            for index in range(keep_start, keep_end)]
+    assert kept == list(range(len(spans)))
+    for text in window_texts(PARAGRAPH, spans, windows):
+        assert len(text) <= max_chars or ' ' not in text
+
+
+def test_short_sentences_are_packed_whole():
+    spans, windows = plan_windows(PARAGRAPH, 80, overlap_words=2)
+    texts = window_texts(PARAGRAPH, spans, windows)
+    assert texts[0] == PARAGRAPH[:PARAGRAPH.index(SENTENCES[2]) + len(SENTENCES[2])]
+    # חלונות של משפטים שלמים לא חופפים
+    assert windows[0][:2] == windows[0][2:]
+
+
+def test_long_sentence_windows_overlap():
+    sentence = SENTENCES[3]
+    spans, windows = plan_windows(sentence, 30, overlap_words=2)
+    assert len(windows) > 1
+    for start, end, keep_start, keep_end in windows[1:]:
+        assert start < keep_start
+    assert stitch_windows(
+        sentence, spans, windows,
+        [fake_vocalize(text) for text in window_texts(sentence, spans, windows)]
+    ) == _vocalize_words(sentence)
+
+
+def test_stitch_rejects_a_window_with_missing_words():
+    spans, windows = plan_windows(PARAGRAPH, 45, overlap_words=2)
+    outputs = [fake_vocalize(text) for text in window_texts(PARAGRAPH, spans, windows)]
+    outputs[1] = outputs[1].rsplit(' ', 1)[0]
+    assert stitch_windows(PARAGRAPH, spans, windows, outputs) is None
+
+
+def test_pipeline_windows_long_paragraphs(make_pipeline):
+    pipeline = make_pipeline()
+    model = pipeline.engines['dictabert_nikud']
+    pipeline.dictabert_nikud = {'tokenizer': FakeTokenizer(model_max_length=50), 'model': model}
+    short = "שלום עולם"
+    results = pipeline.nikud_many_with_dictabert([PARAGRAPH, short, PARAGRAPH], batch_size=4)
+    assert results == [_vocalize_words(PARAGRAPH), fake_vocalize(short), _vocalize_words(PARAGRAPH)]
+    # החלונות של כל הטקסטים רצים יחד באותן אצוות
+    windows = len(plan_windows(PARAGRAPH, 48, pipeline.window_overlap)[1])
+    assert model.calls == -(-(2 * windows + 1) // 4)
+
+
+class _FailingOn(FakeDictaBERT):
+    def __init__(self, word):
+        super().__init__(0, 0, 0)
+        self.word = word
+
+    def predict(self, sentences, tokenizer=None):
+        if any(self.word in sentence for sentence in sentences):
+            raise RuntimeError("boom")
+        return super().predict(sentences, tokenizer)
+
+
+def test_failed_window_fails_the_whole_text(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.dictabert_nikud = {'tokenizer': FakeTokenizer(model_max_length=50),
+                                'model': _FailingOn("ישראל")}
+    assert pipeline.nikud_many_with_dictabert([PARAGRAPH, "שלום"], batch_size=1) == [
+        None, fake_vocalize("שלום")
+    ]
+    assert pipeline.errors()['windows'] == 1